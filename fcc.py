@@ -1,12 +1,18 @@
+import bisect
 import math
-import inspect
+import struct
+import time
 
 CM_PER_FT = 30.48
 M_PER_FT = CM_PER_FT / 100
+# Bump whenever a change to the formulas could change any result. Persistent caches of results are keyed on it.
+FORMULA_VERSION = '1'
 
 
 class PoweredAntenna:
     """Structure for representing an antenna with a certain gain, operating characteristics, and feed power"""
+    __slots__ = ('watts', 't_average', 'duty', 'dbi', 'effective_isotropic_radiated_power')
+
     def __init__(self, watts: float, t_average: float, duty: float, dbi: float):
         """
         :param watts: Power seen at antenna feedpoint (*after* feedline loss)
@@ -57,7 +63,13 @@ def is_compliant(antenna: PoweredAntenna, ft: float, mhz: float, ground_reflecti
 class RFEvaluationReport:
     """Perform an RF evaluation of antenna/mode setup. Determine power density (mW/cm^2) given input power and distance,
     allowed power density, and compliant distances (controlled & uncontrolled environment).
+
+    Only the power density and the MPE limits are computed up front. The compliant distances, the compliance flags, and
+    the text of the report are computed on first access and cached.
     """
+    __slots__ = ('antenna', 'ft', 'mhz', 'ground_reflections', 'power_density', 'power_density_c', 'power_density_u',
+                 '_ft_c', '_ft_u', '_text')
+
     def __init__(self, antenna: PoweredAntenna, ft: float, mhz: float, ground_reflections: bool):
         """
         :param antenna:
@@ -72,24 +84,144 @@ class RFEvaluationReport:
         # Calculations
         self.power_density = power_density_mwcm2(antenna.effective_isotropic_radiated_power, ft, ground_reflections)
         self.power_density_c, self.power_density_u = mpe_limits_cont_uncont_mwcm2(mhz)  # mW/cm^2
-        self.ft_c = compliant_distance_ft(antenna.effective_isotropic_radiated_power, self.power_density_c, ground_reflections)
-        self.ft_u = compliant_distance_ft(antenna.effective_isotropic_radiated_power, self.power_density_u, ground_reflections)
-        self.compliant_c = self.power_density < self.power_density_c
-        self.compliant_u = self.power_density < self.power_density_u
+        self._ft_c = self._ft_u = self._text = None
+
+    @property
+    def ft_c(self) -> float:
+        """Compliant distance in a controlled environment (feet)"""
+        if self._ft_c is None:
+            self._ft_c = compliant_distance_ft(self.antenna.effective_isotropic_radiated_power, self.power_density_c,
+                                               self.ground_reflections)
+        return self._ft_c
+
+    @property
+    def ft_u(self) -> float:
+        """Compliant distance in an uncontrolled environment (feet)"""
+        if self._ft_u is None:
+            self._ft_u = compliant_distance_ft(self.antenna.effective_isotropic_radiated_power, self.power_density_u,
+                                               self.ground_reflections)
+        return self._ft_u
+
+    @property
+    def compliant_c(self) -> bool:
+        return self.power_density < self.power_density_c
+
+    @property
+    def compliant_u(self) -> bool:
+        return self.power_density < self.power_density_u
 
     def __repr__(self):
         return "RFEvaluationReport(%s, %f, %f, %s)" % (repr(self.antenna), self.ft, self.mhz, self.ground_reflections)
 
     def __str__(self):
-        template = """Power density (mW/cm^2): %s
-        MPE controlled (mW/cm^2): %s
-        MPE uncontrolled (mW/cm^2): %s
-        Distance controlled (ft): %s
-        Distance uncontrolled (ft): %s
-        Compliant controlled: %s
-        Compliant uncontrolled: %s"""
-        return inspect.cleandoc(template) % (self.power_density, self.power_density_c, self.power_density_u,
-                                             self.ft_c, self.ft_u, self.compliant_c, self.compliant_u)
+        if self._text is None:
+            self._text = self._render()
+        return self._text
+
+    def _render(self) -> str:
+        return REPORT_TEMPLATE % (self.power_density, self.power_density_c, self.power_density_u, self.ft_c, self.ft_u,
+                                  self.compliant_c, self.compliant_u)
+
+
+# Text of an RFEvaluationReport, filled with (power_density, power_density_c, power_density_u, ft_c, ft_u, compliant_c,
+# compliant_u)
+REPORT_TEMPLATE = ("Power density (mW/cm^2): %s\n"
+                   "MPE controlled (mW/cm^2): %s\n"
+                   "MPE uncontrolled (mW/cm^2): %s\n"
+                   "Distance controlled (ft): %s\n"
+                   "Distance uncontrolled (ft): %s\n"
+                   "Compliant controlled: %s\n"
+                   "Compliant uncontrolled: %s")
+
+
+# Frequency bands ########
+# One table of frequency bands shared by the MPE limits (OET 65 Table 1) and the MPE exemption thresholds (FCC 19-126
+# Table 2), so that every formula finds its band with a single sorted search. Band i covers
+# [BAND_EDGES_MHZ[i], BAND_EDGES_MHZ[i + 1]) MHz. The edges are the union of both tables' edges. The limits table is
+# closed on the right at 1.34 MHz, hence the one-value band that starts there.
+
+
+def _next_float(x: float) -> float:
+    return struct.unpack('<d', struct.pack('<q', struct.unpack('<q', struct.pack('<d', x))[0] + 1))[0]
+
+
+BAND_EDGES_MHZ = (0, 0.3, 1.34, _next_float(1.34), 3, 30, 300, 1500, 100000)
+# MPE limits (mW/cm^2) per band, as (a, p, b, q) meaning a * f ** p / (b * f ** q) for f in MHz
+MPE_LIMIT_CONTROLLED = (
+    (100, 0, 1, 0),
+    (100, 0, 1, 0),
+    (100, 0, 1, 0),
+    (100, 0, 1, 0),
+    (900, 0, 1, 2),
+    (1.0, 0, 1, 0),
+    (1, 1, 300, 0),
+    (5.0, 0, 1, 0)
+)
+MPE_LIMIT_UNCONTROLLED = (
+    (100, 0, 1, 0),
+    (100, 0, 1, 0),
+    (100, 0, 1, 0),
+    (180, 0, 1, 2),
+    (180, 0, 1, 2),
+    (0.2, 0, 1, 0),
+    (1, 1, 1500, 0),
+    (1.0, 0, 1, 0)
+)
+# MPE exemption ERP thresholds (W) per band, as (k, p, q) meaning k * r ** 2 * f ** p / f ** q for r in meters, or
+# None where the MPE exemption does not apply
+MPE_EXEMPTION = (
+    None,
+    (1920, 0, 0),
+    (3450, 0, 2),
+    (3450, 0, 2),
+    (3450, 0, 2),
+    (3.83, 0, 0),
+    (0.0128, 1, 0),
+    (19.2, 0, 0)
+)
+
+
+def band_index(mhz: float):
+    """Find which band of BAND_EDGES_MHZ a frequency falls in.
+
+    :param mhz: Frequency (megahertz)
+    :return: Index into the per-band tables, or None if mhz is out of range
+    """
+    i = bisect.bisect_right(BAND_EDGES_MHZ, mhz) - 1
+    if 0 <= i < _N_BANDS:
+        return i
+    return None
+
+
+def _compile_limit(coefficients: tuple):
+    """Function of f computing a * f ** p / (b * f ** q), leaving out powers of zero (which do not change the result)."""
+    a, p, b, q = coefficients
+    if p == 0 and q == 0:
+        value = a / b
+        return lambda f: value
+    elif p == 0:
+        return lambda f: a / (b * f ** q)
+    else:
+        return lambda f: a * f ** p / (b * f ** q)
+
+
+def _compile_exemption(coefficients):
+    """Function of (f, r) computing k * r ** 2 * f ** p / f ** q, leaving out powers of zero."""
+    if coefficients is None:
+        return None
+    k, p, q = coefficients
+    if p == 0 and q == 0:
+        return lambda f, r: k * r ** 2
+    elif p == 0:
+        return lambda f, r: k * r ** 2 / f ** q
+    else:
+        return lambda f, r: k * r ** 2 * f ** p / f ** q
+
+
+_N_BANDS = len(BAND_EDGES_MHZ) - 1
+_MPE_LIMIT_FUNCTIONS = tuple(zip(map(_compile_limit, MPE_LIMIT_CONTROLLED),
+                                 map(_compile_limit, MPE_LIMIT_UNCONTROLLED)))
+_MPE_EXEMPTION_FUNCTIONS = tuple(map(_compile_exemption, MPE_EXEMPTION))
 
 
 # Evaluation functions ########
@@ -106,22 +238,11 @@ def mpe_limits_cont_uncont_mwcm2(mhz: float) -> list:
     :return: MPE limits (mW/cm^2) for controlled & uncontrolled environments, respectively
     :raises ValueError: if mhz is out of range (cannot be found in the FCC lookup table)
     """
-    if mhz <= 0:
-        raise ValueError("frequency out of range: %s MHz" % str(mhz))
-    elif mhz <= 1.34:
-        return [100, 100]
-    elif mhz < 3:
-        return [100, 180 / (mhz ** 2)]
-    elif mhz < 30:
-        return [900 / (mhz ** 2), 180 / (mhz ** 2)]
-    elif mhz < 300:
-        return [1.0, 0.2]
-    elif mhz < 1500:
-        return [mhz / 300, mhz / 1500]
-    elif mhz < 100000:
-        return [5.0, 1.0]
-    else:
+    i = bisect.bisect_right(BAND_EDGES_MHZ, mhz) - 1
+    if mhz <= 0 or i >= _N_BANDS:
         raise ValueError("frequency out of range: %s MHz" % str(mhz))
+    controlled, uncontrolled = _MPE_LIMIT_FUNCTIONS[i]
+    return [controlled(mhz), uncontrolled(mhz)]
 
 
 def compliant_distance_ft(eirp_mw: float, mpe_limit_mwcm2: float, ground_reflections: bool) -> float:
@@ -171,6 +292,12 @@ class RFEvaluationError(ValueError):
     pass
 
 
+# Statuses reported by exempt_threshold() instead of raising
+NEARFIELD = 'nearfield'
+OUT_OF_RANGE = 'out of range'
+SPEED_OF_LIGHT = 299792458  # m/s
+
+
 def is_exempt(watts: float, meters: float, mhz: float) -> tuple:
     """Determine via either MPE or SAR method whether a given power and frequency are exempt at a given distance.
     Not the same as RF evaluation.
@@ -179,13 +306,12 @@ def is_exempt(watts: float, meters: float, mhz: float) -> tuple:
     :param meters: Distance from antenna to person (meters)
     :param mhz: Frequency of the RF (megahertz)
     :return: A (bool, str) tuple stating whether this setup is exempt from evaluation, and the reason why / why not.
+    :raises ValueError: if mhz is out of range
     """
-    try:
-        threshold, method = exempt_watts_generic(meters, mhz)
-        return watts < threshold, method
-    except RFEvaluationError:
-        return False, 'nearfield'
-    # Do not catch general ValueError, which means mhz may be out of range.
+    threshold, method = exempt_threshold(meters, mhz)
+    if method == OUT_OF_RANGE:
+        raise ValueError("frequency out of range: %s MHz" % str(mhz))
+    return watts < threshold, method  # never exempt in near field, where threshold is NaN
 
 
 def exempt_watts_generic(meters: float, mhz: float) -> tuple:
@@ -194,17 +320,58 @@ def exempt_watts_generic(meters: float, mhz: float) -> tuple:
     :param meters: Distance from antenna to person (meters)
     :param mhz: Frequency of the RF (megahertz)
     :return: A (float, str) tuple stating the threshold (watts) and exemption method used
+    :raises RFEvaluationError: if only MPE applies, and distance is within "near field"
+    :raises ValueError: if neither method applies at this frequency and distance
+    """
+    threshold, method = exempt_threshold(meters, mhz)
+    if method == NEARFIELD:
+        raise RFEvaluationError("R < L/2pi (%s < %s m). RF evaluation required." %
+                                (str(meters), str(round(_l_over_2pi(mhz)))))
+    elif method == OUT_OF_RANGE:
+        raise ValueError("frequency out of range: %s MHz" % str(mhz))
+    return threshold, method
+
+
+def exempt_threshold(meters: float, mhz: float) -> tuple:
+    """Exception-free core of the exemption functions. Finds the best of SAR and MPE exemption thresholds, or why there
+    is none, as a status instead of raising. Where both methods apply, SAR_CROSSOVER decides which one wins, and only
+    that one is evaluated.
+
+    :param meters: Distance from antenna to person (meters)
+    :param mhz: Frequency of the RF (megahertz)
+    :return: A (float, str) tuple of the threshold (watts) and method: 'SAR', 'MPE', 'SAR wins' or 'MPE wins'. When
+        no method applies, the threshold is NaN and the method is NEARFIELD or OUT_OF_RANGE.
     """
-    try:
-        p_th = exempt_milliwatts_sar(meters * 100, mhz / 1000) / 1000
-    except ValueError:
-        return exempt_watts_mpe(meters, mhz), 'MPE'
-        # That func will raise exception again if mhz still out of range.
-    try:
-        erp_th = exempt_watts_mpe(meters, mhz)
-    except ValueError:
+    cm = meters * 100
+    ghz = mhz / 1000
+    if not (0.3 <= ghz <= 6 and 0 <= cm <= 40):
+        erp_th, status = _mpe_watts(meters, mhz)
+        return erp_th, 'MPE' if status is None else status
+    elif meters < _l_over_2pi(mhz):
+        return _sar_milliwatts(cm, ghz) / 1000, 'SAR'
+    elif cm <= 20:
+        return _sar_milliwatts(cm, ghz) / 1000, 'SAR wins'
+    crossover_cm = SAR_CROSSOVER[0 if ghz < 1.5 else 1][2]
+    if crossover_cm is None or abs(cm - crossover_cm) <= 1e-9 * crossover_cm:
+        return _exempt_threshold_dual(meters, mhz)
+    elif cm < crossover_cm:
+        return _sar_milliwatts(cm, ghz) / 1000, 'SAR wins'
+    else:
+        return _mpe_watts(meters, mhz)[0], 'MPE wins'
+
+
+def _exempt_threshold_dual(meters: float, mhz: float) -> tuple:
+    """exempt_threshold() by evaluating both methods and comparing, without SAR_CROSSOVER."""
+    p_mw = _sar_milliwatts(meters * 100, mhz / 1000)
+    erp_th, status = _mpe_watts(meters, mhz)
+    if p_mw is None:
+        if status is None:
+            return erp_th, 'MPE'
+        return math.nan, status
+    p_th = p_mw / 1000
+    if status is not None:
         return p_th, 'SAR'
-    if p_th > erp_th:
+    elif p_th > erp_th:
         return p_th, 'SAR wins'
     else:
         return erp_th, 'MPE wins'
@@ -220,20 +387,30 @@ def exempt_milliwatts_sar(cm: float, ghz: float) -> float:
     :return: time-averaged power threshold for exemption (milliwatts)
     :raises ValueError: if frequency or distance out of range (0.3 - 6 GHz; 0 - 40 cm)
     """
+    p_threshold = _sar_milliwatts(cm, ghz)
+    if p_threshold is not None:
+        return p_threshold
+    elif not 0.3 <= ghz <= 6:
+        raise ValueError("frequency out of range: %s GHz" % str(ghz))
+    else:
+        raise ValueError("distance out of range: %s cm" % str(cm))
+
+
+def _sar_milliwatts(cm: float, ghz: float):
+    """exempt_milliwatts_sar() without exceptions: None if frequency or distance out of range."""
     if 0.3 <= ghz < 1.5:
         erp20 = 2040 * ghz
     elif 1.5 <= ghz <= 6:
         erp20 = 3060
     else:
-        raise ValueError("frequency out of range: %s GHz" % str(ghz))
-    x = -1 * math.log10(60 / (erp20 * math.sqrt(ghz)))
+        return None
     if 0 <= cm <= 20:
-        p_threshold = erp20 * (cm / 20) ** x
+        x = -1 * math.log10(60 / (erp20 * math.sqrt(ghz)))
+        return erp20 * (cm / 20) ** x
     elif 20 < cm <= 40:
-        p_threshold = erp20
+        return erp20
     else:
-        raise ValueError("distance out of range: %s cm" % str(cm))
-    return p_threshold
+        return None
 
 
 def exempt_watts_mpe(meters: float, mhz: float) -> float:
@@ -246,25 +423,328 @@ def exempt_watts_mpe(meters: float, mhz: float) -> float:
     :raises RFEvaluationError: if distance is within "near field" (wavelength / (2*pi)), which triggers formal RF eval.
     :raises ValueError: if mhz is out of range (0.3 MHz - 100,000 MHz)
     """
-    cutpoints = [0.3, 1.34, 30, 300, 1500, 100000]
-    functions = [
-        (lambda f, r: 1920 * r ** 2),
-        (lambda f, r: 3450 * r ** 2 / f ** 2),
-        (lambda f, r: 3.83 * r ** 2),
-        (lambda f, r: 0.0128 * r ** 2 * f),
-        (lambda f, r: 19.2 * r ** 2)
-    ]
-    c = 299792458  # m/s
-    nu = mhz * 1E6  # Hz
-    l_over_2pi = c / nu / (2 * math.pi)  # m
-    if meters < l_over_2pi:
-        l_str = str(round(l_over_2pi))
+    threshold, status = _mpe_watts(meters, mhz)
+    if status == NEARFIELD:
+        l_str = str(round(_l_over_2pi(mhz)))
         evaluation_message = "R < L/2pi (%s < %s m). RF evaluation required."
         raise RFEvaluationError(evaluation_message % (str(meters), l_str))
-    for i in range(len(cutpoints)):
-        if i == len(cutpoints) - 1:
-            raise ValueError("frequency out of range: %s MHz" % str(mhz))
-        f_low = cutpoints[i]
-        f_high = cutpoints[i + 1]
-        if f_low <= mhz < f_high:
-            return functions[i](mhz, meters)
+    elif status == OUT_OF_RANGE:
+        raise ValueError("frequency out of range: %s MHz" % str(mhz))
+    return threshold
+
+
+def _l_over_2pi(mhz: float) -> float:
+    nu = mhz * 1E6  # Hz
+    return SPEED_OF_LIGHT / nu / (2 * math.pi)  # m
+
+
+def _mpe_watts(meters: float, mhz: float) -> tuple:
+    """exempt_watts_mpe() without exceptions.
+
+    :return: A (float, str) tuple of threshold (watts) and status: None if OK, else NEARFIELD or OUT_OF_RANGE (and the
+        threshold is NaN). Near field takes precedence, as in exempt_watts_mpe().
+    """
+    if mhz <= 0:
+        return math.nan, OUT_OF_RANGE
+    if meters < _l_over_2pi(mhz):
+        return math.nan, NEARFIELD
+    i = bisect.bisect_right(BAND_EDGES_MHZ, mhz) - 1
+    if i >= _N_BANDS or _MPE_EXEMPTION_FUNCTIONS[i] is None:
+        return math.nan, OUT_OF_RANGE
+    return _MPE_EXEMPTION_FUNCTIONS[i](mhz, meters), None
+
+
+
+# SAR vs MPE crossover ########
+# Where both exemptions apply (300 - 6000 MHz, near field boundary - 40 cm), the SAR threshold wins below 20 cm by a
+# factor of at least 2.9, so only the constant stretch of the SAR formula (20 - 40 cm) needs a crossover. There the SAR
+# threshold is erp20 and the MPE threshold grows as r ** 2, so they cross at one distance, which in practice is the same
+# 39.9 cm in both SAR bands. validate_crossover() checks this index against evaluating both methods.
+
+
+def _sar_crossover_cm(ghz: float) -> float:
+    mpe_watts_at_1m = _MPE_EXEMPTION_FUNCTIONS[band_index(ghz * 1000)](ghz * 1000, 1)
+    return math.sqrt(_sar_milliwatts(40, ghz) / 1000 / mpe_watts_at_1m) * 100
+
+
+def _constant_crossover_cm(ghz_low: float, ghz_high: float):
+    """Crossover distance (cm) for a SAR band if it does not depend on frequency, or None if it does."""
+    low = _sar_crossover_cm(ghz_low)
+    high = _sar_crossover_cm(ghz_high)
+    if abs(low - high) <= 1e-12 * low:
+        return low
+    return None
+
+
+# (low GHz, high GHz, crossover cm) per SAR band. Beyond 20 cm, SAR wins closer than the crossover, MPE wins further.
+SAR_CROSSOVER = (
+    (0.3, 1.5, _constant_crossover_cm(0.3, 1.4999)),
+    (1.5, 6, _constant_crossover_cm(1.5, 6))
+)
+
+
+def validate_crossover(mhz_step: float = 5, cm_step: float = 0.05) -> list:
+    """Check exempt_threshold(), which relies on SAR_CROSSOVER, against evaluating both methods on a dense grid over
+    the range where both methods can apply, plus distances right around each crossover.
+
+    :param mhz_step: Grid spacing in frequency (megahertz)
+    :param cm_step: Grid spacing in distance (centimeters)
+    :return: List of (meters, mhz, indexed result, dual result) tuples where the two disagree. Empty if all is well.
+    """
+    distances_cm = [i * cm_step for i in range(int(40 / cm_step) + 1)]
+    for ghz_low, ghz_high, crossover_cm in SAR_CROSSOVER:
+        if crossover_cm is not None:
+            distances_cm += [crossover_cm * (1 + e) for e in (-1e-8, -1e-12, 0, 1e-12, 1e-8)]
+    mismatches = []
+    for i in range(int(5700 / mhz_step) + 1):
+        mhz = 300 + i * mhz_step
+        for cm in distances_cm:
+            indexed = exempt_threshold(cm / 100, mhz)
+            dual = _exempt_threshold_dual(cm / 100, mhz)
+            if indexed != dual and not (math.isnan(indexed[0]) and indexed[1] == dual[1]):
+                mismatches.append((cm / 100, mhz, indexed, dual))
+    return mismatches
+
+# Inverse functions #########
+# Every exemption threshold is a power law in distance (r ** 2 for MPE, (cm / 20) ** x for SAR), so the distance at
+# which a given power becomes exempt can be solved for directly instead of by sweeping distances.
+
+
+def max_exempt_watts(meters: float, mhz: float, method: str = 'generic') -> float:
+    """Calculate the power below which a source is exempt at a given distance, without raising.
+
+    :param meters: Distance from antenna to person (meters)
+    :param mhz: Frequency of the RF (megahertz)
+    :param method: 'SAR', 'MPE', or 'generic' (best of both, as exempt_watts_generic())
+    :return: Threshold power (watts). 0 if the method does not apply (near field, frequency or distance out of range).
+    :raises ValueError: if method is unknown
+    """
+    if method == 'SAR':
+        p_mw = _sar_milliwatts(meters * 100, mhz / 1000)
+        threshold = math.nan if p_mw is None else p_mw / 1000
+    elif method == 'MPE':
+        threshold = _mpe_watts(meters, mhz)[0]
+    elif method == 'generic':
+        threshold = exempt_threshold(meters, mhz)[0]
+    else:
+        raise ValueError("unknown exemption method: %s" % str(method))
+    return 0.0 if math.isnan(threshold) else threshold
+
+
+def min_exempt_distance(watts: float, mhz: float, method: str = 'generic') -> float:
+    """Calculate the smallest distance at which a source is exempt, the inverse of max_exempt_watts(). The source is
+    exempt at any distance just beyond the returned one (and at the distance itself, if that is the near field
+    boundary). SAR exemption only applies out to 40 cm, so by that method alone the source is exempt only from the
+    returned distance out to 0.4 m.
+
+    :param watts: Power
+    :param mhz: Frequency of the RF (megahertz)
+    :param method: 'SAR', 'MPE', or 'generic' (best of both, as exempt_watts_generic())
+    :return: Distance from antenna to person (meters). Infinity if the source is not exempt at any distance.
+    :raises ValueError: if method is unknown
+    """
+    if method == 'SAR':
+        return _min_exempt_meters_sar(watts, mhz)
+    elif method == 'MPE':
+        return _min_exempt_meters_mpe(watts, mhz)
+    elif method == 'generic':
+        return min(_min_exempt_meters_sar(watts, mhz), _min_exempt_meters_mpe(watts, mhz))
+    else:
+        raise ValueError("unknown exemption method: %s" % str(method))
+
+
+def _min_exempt_meters_sar(watts: float, mhz: float) -> float:
+    ghz = mhz / 1000
+    if 0.3 <= ghz < 1.5:
+        erp20 = 2040 * ghz
+    elif 1.5 <= ghz <= 6:
+        erp20 = 3060
+    else:
+        return math.inf
+    p_mw = watts * 1000
+    if p_mw >= erp20:
+        return math.inf  # threshold is at most erp20, out to 40 cm
+    elif p_mw <= 0:
+        return 0.0
+    x = -1 * math.log10(60 / (erp20 * math.sqrt(ghz)))
+    cm = 20 * (p_mw / erp20) ** (1 / x)
+    return cm / 100
+
+
+def _min_exempt_meters_mpe(watts: float, mhz: float) -> float:
+    i = bisect.bisect_right(BAND_EDGES_MHZ, mhz) - 1
+    if mhz <= 0 or i >= _N_BANDS or MPE_EXEMPTION[i] is None:
+        return math.inf
+    k, p, q = MPE_EXEMPTION[i]
+    return max(_l_over_2pi(mhz), math.sqrt(max(watts, 0) * mhz ** q / (k * mhz ** p)))
+
+
+
+# Worst case over a band #########
+# Across a band of frequencies, each piece of is_compliant() is a power law in frequency between known breakpoints: the
+# band edges of the MPE tables, the SAR edges (300, 1500 and 6000 MHz) and the near field boundary. On a log-log scale
+# each piece is a line, so the margin, a max of lines, is lowest at a breakpoint or where two lines cross. Checking
+# those few frequencies finds the worst case exactly, instead of scanning the band.
+
+
+def compliance_margin(antenna: PoweredAntenna, ft: float, mhz: float, ground_reflections: bool,
+                      controlled: bool) -> float:
+    """How far a setup is from the edge of compliance, by the same methods as is_compliant(): the larger of the
+    exemption threshold over the feedpoint power, and the MPE limit over the power density.
+
+    :return: Margin (dimensionless). The setup is compliant if it is over 1. Infinity for no power.
+    :raises ValueError: if mhz is out of range
+    """
+    threshold, method = exempt_threshold(ft * M_PER_FT, mhz)
+    if method == OUT_OF_RANGE:
+        raise ValueError("frequency out of range: %s MHz" % str(mhz))
+    limit = mpe_limits_cont_uncont_mwcm2(mhz)[0 if controlled else 1]
+    density = power_density_mwcm2(antenna.effective_isotropic_radiated_power, ft, ground_reflections)
+    exemption = 0.0 if math.isnan(threshold) else threshold / antenna.watts if antenna.watts > 0 else math.inf
+    return max(exemption, limit / density if density > 0 else math.inf)
+
+
+def _prev_float(x: float) -> float:
+    return -_next_float(-x)
+
+
+def _band_breakpoints(meters: float) -> list:
+    """Frequencies (MHz) where a piece of compliance_margin() starts, ends or changes formula, at a distance."""
+    breakpoints = list(BAND_EDGES_MHZ[1:]) + [300, 1500, 6000]
+    if meters > 0:
+        breakpoints.append(SPEED_OF_LIGHT / (2 * math.pi * meters) / 1E6)  # near field boundary
+    return breakpoints
+
+
+def _log_pieces(antenna: PoweredAntenna, ft: float, mhz: float, ground_reflections: bool, controlled: bool) -> list:
+    """Logarithms of the terms that compliance_margin() takes the largest of, where they apply and are positive."""
+    meters = ft * M_PER_FT
+    pieces = []
+    p_mw = _sar_milliwatts(meters * 100, mhz / 1000)
+    erp_th, status = _mpe_watts(meters, mhz)
+    for watts in (None if p_mw is None else p_mw / 1000, erp_th if status is None else None):
+        if watts is not None and watts > 0 and antenna.watts > 0:
+            pieces.append(math.log(watts / antenna.watts))
+    density = power_density_mwcm2(antenna.effective_isotropic_radiated_power, ft, ground_reflections)
+    if density > 0:
+        pieces.append(math.log(mpe_limits_cont_uncont_mwcm2(mhz)[0 if controlled else 1] / density))
+    return pieces
+
+
+def worst_case_over_band(antenna: PoweredAntenna, ft: float, f_lo: float, f_hi: float, ground_reflections: bool,
+                         controlled: bool) -> tuple:
+    """Find the frequency in a band where a setup is closest to (or furthest beyond) non-compliance, by checking only
+    the breakpoints of the formulas and the crossings of their pieces.
+
+    :param PoweredAntenna antenna:
+    :param ft: Distance from center of ANT to area of interest (feet)
+    :param f_lo: Lowest frequency of the band (megahertz)
+    :param f_hi: Highest frequency of the band (megahertz)
+    :param ground_reflections: Whether to account for radiation coming from ground reflections
+    :param controlled: Whether the area of interest is controlled (occupational) or uncontrolled (public)
+    :return: A (float, float, str) tuple of the limiting frequency (megahertz), the compliance_margin() there, and the
+        method is_compliant() uses there. The setup is compliant across the band if the margin is over 1.
+    :raises ValueError: if the band is empty, or any of it is out of range
+    """
+    if not 0 < f_lo <= f_hi:
+        raise ValueError("bad band: %s - %s MHz" % (str(f_lo), str(f_hi)))
+    edges = sorted({f_lo, f_hi} | {f for f in _band_breakpoints(ft * M_PER_FT) if f_lo < f < f_hi})
+    candidates = set(edges)
+    for a, b in zip(edges, edges[1:]):
+        # Each piece is continuous between edges, but may jump at them, so check both sides of each edge
+        candidates.update(f for f in (_next_float(a), _prev_float(b)) if a < f < b)
+        u1 = math.log(a) + (math.log(b) - math.log(a)) / 3
+        u2 = math.log(a) + (math.log(b) - math.log(a)) * 2 / 3
+        if not math.log(a) < u1 < u2 < math.log(b):
+            continue
+        y1 = _log_pieces(antenna, ft, math.exp(u1), ground_reflections, controlled)
+        y2 = _log_pieces(antenna, ft, math.exp(u2), ground_reflections, controlled)
+        if len(y1) != len(y2):
+            continue  # applicability changes only at edges, so this is a rounding effect at the near field boundary
+        slopes = [(y - x) / (u2 - u1) for x, y in zip(y1, y2)]
+        for i in range(len(y1)):
+            for j in range(i + 1, len(y1)):
+                if slopes[i] != slopes[j]:
+                    u = u1 + (y1[j] - y1[i]) / (slopes[i] - slopes[j])
+                    if math.log(a) < u < math.log(b) and a < math.exp(u) < b:
+                        candidates.add(math.exp(u))
+    margin, mhz = min((compliance_margin(antenna, ft, f, ground_reflections, controlled), f) for f in candidates)
+    return mhz, margin, is_compliant(antenna, ft, mhz, ground_reflections, controlled)[1]
+
+
+# Instrumentation #########
+# Opt-in counters per decision path and cumulative time per stage. enable_stats() swaps the module's functions for
+# instrumented wrappers and disable_stats() puts the originals back, so there is no cost at all while disabled. Calls
+# made through names imported before enabling (from fcc import is_compliant) are not counted. Stage timings are
+# inclusive: an evaluation includes its distance solves.
+
+# (function name, stage timed, or None; counter label from the result, or None)
+_INSTRUMENTED = (
+    ('is_compliant', None, lambda result: 'is_compliant/' + result[1]),
+    ('is_exempt', 'exemption', lambda result: 'is_exempt/' + result[1]),
+    ('exempt_threshold', None, lambda result: 'exempt_threshold/' + result[1]),
+    ('_exempt_threshold_dual', None, lambda result: 'exempt_threshold/dual evaluation'),
+    ('compliant_distance_ft', 'distance solve', None),
+    ('min_exempt_distance', 'distance solve', None),
+)
+_counters = {}
+_timings = {}  # stage: [calls, seconds]
+_originals = {}
+
+
+def _instrument(func, stage, label):
+    import functools  # only when enabling, to keep it out of the import of this module
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        if stage:
+            timing = _timings.setdefault(stage, [0, 0.0])
+            timing[0] += 1
+            timing[1] += time.perf_counter() - start
+        if label:
+            key = label(result)
+            _counters[key] = _counters.get(key, 0) + 1
+        return result
+    return wrapper
+
+
+def enable_stats():
+    """Start counting decision paths and timing stages (exemption, evaluation, distance solve)."""
+    if _originals:
+        return
+    module = globals()
+    for name, stage, label in _INSTRUMENTED:
+        _originals[name] = module[name]
+        module[name] = _instrument(module[name], stage, label)
+    _originals['RFEvaluationReport.__init__'] = RFEvaluationReport.__init__
+    RFEvaluationReport.__init__ = _instrument(RFEvaluationReport.__init__, 'evaluation', None)
+
+
+def disable_stats():
+    """Stop counting and timing. Collected stats are kept until reset_stats()."""
+    if not _originals:
+        return
+    RFEvaluationReport.__init__ = _originals.pop('RFEvaluationReport.__init__')
+    globals().update(_originals)
+    _originals.clear()
+
+
+def reset_stats():
+    """Zero all counters and timings."""
+    _counters.clear()
+    _timings.clear()
+
+
+def stats_snapshot() -> dict:
+    """:return: {'enabled': bool, 'counters': {path: count}, 'timings': {stage: {'calls': n, 'seconds': s}}}"""
+    return {
+        'enabled': bool(_originals),
+        'counters': dict(_counters),
+        'timings': {stage: {'calls': calls, 'seconds': seconds} for stage, (calls, seconds) in _timings.items()},
+    }
+
+if __name__ == '__main__':
+    import sys
+    import fcc_cli
+    sys.exit(fcc_cli.main())
@@ -0,0 +1,340 @@
+"""Benchmark suite for fcc.py and fcc_numpy.py. Run as: python -m fcc_bench --help
+
+Every public formula and batch path is timed on realistic workload mixes (HF amateur, VHF/UHF handheld, microwave,
+near field), reporting calls per second and per-call latency percentiles. Results can be saved as a JSON baseline, and
+later runs compared against it: a benchmark whose throughput drops by more than the threshold is a regression, and the
+exit status is 1.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import timeit
+
+import fcc
+
+
+def hf_vhf_uhf_mix(n: int = 10000, seed: int = 0) -> list:
+    """(watts, meters, mhz) arguments for is_exempt(), mostly HF, where the exemption chain used to raise and catch on
+    almost every call (no SAR below 300 MHz, near field at short distances)."""
+    rng = random.Random(seed)
+    bands = [(1.8, 30, 0.6), (50, 148, 0.25), (420, 450, 0.15)]  # (low MHz, high MHz, share)
+    args = []
+    for low, high, share in bands:
+        for _ in range(int(n * share)):
+            args.append((rng.uniform(1, 1500), rng.uniform(0.05, 30), rng.uniform(low, high)))
+    rng.shuffle(args)
+    return args
+
+
+# Exemption chain as it was before exempt_threshold(), kept only as a point of comparison.
+
+
+def _legacy_is_exempt(watts, meters, mhz):
+    try:
+        threshold, method = _legacy_exempt_watts_generic(meters, mhz)
+        return watts < threshold, method
+    except fcc.RFEvaluationError:
+        return False, 'nearfield'
+
+
+def _legacy_exempt_watts_generic(meters, mhz):
+    try:
+        p_th = fcc.exempt_milliwatts_sar(meters * 100, mhz / 1000) / 1000
+    except ValueError:
+        return _legacy_exempt_watts_mpe(meters, mhz), 'MPE'
+    try:
+        erp_th = _legacy_exempt_watts_mpe(meters, mhz)
+    except ValueError:
+        return p_th, 'SAR'
+    if p_th > erp_th:
+        return p_th, 'SAR wins'
+    else:
+        return erp_th, 'MPE wins'
+
+
+def _legacy_exempt_watts_mpe(meters, mhz):
+    cutpoints = [0.3, 1.34, 30, 300, 1500, 100000]
+    functions = [
+        (lambda f, r: 1920 * r ** 2),
+        (lambda f, r: 3450 * r ** 2 / f ** 2),
+        (lambda f, r: 3.83 * r ** 2),
+        (lambda f, r: 0.0128 * r ** 2 * f),
+        (lambda f, r: 19.2 * r ** 2)
+    ]
+    l_over_2pi = fcc.SPEED_OF_LIGHT / (mhz * 1E6) / (2 * math.pi)
+    if meters < l_over_2pi:
+        raise fcc.RFEvaluationError("R < L/2pi (%s < %s m). RF evaluation required." % (meters, round(l_over_2pi)))
+    for i in range(len(cutpoints) - 1):
+        if cutpoints[i] <= mhz < cutpoints[i + 1]:
+            return functions[i](mhz, meters)
+    raise ValueError("frequency out of range: %s MHz" % str(mhz))
+
+
+def portable_mix(n: int = 10000, seed: int = 0) -> list:
+    """(meters, mhz) arguments for exempt_watts_generic() where both SAR and MPE exemptions can apply."""
+    rng = random.Random(seed)
+    return [(rng.uniform(0.005, 0.4), rng.uniform(300, 6000)) for _ in range(n)]
+
+
+def calls_per_second(func, args: list, repeat: int = 5) -> float:
+    """Best-of-repeat throughput of func(*a) over all a in args."""
+    best = min(timeit.repeat(lambda: [func(*a) for a in args], number=1, repeat=repeat))
+    return len(args) / best
+
+
+def bench_is_exempt():
+    args = hf_vhf_uhf_mix()
+    assert [fcc.is_exempt(*a) for a in args] == [_legacy_is_exempt(*a) for a in args]
+    new = calls_per_second(fcc.is_exempt, args)
+    old = calls_per_second(_legacy_is_exempt, args)
+    print("is_exempt, HF/VHF/UHF mix: %.0f calls/s (raise/catch chain: %.0f calls/s, %.2fx)" % (new, old, new / old))
+
+
+def bench_crossover():
+    args = portable_mix()
+    assert [fcc.exempt_threshold(*a) for a in args] == [fcc._exempt_threshold_dual(*a) for a in args]
+    new = calls_per_second(fcc.exempt_threshold, args)
+    old = calls_per_second(fcc._exempt_threshold_dual, args)
+    print("exempt_threshold, 300-6000 MHz within 40 cm: %.0f calls/s (both methods: %.0f calls/s, %.2fx)" %
+          (new, old, new / old))
+
+
+# Suite #########
+
+
+def station_mix(workload: str, n: int = 2000, seed: int = 0) -> list:
+    """(watts, t_average, duty, dbi, ft, mhz, ground_reflections, controlled) tuples for one of WORKLOADS."""
+    rng = random.Random(seed)
+    stations = []
+    for _ in range(n):
+        if workload == 'hf_amateur':
+            mhz = rng.choice([1.85, 3.9, 7.2, 10.12, 14.2, 18.1, 21.3, 24.9, 28.4])
+            station = (rng.uniform(5, 1500), rng.choice([50, 100]), rng.choice([20, 40, 100]), rng.uniform(0, 8),
+                       rng.uniform(3, 100), mhz)
+        elif workload == 'vhf_uhf_handheld':
+            station = (rng.uniform(0.5, 8), 50, 100, rng.uniform(0, 3), rng.uniform(0.02, 3),
+                       rng.choice([rng.uniform(144, 148), rng.uniform(420, 450)]))
+        elif workload == 'microwave':
+            station = (rng.uniform(0.01, 20), 100, 100, rng.uniform(6, 25), rng.uniform(0.1, 30),
+                       rng.uniform(1000, 10000))
+        elif workload == 'near_field':
+            mhz = rng.uniform(1.8, 50)
+            station = (rng.uniform(5, 1500), 50, 40, 2.2, rng.uniform(0.1, 0.9) * fcc._l_over_2pi(mhz) / fcc.M_PER_FT,
+                       mhz)
+        else:
+            raise ValueError("unknown workload: %s" % str(workload))
+        stations.append(station + (rng.random() < 0.5, rng.random() < 0.5))
+    return stations
+
+
+WORKLOADS = ('hf_amateur', 'vhf_uhf_handheld', 'microwave', 'near_field')
+
+
+def _scalar_benchmarks(workload: str, stations: list) -> dict:
+    """{name: (function, list of argument tuples)} for the scalar functions of fcc.py on one workload."""
+    antennas = [(fcc.PoweredAntenna(*s[:4]),) + s[4:] for s in stations]
+    meters_mhz = [(s[4] * fcc.M_PER_FT, s[5]) for s in stations]
+    benchmarks = {
+        'is_compliant': (fcc.is_compliant, antennas),
+        'RFEvaluationReport': (fcc.RFEvaluationReport, [a[:4] for a in antennas]),
+        'is_exempt': (fcc.is_exempt, [(s[0],) + a for s, a in zip(stations, meters_mhz)]),
+        'exempt_threshold': (fcc.exempt_threshold, meters_mhz),
+        'mpe_limits_cont_uncont_mwcm2': (fcc.mpe_limits_cont_uncont_mwcm2, [(s[5],) for s in stations]),
+    }
+    generic = [a for a in meters_mhz if fcc.exempt_threshold(*a)[1] not in (fcc.NEARFIELD, fcc.OUT_OF_RANGE)]
+    if generic:
+        benchmarks['exempt_watts_generic'] = (fcc.exempt_watts_generic, generic)
+    mpe = [a for a in meters_mhz if fcc._mpe_watts(*a)[1] is None]
+    if mpe:
+        benchmarks['exempt_watts_mpe'] = (fcc.exempt_watts_mpe, mpe)
+    sar = [(m * 100, f / 1000) for m, f in meters_mhz if fcc._sar_milliwatts(m * 100, f / 1000) is not None]
+    if sar:
+        benchmarks['exempt_milliwatts_sar'] = (fcc.exempt_milliwatts_sar, sar)
+    return {'%s/%s' % (name, workload): b for name, b in benchmarks.items()}
+
+
+def _batch_benchmarks(workload: str, stations: list) -> dict:
+    """{name: (function, argument tuple, rows)} for the vectorized paths of fcc_numpy.py on one workload."""
+    import numpy as np
+    import fcc_numpy
+    columns = [np.array(c) for c in zip(*stations)]
+    return {
+        'is_compliant_batch/%s' % workload: (fcc_numpy.is_compliant_batch, columns, len(stations)),
+        'RFEvaluationReportBatch/%s' % workload: (fcc_numpy.RFEvaluationReportBatch, columns[:7], len(stations)),
+    }
+
+
+def _percentiles_us(samples_ns: list) -> dict:
+    samples = sorted(samples_ns)
+    return {'p%d_us' % p: samples[min(len(samples) - 1, int(len(samples) * p / 100))] / 1000 for p in (50, 90, 99)}
+
+
+def measure(func, args: list, repeat: int = 3) -> dict:
+    """Throughput (best of repeat tight loops) and per-call latency percentiles of func(*a) over all a in args."""
+    result = {'calls_per_second': calls_per_second(func, args, repeat)}
+    clock = time.perf_counter_ns
+    samples = []
+    for a in args:
+        start = clock()
+        func(*a)
+        samples.append(clock() - start)
+    result.update(_percentiles_us(samples))
+    return result
+
+
+def measure_batch(func, args: list, rows: int, repeat: int = 5) -> dict:
+    """Like measure(), for one vectorized call: calls per second counts rows, latency is per batch call."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        func(*args)
+        samples.append(time.perf_counter_ns() - start)
+    result = {'calls_per_second': rows / (min(samples) / 1e9)}
+    result.update(_percentiles_us(samples))
+    return result
+
+
+# Startup #########
+# What a script pays to call the command line once per answer, against a warm python -m fcc --serve process.
+
+STARTUP_COMMANDS = {
+    'startup/python': ['-c', 'pass'],
+    'startup/import fcc': ['-c', 'import fcc'],
+    'startup/query': ['-m', 'fcc', 'is_compliant', '100', '50', '40', '2.2', '20', '14.2', 'true', 'false'],
+}
+
+
+def measure_startup(argv: list, repeat: int = 20) -> dict:
+    """Like measure(), for running python with argv until it exits: calls per second are processes per second (best
+    of repeat), latency is per process."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        subprocess.run([sys.executable] + argv, check=True, stdout=subprocess.DEVNULL, cwd=_HERE)
+        samples.append(time.perf_counter_ns() - start)
+    result = {'calls_per_second': 1e9 / min(samples)}
+    result.update(_percentiles_us(samples))
+    return result
+
+
+def measure_served(lines: list) -> dict:
+    """Like measure(), for sending each line to a python -m fcc --serve process and reading its answer, one at a
+    time."""
+    process = subprocess.Popen([sys.executable, '-m', 'fcc', '--serve'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               universal_newlines=True, cwd=_HERE)
+    samples = []
+    try:
+        process.stdin.write(lines[0] + '\n')  # warm up: imports on the first query
+        process.stdin.flush()
+        process.stdout.readline()
+        for line in lines:
+            start = time.perf_counter_ns()
+            process.stdin.write(line + '\n')
+            process.stdin.flush()
+            process.stdout.readline()
+            samples.append(time.perf_counter_ns() - start)
+    finally:
+        process.stdin.close()
+        process.wait()
+    result = {'calls_per_second': len(samples) / (sum(samples) / 1e9)}
+    result.update(_percentiles_us(samples))
+    return result
+
+
+def run_startup(n: int = 2000, repeat: int = 20, only: str = None) -> dict:
+    """Run the startup benchmarks (or those whose name contains 'only'), as run_suite()."""
+    results = {name: measure_startup(argv, repeat) for name, argv in STARTUP_COMMANDS.items()
+               if not only or only in name}
+    if not only or only in 'startup/served query':
+        lines = [' '.join(['is_compliant'] + [str(x).lower() for x in s]) for s in station_mix('hf_amateur', n)]
+        results['startup/served query'] = measure_served(lines)
+    return results
+
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_suite(n: int = 2000, batch: bool = True, only: str = None, startup: bool = False) -> dict:
+    """Run every benchmark (or those whose name contains 'only').
+
+    :param n: Stations per workload
+    :param batch: Whether to include the fcc_numpy batch paths
+    :param startup: Whether to include the process startup benchmarks (run_startup())
+    :return: {name: {'calls_per_second': ..., 'p50_us': ..., 'p90_us': ..., 'p99_us': ...}}
+    """
+    results = {}
+    for workload in WORKLOADS:
+        stations = station_mix(workload, n)
+        for name, (func, args) in _scalar_benchmarks(workload, stations).items():
+            if not only or only in name:
+                results[name] = measure(func, args)
+        if batch:
+            for name, (func, args, rows) in _batch_benchmarks(workload, stations).items():
+                if not only or only in name:
+                    results[name] = measure_batch(func, args, rows)
+    if startup:
+        results.update(run_startup(n, only=only))
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.2) -> list:
+    """Find regressions against a baseline.
+
+    :param results: From run_suite()
+    :param baseline: From run_suite(), or the 'results' of a saved baseline file
+    :param threshold: Allowed fractional drop in calls per second
+    :return: List of (name, baseline calls/s, current calls/s) for benchmarks slower than allowed
+    """
+    regressions = []
+    for name, result in results.items():
+        if name in baseline:
+            old = baseline[name]['calls_per_second']
+            if result['calls_per_second'] < old * (1 - threshold):
+                regressions.append((name, old, result['calls_per_second']))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m fcc_bench', description=__doc__.splitlines()[0])
+    parser.add_argument('--n', type=int, default=2000, help="stations per workload (default 2000)")
+    parser.add_argument('--only', help="run only benchmarks whose name contains this")
+    parser.add_argument('--no-batch', action='store_true', help="skip the fcc_numpy batch paths")
+    parser.add_argument('--startup', action='store_true',
+                        help="also time starting python -m fcc per query, against queries to python -m fcc --serve")
+    parser.add_argument('--save', metavar='JSON', help="save results as a baseline")
+    parser.add_argument('--compare', metavar='JSON', help="compare against a saved baseline")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="fractional drop in calls/s that counts as a regression (default 0.2)")
+    parser.add_argument('--legacy', action='store_true', help="also compare against the pre-exempt_threshold() chain")
+    args = parser.parse_args(argv)
+    results = run_suite(args.n, not args.no_batch, args.only, args.startup)
+    print("%-50s %14s %10s %10s %10s" % ('benchmark', 'calls/s', 'p50 us', 'p90 us', 'p99 us'))
+    for name, r in results.items():
+        print("%-50s %14.0f %10.2f %10.2f %10.2f" % (name, r['calls_per_second'], r['p50_us'], r['p90_us'],
+                                                      r['p99_us']))
+    if args.legacy:
+        bench_is_exempt()
+        bench_crossover()
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'n': args.n, 'results': results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new in regressions:
+            print("REGRESSION %s: %.0f -> %.0f calls/s (%.0f%%)" % (name, old, new, 100 * (new / old - 1)))
+        if regressions:
+            return 1
+        print("No regressions beyond %.0f%% against %s." % (100 * args.threshold, args.compare))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
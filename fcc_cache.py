@@ -0,0 +1,162 @@
+"""Persistent cache of is_compliant() results, so that re-evaluating a station inventory only evaluates the stations that
+are new or changed. Results are stored in SQLite, keyed on the canonicalized inputs (fcc_cli.FIELDS) and on
+fcc.FORMULA_VERSION, so that a change of formulas never serves stale results.
+
+    cache = fcc_cache.ResultCache('results.sqlite')
+    results = cache.evaluate(records, fcc_cli.evaluate_chunk)  # only the misses are evaluated
+    print(cache.stats())
+
+From the command line: python -m fcc batch stations.csv --cache results.sqlite
+
+A lookup costs about as much as parsing a record, which is about what the vectorized is_compliant_batch() costs too. So
+the cache pays off when evaluation is the expensive part (the scalar paths, or slower evaluators), not for plain
+vectorized runs.
+"""
+import sqlite3
+import struct
+
+import numpy as np
+
+import fcc
+import fcc_cli
+
+_KEY = struct.Struct('<6d2?')
+_KEY_DTYPE = np.dtype([('floats', '<f8', (6,)), ('bools', '?', (2,))])  # same bytes as _KEY
+
+
+def record_key(record: dict) -> bytes:
+    """Canonical key of a record's inputs: equal for records that must give equal results (e.g. 100, '100', 100.0).
+
+    :raises ValueError, KeyError, TypeError: if the record cannot be evaluated
+    """
+    return _KEY.pack(*[float(record[k]) + 0.0 for k in fcc_cli.FIELDS[:6]],
+                     *[fcc_cli.parse_bool(record[k]) for k in fcc_cli.FIELDS[6:]])
+
+
+def record_keys(records: list) -> list:
+    """record_key() of each record, vectorized. None for records that cannot be evaluated."""
+    try:
+        table = np.empty(len(records), dtype=_KEY_DTYPE)
+        table['floats'] = np.array([[r[k] for k in fcc_cli.FIELDS[:6]] for r in records], dtype=float).reshape(-1, 6)
+        table['floats'] += 0.0
+        table['bools'] = [[fcc_cli.parse_bool(r[k]) for k in fcc_cli.FIELDS[6:]] for r in records]
+        return table.view('V%d' % _KEY.size).tolist()
+    except (ValueError, KeyError, TypeError):
+        pass
+    keys = []  # find which records are bad, one at a time
+    for r in records:
+        try:
+            keys.append(record_key(r))
+        except (ValueError, KeyError, TypeError):
+            keys.append(None)
+    return keys
+
+
+class ResultCache:
+    """On-disk map from record inputs to (compliant, method), bounded in size by evicting the least recently used.
+
+    The results of the current formula version are read into memory when the cache is opened, so that a lookup costs a
+    dict access rather than a query. Only new results are written back, and recency is written only when something has
+    to be evicted.
+    """
+    def __init__(self, path: str, max_entries: int = 1000000, version: str = fcc.FORMULA_VERSION):
+        """
+        :param path: SQLite database file, created if missing (':memory:' for a throwaway cache)
+        :param max_entries: Most results kept. Beyond that, the least recently used are evicted.
+        :param version: Formula version of the results stored and looked up
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.version = version
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS results (key BLOB NOT NULL, version TEXT NOT NULL, "
+                        "compliant INTEGER NOT NULL, method TEXT NOT NULL, used INTEGER NOT NULL, "
+                        "PRIMARY KEY (key, version))")
+        self.db.execute("CREATE TEMP TABLE touched (key BLOB PRIMARY KEY)")
+        self.entries, used = self.db.execute("SELECT COUNT(*), COALESCE(MAX(used), 0) FROM results").fetchone()
+        self.session = used + 1  # 'used' of everything stored or found from now on
+        self.results = {k: (bool(c), m) for k, c, m in self.db.execute(
+            "SELECT key, compliant, method FROM results WHERE version = ?", (version,))}
+        self.found = set()  # keys found in this session but stored in an earlier one
+        self.hits = self.misses = self.evictions = 0
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, records: list) -> tuple:
+        """Find cached results for records.
+
+        :return: (results, misses, keys): a list with the cached (compliant, method) of each record or None, the
+            indices of the records that were not found, and the key of each record (None if it cannot be evaluated)
+        """
+        keys = record_keys(records)
+        results = [self.results.get(k) for k in keys]
+        misses = [i for i, result in enumerate(results) if result is None]
+        self.found.update(k for k, result in zip(keys, results) if result is not None)
+        self.hits += len(records) - len(misses)
+        self.misses += len(misses)
+        return results, misses, keys
+
+    def fill(self, results: list, misses: list, keys: list, computed: list) -> list:
+        """Store newly computed results (except errors) and merge them into the results of lookup().
+
+        :param computed: Results for the records at indices misses, in order
+        :return: results, complete
+        """
+        new = {}
+        for i, result in zip(misses, computed):
+            results[i] = result
+            if keys[i] is not None and keys[i] not in self.results and not str(result[1]).startswith('error'):
+                new[keys[i]] = result
+        self.db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                            [(k, self.version, int(c), m, self.session) for k, (c, m) in new.items()])
+        self.results.update(new)
+        self.entries += len(new)
+        if self.entries > self.max_entries:
+            self._evict(self.entries - self.max_entries)
+        self.db.commit()
+        return results
+
+    def _evict(self, n: int):
+        """Delete the n least recently used results, after recording which ones this session used."""
+        self.db.executemany("INSERT OR IGNORE INTO touched VALUES (?)", [(k,) for k in self.found])
+        self.db.execute("UPDATE results SET used = ? WHERE version = ? AND key IN (SELECT key FROM touched)",
+                        (self.session, self.version))
+        self.db.execute("DELETE FROM touched")
+        self.found.clear()
+        evicted = self.db.execute("SELECT rowid, key, version FROM results ORDER BY used, rowid LIMIT ?", (n,)).fetchall()
+        self.db.executemany("DELETE FROM results WHERE rowid = ?", [(rowid,) for rowid, _, _ in evicted])
+        for _, key, version in evicted:
+            if version == self.version:
+                self.results.pop(key, None)
+        self.entries -= len(evicted)
+        self.evictions += len(evicted)
+
+    def evaluate(self, records: list, evaluate) -> list:
+        """Results for records, calling evaluate(list of records) -> list of results only for the cache misses."""
+        results, misses, keys = self.lookup(records)
+        return self.fill(results, misses, keys, evaluate([records[i] for i in misses]) if misses else [])
+
+    def purge(self) -> int:
+        """Delete results of other formula versions.
+
+        :return: Number of results deleted
+        """
+        deleted = self.db.execute("DELETE FROM results WHERE version != ?", (self.version,)).rowcount
+        self.db.commit()
+        self.entries -= deleted
+        return deleted
+
+    def stats(self) -> dict:
+        """:return: {'hits', 'misses', 'hit_rate', 'evictions', 'entries'} since this cache was opened"""
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions, 'entries': self.entries}
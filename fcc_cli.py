@@ -0,0 +1,315 @@
+"""Command line interface to fcc.py. Run as: python -m fcc --help
+
+batch: Evaluate a station inventory (CSV or JSONL, one station/distance/frequency per record) with is_compliant(),
+streaming it through the vectorized functions of fcc_numpy.py in chunks, so memory stays bounded however large the
+input is. Output is the input records plus 'compliant' and 'method' columns, in input order.
+
+Queries (is_compliant, is_exempt, exempt_watts_generic, max_exempt_watts, min_exempt_distance): Answer one call of the
+function of that name, with its arguments as words, for scripts that call it once per run:
+    python -m fcc is_compliant 100 50 40 2.2 20 14.2 true false
+    True	evaluation
+Queries skip the argument parser, and this module imports nothing but sys until it needs to, so a query costs little
+more than starting Python. For many queries, --serve keeps one process answering the same line protocol on
+stdin/stdout (or a Unix socket with --socket): one query per line in, one answer per line out, fields separated by
+tabs, and 'error' and a message for a query that cannot be answered.
+"""
+import sys
+
+FIELDS = ('watts', 't_average', 'duty', 'dbi', 'ft', 'mhz', 'ground_reflections', 'controlled')
+RESULT_FIELDS = ('compliant', 'method')
+
+
+def parse_bool(value) -> bool:
+    """Interpret a CSV/JSON field as a boolean.
+
+    :raises ValueError: if value is not recognizably true or false
+    """
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('true', 't', 'yes', 'y', '1'):
+        return True
+    elif text in ('false', 'f', 'no', 'n', '0'):
+        return False
+    raise ValueError("not a boolean: %s" % str(value))
+
+
+def evaluate_chunk(records: list) -> list:
+    """Evaluate is_compliant() for a list of records (dicts with FIELDS), vectorized.
+
+    :return: List of (compliant, method) tuples, in order. A record that cannot be evaluated gets ('', 'error: ...'),
+        without affecting the others.
+    """
+    import fcc
+    import fcc_numpy
+    try:
+        columns = [[float(r[k]) for r in records] for k in FIELDS[:6]]
+        columns += [[parse_bool(r[k]) for r in records] for k in FIELDS[6:]]
+        compliant, method = fcc_numpy.is_compliant_batch(*columns)
+        return list(zip(compliant.tolist(), method.tolist()))
+    except (ValueError, KeyError, TypeError, ZeroDivisionError):
+        pass
+    results = []  # find which records are bad, one at a time
+    for r in records:
+        try:
+            antenna = fcc.PoweredAntenna(*[float(r[k]) for k in FIELDS[:4]])
+            results.append(fcc.is_compliant(antenna, float(r['ft']), float(r['mhz']),
+                                            parse_bool(r['ground_reflections']), parse_bool(r['controlled'])))
+        except (ValueError, KeyError, TypeError, ZeroDivisionError) as e:
+            results.append(('', 'error: %s' % str(e)))
+    return results
+
+
+def read_records(stream, fmt: str):
+    """Yield records (dicts) from a CSV (with header) or JSONL text stream, one at a time."""
+    import csv
+    import json
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def chunked(iterable, size: int):
+    import itertools
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate_stream(records, chunk_size: int = 10000, workers: int = 1, cache=None):
+    """Yield (record, (compliant, method)) for every record, in input order.
+
+    :param records: Iterable of dicts with FIELDS
+    :param chunk_size: Records per vectorized call
+    :param workers: Number of processes. With more than one, at most 2 * workers chunks are in flight at a time.
+    :param cache: Optional fcc_cache.ResultCache. Only records not found in it are evaluated, and their results are
+        added to it.
+    """
+    chunks = chunked(records, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from zip(chunk, cache.evaluate(chunk, evaluate_chunk) if cache else evaluate_chunk(chunk))
+        return
+    import collections
+    import multiprocessing
+    with multiprocessing.Pool(workers) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            if cache:
+                looked_up = cache.lookup(chunk)
+                misses = [chunk[i] for i in looked_up[1]]
+            else:
+                looked_up, misses = None, chunk
+            pending.append((chunk, looked_up, pool.apply_async(evaluate_chunk, (misses,))))
+            if len(pending) >= 2 * workers:
+                yield from _finish(cache, *pending.popleft())
+        while pending:
+            yield from _finish(cache, *pending.popleft())
+
+
+def _finish(cache, chunk: list, looked_up: tuple, result) -> zip:
+    if looked_up is None:
+        return zip(chunk, result.get())
+    return zip(chunk, cache.fill(*looked_up, result.get()))
+
+
+class _Writer:
+    def __init__(self, stream, fmt: str):
+        self.stream = stream
+        self.fmt = fmt
+        self.csv = None
+
+    def write(self, record: dict, result: tuple):
+        row = dict(record)
+        row.update(zip(RESULT_FIELDS, result))
+        if self.fmt == 'jsonl':
+            import json
+            self.stream.write(json.dumps(row) + '\n')
+            return
+        if self.csv is None:
+            import csv
+            self.csv = csv.DictWriter(self.stream, fieldnames=list(row), extrasaction='ignore', lineterminator='\n')
+            self.csv.writeheader()
+        self.csv.writerow(row)
+
+
+def _format(path: str, fmt):
+    if fmt:
+        return fmt
+    return 'jsonl' if path.endswith(('.jsonl', '.json', '.ndjson')) else 'csv'
+
+
+def batch(args) -> int:
+    in_fmt = _format(args.input, args.input_format)
+    out_fmt = _format(args.output, args.output_format or (in_fmt if args.output == '-' else None))
+    infile = sys.stdin if args.input == '-' else open(args.input, newline='')
+    outfile = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    cache = None
+    if args.cache:
+        import fcc_cache
+        cache = fcc_cache.ResultCache(args.cache, args.cache_size)
+    n = errors = 0
+    try:
+        writer = _Writer(outfile, out_fmt)
+        for record, result in evaluate_stream(read_records(infile, in_fmt), args.chunk_size, args.workers, cache):
+            writer.write(record, result)
+            n += 1
+            errors += str(result[1]).startswith('error')
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+        if cache:
+            cache.close()
+    print("Evaluated %d records (%d errors)." % (n, errors), file=sys.stderr)
+    if cache:
+        print("Cache: %(hits)d hits, %(misses)d misses, %(evictions)d evicted, %(entries)d entries." % cache.stats(),
+              file=sys.stderr)
+    return 1 if errors else 0
+
+
+# Queries #########
+# Arguments of each query, in order. ground_reflections and controlled are booleans as parse_bool(), others numbers.
+QUERIES = {
+    'is_compliant': ('watts', 't_average', 'duty', 'dbi', 'ft', 'mhz', 'ground_reflections', 'controlled'),
+    'is_exempt': ('watts', 'meters', 'mhz'),
+    'exempt_watts_generic': ('meters', 'mhz'),
+    'max_exempt_watts': ('meters', 'mhz'),
+    'min_exempt_distance': ('watts', 'mhz'),
+}
+_query_functions = {}
+
+
+def _load_queries() -> dict:
+    """{query: function of the query's words}, importing fcc on first use."""
+    if not _query_functions:
+        import fcc
+
+        def is_compliant(watts, t_average, duty, dbi, ft, mhz, ground_reflections, controlled):
+            antenna = fcc.PoweredAntenna(float(watts), float(t_average), float(duty), float(dbi))
+            return fcc.is_compliant(antenna, float(ft), float(mhz), parse_bool(ground_reflections),
+                                    parse_bool(controlled))
+
+        _query_functions.update({
+            'is_compliant': is_compliant,
+            'is_exempt': lambda watts, meters, mhz: fcc.is_exempt(float(watts), float(meters), float(mhz)),
+            'exempt_watts_generic': lambda meters, mhz: fcc.exempt_watts_generic(float(meters), float(mhz)),
+            'max_exempt_watts': lambda meters, mhz: fcc.max_exempt_watts(float(meters), float(mhz)),
+            'min_exempt_distance': lambda watts, mhz: fcc.min_exempt_distance(float(watts), float(mhz)),
+        })
+    return _query_functions
+
+
+def answer(line: str) -> str:
+    """Answer one line of the query protocol: a query name from QUERIES and its arguments, separated by whitespace.
+
+    :return: The result, with the fields of a tuple separated by tabs, or 'error', a tab and why. No newline.
+    """
+    words = line.split()
+    functions = _query_functions or _load_queries()
+    if not words or words[0] not in functions:
+        return "error\tunknown query: %s (one of %s)" % (words[0] if words else '', ', '.join(QUERIES))
+    try:
+        result = functions[words[0]](*words[1:])
+    except TypeError:
+        return "error\tusage: %s %s" % (words[0], ' '.join(QUERIES[words[0]]))
+    except (ValueError, ZeroDivisionError) as e:
+        return "error\t%s" % str(e)
+    if type(result) is tuple:
+        return '\t'.join(map(str, result))
+    return str(result)
+
+
+def serve(infile, outfile):
+    """Answer queries line by line until the end of infile. Each answer is flushed as soon as it is written, so a
+    script can hold the process open and send one query at a time."""
+    for line in infile:
+        outfile.write(answer(line) + '\n')
+        outfile.flush()
+
+
+def socket_server(path: str):
+    """A server answering the query protocol on a Unix socket, a thread per connection. Replaces a stale socket file.
+
+    :return: socketserver.ThreadingUnixStreamServer, to serve_forever() and close
+    """
+    import os
+    import socketserver
+    import stat
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                self.wfile.write((answer(line.decode()) + '\n').encode())
+
+    if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+        os.unlink(path)
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True  # idle clients do not keep the server from closing
+    server.block_on_close = False
+    return server
+
+
+def query(args) -> int:
+    text = answer(' '.join([args.command] + args.arguments))
+    print(text)
+    return 1 if text.startswith('error') else 0
+
+
+def build_parser():
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m fcc', description="FCC RF exposure formulas")
+    parser.add_argument('--serve', action='store_true', help="answer queries, one per line, on stdin/stdout")
+    parser.add_argument('--socket', metavar='PATH', help="with --serve, answer on this Unix socket instead")
+    commands = parser.add_subparsers(dest='command')
+    p = commands.add_parser('batch', help="evaluate a station inventory with is_compliant()",
+                            description="Evaluate a CSV/JSONL station inventory with columns %s." % ', '.join(FIELDS))
+    p.add_argument('input', help="input file, or - for stdin")
+    p.add_argument('-o', '--output', default='-', help="output file, or - for stdout (default)")
+    p.add_argument('--input-format', choices=['csv', 'jsonl'], help="default: from file extension, else csv")
+    p.add_argument('--output-format', choices=['csv', 'jsonl'], help="default: from file extension, else csv")
+    p.add_argument('--chunk-size', type=int, default=10000, help="records per vectorized call (default 10000)")
+    p.add_argument('--workers', type=int, default=1, help="processes to spread chunks across (default 1)")
+    p.add_argument('--cache', metavar='SQLITE', help="reuse and store results in this cache file")
+    p.add_argument('--cache-size', type=int, default=1000000, help="most results kept in the cache (default 1e6)")
+    p.set_defaults(func=batch)
+    for name, arguments in QUERIES.items():
+        p = commands.add_parser(name, help="answer one %s() call" % name, usage="%%(prog)s %s" % ' '.join(arguments))
+        p.add_argument('arguments', nargs='*', help=' '.join(arguments))
+        p.set_defaults(func=query)
+    return parser
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in QUERIES and not {'-h', '--help'} & set(argv):
+        text = answer(' '.join(argv))  # the common case of a script, without building the parser
+        print(text)
+        return 1 if text.startswith('error') else 0
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.serve:
+        if args.socket is None:
+            serve(sys.stdin, sys.stdout)
+            return 0
+        with socket_server(args.socket) as server:
+            print("Answering queries on %s." % args.socket, file=sys.stderr)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        return 0
+    if args.command is None:
+        parser.error("a command or --serve is required")
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
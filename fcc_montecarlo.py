@@ -0,0 +1,247 @@
+"""Monte Carlo uncertainty of an RF evaluation. Feedline loss, antenna gain, duty and distance are rarely known exactly:
+describe each input as a distribution, and estimate the distribution of power density, percent of MPE and compliant
+distance, and the probability that the MPE limit is exceeded. Samples are drawn and evaluated in vectorized blocks and
+folded into streaming statistics, so memory does not grow with the number of samples.
+
+    result = fcc_montecarlo.run({'watts': ('uniform', 70, 100), 't_average': 50, 'duty': 40,
+                                 'dbi': ('normal', 2.2, 0.5), 'ft': ('triangular', 8, 10, 12)},
+                                mhz=14.2, ground_reflections=True, samples=10 ** 7, workers=4)
+    result.exceedance_probability(controlled=False)
+
+Each block of samples has its own random stream, derived from the seed and the block number, so a run gives the same
+result whatever the number of workers.
+"""
+import collections
+import math
+
+import numpy as np
+
+import fcc_numpy
+
+PARAMETERS = ('watts', 't_average', 'duty', 'dbi', 'ft')
+QUANTITIES = ('power_density', 'percent_mpe_c', 'percent_mpe_u', 'ft_c', 'ft_u')
+
+
+def draw(rng: np.random.Generator, spec, n: int) -> np.ndarray:
+    """Draw n samples of one input.
+
+    :param spec: A number (no uncertainty), or ('normal', mean, sd), ('uniform', low, high),
+        ('triangular', low, mode, high) or ('lognormal', median, sigma of the log)
+    :raises ValueError: if the distribution is unknown
+    """
+    if not isinstance(spec, (tuple, list)):
+        return np.full(n, float(spec))
+    kind, args = spec[0], spec[1:]
+    if kind == 'normal':
+        return rng.normal(args[0], args[1], n)
+    elif kind == 'uniform':
+        return rng.uniform(args[0], args[1], n)
+    elif kind == 'triangular':
+        return rng.triangular(args[0], args[1], args[2], n)
+    elif kind == 'lognormal':
+        return rng.lognormal(math.log(args[0]), args[1], n)
+    raise ValueError("unknown distribution: %s" % str(kind))
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream of values, in one pass (Welford, merged per block as by Chan et
+    al.), without keeping the values"""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values: np.ndarray):
+        block = RunningStats()
+        block.count = len(values)
+        if not block.count:
+            return
+        block.mean = float(np.mean(values))
+        block.m2 = float(np.sum((values - block.mean) ** 2))
+        block.min = float(np.min(values))
+        block.max = float(np.max(values))
+        self.merge(block)
+
+    def merge(self, other: 'RunningStats'):
+        n = self.count + other.count
+        if not other.count:
+            return
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (n - 1 denominator)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """Quantiles of a stream of positive values to within a relative accuracy, from counts in logarithmic buckets
+    (as DDSketch). Mergeable, and its size grows with the logarithm of the range of values, not their number."""
+    def __init__(self, relative_accuracy: float = 0.005):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = collections.Counter()  # i: count of values in (gamma ** (i - 1), gamma ** i]
+        self.zeros = 0  # values <= 0
+        self.infinities = 0
+        self.count = 0
+
+    def add(self, values: np.ndarray):
+        values = np.asarray(values, dtype=float)
+        positive = values[(values > 0) & np.isfinite(values)]
+        self.zeros += int(np.count_nonzero(values <= 0))
+        self.infinities += int(np.count_nonzero(np.isinf(values) & (values > 0)))
+        if len(positive):
+            index = np.ceil(np.log(positive) / self.log_gamma).astype(np.int64)
+            low = int(index.min())
+            counts = np.bincount(index - low)
+            present = np.flatnonzero(counts)
+            self.buckets.update(dict(zip((present + low).tolist(), counts[present].tolist())))
+        self.count += len(values)
+
+    def merge(self, other: 'QuantileSketch'):
+        self.buckets.update(other.buckets)
+        self.zeros += other.zeros
+        self.infinities += other.infinities
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """:return: Value at quantile q (0 to 1), within relative_accuracy; 0 for the values <= 0, nan if empty"""
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if rank < seen:
+                return 2 * self.gamma ** i / (self.gamma + 1)  # middle of the bucket, in relative terms
+        return math.inf
+
+
+class MonteCarloResult:
+    """Streaming statistics of each of QUANTITIES, and counts of samples over the MPE limits"""
+    def __init__(self, relative_accuracy: float = 0.005):
+        self.stats = {name: RunningStats() for name in QUANTITIES}
+        self.sketches = {name: QuantileSketch(relative_accuracy) for name in QUANTITIES}
+        self.samples = 0
+        self.exceedances = {True: 0, False: 0}  # controlled: samples at or over the limit
+
+    def add(self, quantities: dict):
+        for name in QUANTITIES:
+            self.stats[name].add(quantities[name])
+            self.sketches[name].add(quantities[name])
+        self.samples += len(quantities['power_density'])
+        self.exceedances[True] += int(np.count_nonzero(quantities['percent_mpe_c'] >= 100))
+        self.exceedances[False] += int(np.count_nonzero(quantities['percent_mpe_u'] >= 100))
+
+    def merge(self, other: 'MonteCarloResult'):
+        for name in QUANTITIES:
+            self.stats[name].merge(other.stats[name])
+            self.sketches[name].merge(other.sketches[name])
+        self.samples += other.samples
+        for controlled in self.exceedances:
+            self.exceedances[controlled] += other.exceedances[controlled]
+
+    def exceedance_probability(self, controlled: bool) -> float:
+        """:return: Fraction of samples where the power density is at or above the MPE limit (not compliant)"""
+        return self.exceedances[controlled] / self.samples if self.samples else math.nan
+
+    def exceedance_stderr(self, controlled: bool) -> float:
+        """:return: Standard error of exceedance_probability() (binomial)"""
+        p = self.exceedance_probability(controlled)
+        return math.sqrt(p * (1 - p) / self.samples) if self.samples else math.nan
+
+    def quantile(self, name: str, q: float) -> float:
+        """:return: Quantile q (0 to 1) of one of QUANTITIES, within the sketch's relative accuracy"""
+        return self.sketches[name].quantile(q)
+
+    def __str__(self):
+        lines = ["%d samples" % self.samples]
+        for name in QUANTITIES:
+            s = self.stats[name]
+            lines.append("%s: mean %.6g, std %.6g, 5%% %.6g, 50%% %.6g, 95%% %.6g" % (
+                name, s.mean, s.std, self.quantile(name, 0.05), self.quantile(name, 0.5), self.quantile(name, 0.95)))
+        for controlled, label in ((True, 'controlled'), (False, 'uncontrolled')):
+            lines.append("P(exceeds %s limit): %.6g +/- %.2g" % (label, self.exceedance_probability(controlled),
+                                                                 self.exceedance_stderr(controlled)))
+        return '\n'.join(lines)
+
+
+def evaluate_samples(inputs: dict, mhz, ground_reflections: bool) -> dict:
+    """The RFEvaluationReport quantities of each sample.
+
+    :param inputs: {name: array} for each of PARAMETERS. t_average and duty are clipped to [0, 100], watts to >= 0.
+    :return: {name: array} for each of QUANTITIES
+    """
+    t_average = np.clip(inputs['t_average'], 0, 100)
+    duty = np.clip(inputs['duty'], 0, 100)
+    eirp = fcc_numpy.effective_isotropic_radiated_power(np.maximum(inputs['watts'], 0), t_average, duty, inputs['dbi'])
+    limit_c, limit_u = fcc_numpy.mpe_limits_cont_uncont_mwcm2(mhz)
+    with np.errstate(divide='ignore'):
+        density = fcc_numpy.power_density_mwcm2(eirp, inputs['ft'], ground_reflections)
+    return {'power_density': density, 'percent_mpe_c': 100 * density / limit_c,
+            'percent_mpe_u': 100 * density / limit_u,
+            'ft_c': fcc_numpy.compliant_distance_ft(eirp, limit_c, ground_reflections),
+            'ft_u': fcc_numpy.compliant_distance_ft(eirp, limit_u, ground_reflections)}
+
+
+def run_block(inputs: dict, mhz: float, ground_reflections: bool, seed: int, block: int, size: int,
+              relative_accuracy: float = 0.005) -> MonteCarloResult:
+    """Statistics of one block of samples, drawn from the random stream of (seed, block)."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+    samples = {name: draw(rng, inputs[name], size) for name in PARAMETERS}
+    result = MonteCarloResult(relative_accuracy)
+    result.add(evaluate_samples(samples, mhz, ground_reflections))
+    return result
+
+
+def _run_block(args):
+    return run_block(*args)
+
+
+def run(inputs: dict, mhz: float, ground_reflections: bool, samples: int = 10 ** 6, block_size: int = 1 << 16,
+        seed: int = 0, workers: int = 1, relative_accuracy: float = 0.005) -> MonteCarloResult:
+    """Monte Carlo estimate of the RF evaluation of uncertain inputs.
+
+    :param inputs: {name: distribution spec (see draw())} for each of PARAMETERS
+    :param mhz: Frequency of RF radiation (megahertz)
+    :param ground_reflections: Whether to account for radiation coming from ground reflections
+    :param samples: Total number of samples
+    :param block_size: Samples per vectorized block. Part of the random streams: the same seed and block size give
+        the same result.
+    :param seed: Seed of the random streams
+    :param workers: Number of processes. Does not change the result.
+    :param relative_accuracy: Relative accuracy of the quantiles
+    :raises ValueError: if an input is missing, a distribution is unknown, or mhz is out of range
+    """
+    missing = [name for name in PARAMETERS if name not in inputs]
+    if missing:
+        raise ValueError("missing inputs: %s" % ', '.join(missing))
+    if np.isnan(fcc_numpy.mpe_limits_cont_uncont_mwcm2(mhz)[0]):
+        raise ValueError("frequency out of range: %s MHz" % str(mhz))
+    inputs = dict(inputs)
+    tasks = [(inputs, mhz, ground_reflections, seed, block, min(block_size, samples - start), relative_accuracy)
+             for block, start in enumerate(range(0, samples, block_size))]
+    result = MonteCarloResult(relative_accuracy)
+    if workers <= 1:
+        for task in tasks:
+            result.merge(_run_block(task))
+        return result
+    import multiprocessing
+    with multiprocessing.Pool(workers) as pool:
+        for block_result in pool.imap(_run_block, tasks):  # merged in block order, so the sums are reproducible
+            result.merge(block_result)
+    return result
@@ -0,0 +1,375 @@
+"""Vectorized (NumPy) versions of the formulas in fcc.py, for evaluating many stations at once.
+
+Every function here takes array-like arguments (broadcast against each other) and mirrors the scalar function of the
+same name in fcc.py, element for element. Piecewise definitions are evaluated with masks rather than per-element
+branching. Where the scalar function would raise for an element, the threshold functions here return NaN for that
+element instead, and the batch entry points raise once for the whole batch.
+
+NumPy's log10 and power are not bit-for-bit identical to the math module's, so thresholds may differ from the scalar
+ones in the last place. Decisions (exempt or not, SAR or MPE, compliant or not) never do: elements whose comparison is
+within TIE_RTOL of a tie are re-decided with the scalar functions in fcc.py.
+"""
+import numpy as np
+
+import fcc
+
+METHODS = np.array(['SAR', 'MPE', 'SAR wins', 'MPE wins', 'evaluation', 'nearfield'])
+SAR, MPE, SAR_WINS, MPE_WINS, EVALUATION, NEARFIELD = range(len(METHODS))
+TIE_RTOL = 1e-9
+
+
+def _floats(*args):
+    return np.broadcast_arrays(*[np.asarray(a, dtype=float) for a in args])
+
+
+def _ties(a, b):
+    """Elements where a and b are too close to compare reliably across math implementations."""
+    with np.errstate(invalid='ignore'):
+        return np.abs(a - b) <= TIE_RTOL * np.maximum(np.abs(a), np.abs(b))
+
+
+def reflection_constant(ground_reflections) -> np.ndarray:
+    """Vectorized fcc.reflection_constant().
+
+    :param ground_reflections: Array of bool
+    :return: Array of coefficients (dimensionless)
+    :raises ValueError: if ground_reflections is not a boolean array
+    """
+    gr = np.asarray(ground_reflections)
+    if gr.dtype != bool:
+        raise ValueError("ground_reflections must be boolean: %s" % str(gr.dtype))
+    return np.where(gr, fcc.reflection_constant(True), fcc.reflection_constant(False))
+
+
+def effective_isotropic_radiated_power(watts, t_average, duty, dbi) -> np.ndarray:
+    """Vectorized PoweredAntenna.effective_isotropic_radiated_power.
+
+    :return: EIRP (milliwatts)
+    :raises ValueError: if any t_average / duty is out of range
+    """
+    watts, t_average, duty, dbi = _floats(watts, t_average, duty, dbi)
+    bad = ~((0 <= t_average) & (t_average <= 100) & (0 <= duty) & (duty <= 100))
+    if bad.any():
+        i = np.flatnonzero(bad)[0]
+        raise ValueError("t_average / duty out of range: %s / %s" % (str(t_average.flat[i]), str(duty.flat[i])))
+    milliwatts_average = 1000 * watts * (t_average / 100) * (duty / 100)
+    return milliwatts_average * (10 ** (dbi / 10))
+
+
+def power_density_mwcm2(eirp_mw, ft, ground_reflections) -> np.ndarray:
+    """Vectorized fcc.power_density_mwcm2(). Units as in that function."""
+    eirp_mw, ft = _floats(eirp_mw, ft)
+    cm = ft * fcc.CM_PER_FT
+    return reflection_constant(ground_reflections) * eirp_mw / (4 * np.pi * (cm ** 2))
+
+
+def compliant_distance_ft(eirp_mw, mpe_limit_mwcm2, ground_reflections) -> np.ndarray:
+    """Vectorized fcc.compliant_distance_ft(). Units as in that function."""
+    eirp_mw, mpe_limit_mwcm2 = _floats(eirp_mw, mpe_limit_mwcm2)
+    centimeters = np.sqrt(reflection_constant(ground_reflections) * eirp_mw / (4 * np.pi * mpe_limit_mwcm2))
+    return centimeters / fcc.CM_PER_FT
+
+
+def _band_coefficients(rows: tuple, width: int) -> np.ndarray:
+    """Per-band coefficient table as a 2D array, plus a final all-NaN row for frequencies out of range."""
+    missing = (np.nan,) * width
+    return np.array([missing if row is None else row for row in rows] + [missing], dtype=float)
+
+
+_BAND_EDGES_MHZ = np.array(fcc.BAND_EDGES_MHZ, dtype=float)
+_OUT_OF_BAND = len(fcc.BAND_EDGES_MHZ) - 1
+_MPE_LIMIT_CONTROLLED = _band_coefficients(fcc.MPE_LIMIT_CONTROLLED, 4)
+_MPE_LIMIT_UNCONTROLLED = _band_coefficients(fcc.MPE_LIMIT_UNCONTROLLED, 4)
+_MPE_EXEMPTION = _band_coefficients(fcc.MPE_EXEMPTION, 3)
+
+
+def band_index(mhz) -> np.ndarray:
+    """Vectorized fcc.band_index(), one sorted search for the whole array.
+
+    :param mhz: Array of frequencies (megahertz)
+    :return: Array of indices into the per-band tables of fcc.py, with len(fcc.BAND_EDGES_MHZ) - 1 where mhz is out
+        of range
+    """
+    i = np.searchsorted(_BAND_EDGES_MHZ, mhz, side='right') - 1
+    return np.where((i < 0) | (i >= _OUT_OF_BAND), _OUT_OF_BAND, i)
+
+
+def mpe_limits_cont_uncont_mwcm2(mhz) -> tuple:
+    """Vectorized fcc.mpe_limits_cont_uncont_mwcm2().
+
+    :param mhz: Array of frequencies (megahertz)
+    :return: (controlled, uncontrolled) arrays of MPE limits (mW/cm^2), NaN where mhz is out of range
+    """
+    mhz = np.asarray(mhz, dtype=float)
+    i = np.where(mhz <= 0, _OUT_OF_BAND, band_index(mhz))
+    limits = []
+    for table in (_MPE_LIMIT_CONTROLLED, _MPE_LIMIT_UNCONTROLLED):
+        a, p, b, q = np.moveaxis(table[i], -1, 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            limits.append(a * mhz ** p / (b * mhz ** q))
+    return tuple(limits)
+
+
+def exempt_milliwatts_sar(cm, ghz) -> np.ndarray:
+    """Vectorized fcc.exempt_milliwatts_sar().
+
+    :param cm: Distance from antenna to person (centimeters)
+    :param ghz: Frequency of RF source (gigahertz)
+    :return: Power threshold for exemption (milliwatts), NaN where frequency or distance is out of range
+    """
+    cm, ghz = _floats(cm, ghz)
+    valid = (0.3 <= ghz) & (ghz <= 6) & (0 <= cm) & (cm <= 40)
+    erp20 = np.where(ghz < 1.5, 2040 * ghz, 3060.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = -1 * np.log10(60 / (erp20 * np.sqrt(ghz)))
+        p_threshold = np.where(cm <= 20, erp20 * (cm / 20) ** x, erp20)
+    return np.where(valid, p_threshold, np.nan)
+
+
+def nearfield(meters, mhz) -> np.ndarray:
+    """Whether each distance is within wavelength / (2*pi), where fcc.exempt_watts_mpe() requires RF evaluation.
+
+    :param meters: Distance from source to area of interest (meters)
+    :param mhz: Frequency of the source (megahertz)
+    :return: Array of bool
+    """
+    meters, mhz = _floats(meters, mhz)
+    nu = mhz * 1E6  # Hz
+    with np.errstate(divide='ignore'):
+        l_over_2pi = fcc.SPEED_OF_LIGHT / nu / (2 * np.pi)  # m
+    return meters < l_over_2pi
+
+
+def exempt_watts_mpe(meters, mhz) -> np.ndarray:
+    """Vectorized fcc.exempt_watts_mpe().
+
+    :param meters: Distance from source to area of interest (meters)
+    :param mhz: Frequency of the source (megahertz)
+    :return: ERP threshold for exemption (watts), NaN in the near field or where mhz is out of range
+    """
+    r, f = _floats(meters, mhz)
+    k, p, q = np.moveaxis(_MPE_EXEMPTION[band_index(f)], -1, 0)
+    with np.errstate(invalid='ignore'):
+        threshold = k * r ** 2 * f ** p / f ** q
+    return np.where(nearfield(r, f), np.nan, threshold)
+
+
+def exempt_watts_generic(meters, mhz) -> tuple:
+    """Vectorized fcc.exempt_watts_generic(), best of SAR and MPE exemption.
+
+    :param meters: Distance from antenna to person (meters)
+    :param mhz: Frequency of the RF (megahertz)
+    :return: (threshold, method) arrays. Threshold in watts. Method holds indices into METHODS; elements where the
+        scalar function would raise get NaN and NEARFIELD (near field) or -1 (frequency out of range).
+    """
+    meters, mhz = _floats(meters, mhz)
+    p_th = exempt_milliwatts_sar(meters * 100, mhz / 1000) / 1000
+    erp_th = exempt_watts_mpe(meters, mhz)
+    sar_ok = ~np.isnan(p_th)
+    mpe_ok = ~np.isnan(erp_th)
+    near = nearfield(meters, mhz)
+    method = np.select(
+        [sar_ok & mpe_ok & (p_th > erp_th), sar_ok & mpe_ok, sar_ok, mpe_ok, near],
+        [SAR_WINS, MPE_WINS, SAR, MPE, NEARFIELD], -1)
+    threshold = np.select([(method == SAR) | (method == SAR_WINS), (method == MPE) | (method == MPE_WINS)],
+                          [p_th, erp_th], np.nan)
+    for i in np.flatnonzero(_ties(p_th, erp_th)):
+        threshold.flat[i], name = fcc.exempt_watts_generic(float(meters.flat[i]), float(mhz.flat[i]))
+        method.flat[i] = list(METHODS).index(name)
+    return threshold, method
+
+
+def is_exempt_batch(watts, meters, mhz) -> tuple:
+    """Vectorized fcc.is_exempt().
+
+    :param watts: Power
+    :param meters: Distance from antenna to person (meters)
+    :param mhz: Frequency of the RF (megahertz)
+    :return: A (bool array, str array) tuple of whether each setup is exempt, and the method / reason (see METHODS)
+    :raises ValueError: if any mhz is out of range
+    """
+    watts, meters, mhz = _floats(watts, meters, mhz)
+    threshold, method = exempt_watts_generic(meters, mhz)
+    if (method == -1).any():
+        raise ValueError("frequency out of range: %s MHz" % str(mhz.flat[np.flatnonzero(method == -1)[0]]))
+    exempt = watts < threshold  # False where NaN, i.e. near field
+    for i in np.flatnonzero(_ties(watts, threshold)):
+        exempt.flat[i], name = fcc.is_exempt(float(watts.flat[i]), float(meters.flat[i]), float(mhz.flat[i]))
+        method.flat[i] = list(METHODS).index(name)
+    return exempt, METHODS[method]
+
+
+def is_compliant_batch(watts, t_average, duty, dbi, ft, mhz, ground_reflections, controlled, eirp=None) -> tuple:
+    """Vectorized fcc.is_compliant(), for many (antenna, distance, frequency) combinations at once. Arguments are
+    arrays of the fields of PoweredAntenna followed by the arguments of fcc.is_compliant(), broadcast together.
+
+    :param eirp: Optional precomputed effective_isotropic_radiated_power of each antenna (milliwatts), e.g. a stored
+        column of fcc_stations, to skip computing it (and checking t_average / duty)
+    :return: A (bool array, str array) tuple of whether each setup is compliant, and the method used (see METHODS)
+    :raises ValueError: if any element would make fcc.is_compliant() raise
+    """
+    watts, t_average, duty, dbi, ft, mhz, ground_reflections, controlled = np.broadcast_arrays(
+        watts, t_average, duty, dbi, ft, mhz, ground_reflections, controlled)
+    if eirp is None:
+        eirp = effective_isotropic_radiated_power(watts, t_average, duty, dbi)
+    exempt, method = is_exempt_batch(watts, ft * fcc.M_PER_FT, mhz)
+    limit_c, limit_u = mpe_limits_cont_uncont_mwcm2(mhz)
+    limit = np.where(controlled, limit_c, limit_u)
+    bad = ~exempt & np.isnan(limit)
+    if bad.any():
+        raise ValueError("frequency out of range: %s MHz" % str(mhz.flat[np.flatnonzero(bad)[0]]))
+    with np.errstate(divide='ignore'):
+        density = power_density_mwcm2(eirp, ft, ground_reflections)
+    compliant = exempt | (density < limit)
+    for i in np.flatnonzero(~exempt & _ties(density, limit)):
+        antenna = fcc.PoweredAntenna(float(watts.flat[i]), float(t_average.flat[i]), float(duty.flat[i]),
+                                     float(dbi.flat[i]))
+        compliant.flat[i], _ = fcc.is_compliant(antenna, float(ft.flat[i]), float(mhz.flat[i]),
+                                                bool(ground_reflections.flat[i]), bool(controlled.flat[i]))
+    return compliant, np.where(exempt, method, METHODS[EVALUATION])
+
+
+class RFEvaluationReportBatch:
+    """Columnar (struct-of-arrays) counterpart of fcc.RFEvaluationReport, holding N evaluations in contiguous arrays.
+    Indexing with an integer returns a row view that reads like an RFEvaluationReport; indexing with a slice or mask
+    returns a smaller batch.
+    """
+    columns = ('effective_isotropic_radiated_power', 'ft', 'mhz', 'ground_reflections', 'power_density',
+               'power_density_c', 'power_density_u', 'ft_c', 'ft_u', 'compliant_c', 'compliant_u')
+
+    def __init__(self, watts, t_average, duty, dbi, ft, mhz, ground_reflections):
+        """Arguments are arrays of the fields of PoweredAntenna followed by the arguments of fcc.RFEvaluationReport,
+        broadcast together into one dimension.
+
+        :raises ValueError: if any t_average / duty or mhz is out of range
+        """
+        watts, t_average, duty, dbi, ft, mhz, ground_reflections = [np.ravel(a) for a in np.broadcast_arrays(
+            watts, t_average, duty, dbi, ft, mhz, ground_reflections)]
+        eirp = effective_isotropic_radiated_power(watts, t_average, duty, dbi)
+        power_density_c, power_density_u = mpe_limits_cont_uncont_mwcm2(mhz)
+        if np.isnan(power_density_c).any():
+            raise ValueError("frequency out of range: %s MHz" % str(mhz[np.isnan(power_density_c)][0]))
+        with np.errstate(divide='ignore'):
+            power_density = power_density_mwcm2(eirp, ft, ground_reflections)
+        self._set(eirp, ft.astype(float), mhz.astype(float), ground_reflections, power_density,
+                  power_density_c, power_density_u,
+                  compliant_distance_ft(eirp, power_density_c, ground_reflections),
+                  compliant_distance_ft(eirp, power_density_u, ground_reflections),
+                  power_density < power_density_c, power_density < power_density_u)
+
+    def _set(self, *arrays):
+        for name, array in zip(self.columns, arrays):
+            setattr(self, name, array)
+
+    @classmethod
+    def _from_columns(cls, *arrays):
+        batch = cls.__new__(cls)
+        batch._set(*arrays)
+        return batch
+
+    def __len__(self):
+        return len(self.power_density)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            if not -len(self) <= key < len(self):
+                raise IndexError("report index out of range: %s" % str(key))
+            return RFEvaluationRow(self, key % len(self))
+        return self._from_columns(*[getattr(self, name)[key] for name in self.columns])
+
+    def __iter__(self):
+        return (RFEvaluationRow(self, i) for i in range(len(self)))
+
+    def __repr__(self):
+        return "<RFEvaluationReportBatch of %d evaluations>" % len(self)
+
+    def to_numpy(self) -> np.ndarray:
+        """:return: Structured array with one field per column"""
+        table = np.empty(len(self), dtype=[(name, getattr(self, name).dtype) for name in self.columns])
+        for name in self.columns:
+            table[name] = getattr(self, name)
+        return table
+
+    def to_csv(self, file):
+        """Write all evaluations as CSV with a header row.
+
+        :param file: Path or writable text file handle
+        """
+        table = self.to_numpy()
+        formats = ['%d' if table.dtype[name] == bool else '%.17g' for name in self.columns]
+        np.savetxt(file, table, fmt=formats, delimiter=',', header=','.join(self.columns), comments='')
+
+
+class RFEvaluationRow:
+    """One evaluation within an RFEvaluationReportBatch. Has the same result attributes as fcc.RFEvaluationReport,
+    read from the batch's arrays rather than copied.
+    """
+    __slots__ = ('batch', 'index')
+
+    def __init__(self, batch: RFEvaluationReportBatch, index: int):
+        self.batch = batch
+        self.index = index
+
+    def __getattr__(self, name):
+        if name in RFEvaluationReportBatch.columns:
+            return getattr(self.batch, name)[self.index].item()
+        raise AttributeError(name)
+
+    def __repr__(self):
+        return "<RFEvaluationRow %d of %s>" % (self.index, repr(self.batch))
+
+    __str__ = fcc.RFEvaluationReport._render
+
+
+def max_exempt_watts(meters, mhz, method: str = 'generic') -> np.ndarray:
+    """Vectorized fcc.max_exempt_watts().
+
+    :return: Threshold power (watts), 0 where the method does not apply
+    :raises ValueError: if method is unknown
+    """
+    meters, mhz = _floats(meters, mhz)
+    if method == 'SAR':
+        threshold = exempt_milliwatts_sar(meters * 100, mhz / 1000) / 1000
+    elif method == 'MPE':
+        threshold = exempt_watts_mpe(meters, mhz)
+    elif method == 'generic':
+        threshold = exempt_watts_generic(meters, mhz)[0]
+    else:
+        raise ValueError("unknown exemption method: %s" % str(method))
+    return np.nan_to_num(threshold, nan=0.0)
+
+
+def min_exempt_distance(watts, mhz, method: str = 'generic') -> np.ndarray:
+    """Vectorized fcc.min_exempt_distance().
+
+    :return: Distance from antenna to person (meters), infinity where the source is not exempt at any distance
+    :raises ValueError: if method is unknown
+    """
+    watts, mhz = _floats(watts, mhz)
+    if method == 'SAR':
+        return _min_exempt_meters_sar(watts, mhz)
+    elif method == 'MPE':
+        return _min_exempt_meters_mpe(watts, mhz)
+    elif method == 'generic':
+        return np.minimum(_min_exempt_meters_sar(watts, mhz), _min_exempt_meters_mpe(watts, mhz))
+    else:
+        raise ValueError("unknown exemption method: %s" % str(method))
+
+
+def _min_exempt_meters_sar(watts, mhz):
+    ghz = mhz / 1000
+    valid = (0.3 <= ghz) & (ghz <= 6)
+    erp20 = np.where(ghz < 1.5, 2040 * ghz, 3060.0)
+    p_mw = watts * 1000
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = -1 * np.log10(60 / (erp20 * np.sqrt(ghz)))
+        cm = 20 * (np.maximum(p_mw, 0) / erp20) ** (1 / x)
+    return np.where(valid & (p_mw < erp20), cm / 100, np.inf)
+
+
+def _min_exempt_meters_mpe(watts, mhz):
+    k, p, q = np.moveaxis(_MPE_EXEMPTION[band_index(mhz)], -1, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        l_over_2pi = fcc.SPEED_OF_LIGHT / (mhz * 1E6) / (2 * np.pi)
+        meters = np.maximum(l_over_2pi, np.sqrt(np.maximum(watts, 0) * mhz ** q / (k * mhz ** p)))
+    return np.where((mhz > 0) & ~np.isnan(k), meters, np.inf)
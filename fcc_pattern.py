@@ -0,0 +1,101 @@
+"""Directional antennas. A PoweredAntenna has one gain, so an evaluation assumes the peak gain in every direction. An
+AntennaPattern holds the gain over azimuth and elevation, from a table such as a manufacturer's pattern file, resampled
+once onto a regular grid so that each query is a table lookup. Evaluations then use the gain toward each observer.
+
+    pattern = fcc_pattern.AntennaPattern(azimuths, elevations, gains_dbi)
+    ft, az, el = fcc_pattern.observe((0, 0, 30), points, boresight=90, downtilt=5)
+    batch = fcc_pattern.evaluate(antenna, pattern, ft, mhz=146, ground_reflections=True, azimuth=az, elevation=el)
+    batch.compliant_u  # per point
+
+Angles are in degrees. Azimuth is measured counterclockwise from the boresight, elevation up from the horizon of the
+beam.
+"""
+import numpy as np
+
+import fcc_numpy
+
+
+class AntennaPattern:
+    """Gain (dBi) of an antenna over azimuth and elevation, resampled onto a regular grid"""
+    def __init__(self, azimuth, elevation, gain_dbi, resolution: float = 0.5):
+        """
+        :param azimuth: Increasing azimuths of the table columns, within [0, 360). The pattern wraps around.
+        :param elevation: Increasing elevations of the table rows, within [-90, 90]. Beyond them the gain of the
+            nearest row is used.
+        :param gain_dbi: Table of gains (dBi), shape (len(elevation), len(azimuth))
+        :param resolution: Grid step (degrees). A lookup returns the gain at the nearest grid point, so lookups are
+            within resolution / 2 of the bilinear interpolation of the table.
+        :raises ValueError: if the table does not match the angles, or the angles are not increasing
+        """
+        azimuth = np.asarray(azimuth, dtype=float)
+        elevation = np.asarray(elevation, dtype=float)
+        gain_dbi = np.asarray(gain_dbi, dtype=float).reshape(len(elevation), -1)
+        if gain_dbi.shape[1] != len(azimuth):
+            raise ValueError("gain table is %d x %d for %d elevations and %d azimuths" % (
+                gain_dbi.shape + (len(elevation), len(azimuth))))
+        if (np.diff(azimuth) <= 0).any() or (np.diff(elevation) <= 0).any():
+            raise ValueError("azimuths and elevations must be increasing")
+        self.resolution = resolution
+        self.grid_azimuth = np.arange(0, 360, resolution)
+        self.grid_elevation = np.linspace(-90, 90, int(round(180 / resolution)) + 1)
+        along_azimuth = np.array([np.interp(self.grid_azimuth, azimuth, row, period=360) for row in gain_dbi])
+        self.grid_dbi = np.array([np.interp(self.grid_elevation, elevation, column) for column in along_azimuth.T]).T
+        self.peak_dbi = float(self.grid_dbi.max())
+
+    @classmethod
+    def isotropic(cls, dbi: float = 0.0, resolution: float = 0.5) -> 'AntennaPattern':
+        """Pattern with the same gain in every direction, as a scalar PoweredAntenna.dbi"""
+        return cls([0], [0], [[dbi]], resolution)
+
+    def gain_dbi(self, azimuth, elevation) -> np.ndarray:
+        """Gain toward each direction (dBi), by lookup in the grid.
+
+        :param azimuth: Azimuths (degrees), any range
+        :param elevation: Elevations (degrees), clipped to [-90, 90]
+        """
+        azimuth, elevation = np.broadcast_arrays(np.asarray(azimuth, dtype=float), np.asarray(elevation, dtype=float))
+        i = np.rint(np.mod(azimuth, 360) / self.resolution).astype(np.intp) % len(self.grid_azimuth)
+        j = np.rint((np.clip(elevation, -90, 90) + 90) / self.resolution).astype(np.intp)
+        return self.grid_dbi[j, i]
+
+
+def observe(position, points, boresight: float = 0.0, downtilt: float = 0.0) -> tuple:
+    """Distance and direction from an antenna to each point.
+
+    :param position: (x, y, z) of the center of the antenna (feet)
+    :param points: Array of (x, y, z) points (feet), shape (N, 3)
+    :param boresight: Azimuth of the main beam, counterclockwise from the +x axis (degrees)
+    :param downtilt: Tilt of the main beam below the horizon (degrees)
+    :return: (ft, azimuth, elevation) arrays, with angles relative to the beam as AntennaPattern expects. The tilt is
+        applied as an offset in elevation.
+    """
+    d = np.asarray(points, dtype=float).reshape(-1, 3) - np.asarray(position, dtype=float)
+    horizontal = np.hypot(d[:, 0], d[:, 1])
+    ft = np.hypot(horizontal, d[:, 2])
+    azimuth = np.mod(np.degrees(np.arctan2(d[:, 1], d[:, 0])) - boresight, 360)
+    elevation = np.degrees(np.arctan2(d[:, 2], horizontal)) + downtilt
+    return ft, azimuth, elevation
+
+
+def power_density_mwcm2(antenna, pattern: AntennaPattern, ft, azimuth, elevation, ground_reflections) -> np.ndarray:
+    """Power density toward each direction. The pattern's gain replaces antenna.dbi.
+
+    :param antenna: fcc.PoweredAntenna
+    :return: Array of power densities (mW/cm^2)
+    """
+    eirp = fcc_numpy.effective_isotropic_radiated_power(antenna.watts, antenna.t_average, antenna.duty,
+                                                        pattern.gain_dbi(azimuth, elevation))
+    return fcc_numpy.power_density_mwcm2(eirp, ft, ground_reflections)
+
+
+def evaluate(antenna, pattern: AntennaPattern, ft, mhz, ground_reflections, azimuth,
+             elevation) -> fcc_numpy.RFEvaluationReportBatch:
+    """RF evaluation toward each direction, with the pattern's gain in place of antenna.dbi. Compliant distances are
+    along each direction.
+
+    :param antenna: fcc.PoweredAntenna
+    :return: fcc_numpy.RFEvaluationReportBatch, one evaluation per direction
+    :raises ValueError: if any mhz is out of range
+    """
+    return fcc_numpy.RFEvaluationReportBatch(antenna.watts, antenna.t_average, antenna.duty,
+                                             pattern.gain_dbi(azimuth, elevation), ft, mhz, ground_reflections)
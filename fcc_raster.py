@@ -0,0 +1,162 @@
+"""Exposure maps for site drawings: power density and percent of MPE around a Site's emitters on a regular grid, and the
+boundaries where compliance flips (100% of MPE), for controlled and uncontrolled areas. Coordinates are in feet.
+
+    x = y = np.linspace(-100, 100, 401)
+    raster = fcc_raster.rasterize(site, x, y, z=6, controlled=False)
+    boundaries = fcc_raster.compliance_boundaries(site, x, y, z=6)
+"""
+import collections
+import functools
+
+import numpy as np
+
+import fcc
+
+# Marching squares. Corners of a cell, counterclockwise from (x[i], y[j]): 0 = (i, j), 1 = (i+1, j), 2 = (i+1, j+1),
+# 3 = (i, j+1). Edges: 0 = corners 0-1, 1 = 1-2, 2 = 2-3, 3 = 3-0. Case = sum of 2 ** corner over corners at or above
+# the level. Saddles (5, 10) depend on whether the cell center is at or above the level: (center below, center above).
+_SEGMENTS = {
+    1: [(3, 0)], 2: [(0, 1)], 3: [(3, 1)], 4: [(1, 2)], 6: [(0, 2)], 7: [(3, 2)], 8: [(2, 3)], 9: [(0, 2)],
+    11: [(1, 2)], 12: [(1, 3)], 13: [(0, 1)], 14: [(3, 0)],
+}
+_SADDLES = {5: ([(3, 0), (1, 2)], [(0, 1), (2, 3)]), 10: ([(0, 1), (2, 3)], [(3, 0), (1, 2)])}
+_EDGE_CORNERS = ((0, 1), (1, 2), (2, 3), (3, 0))
+_CORNER_OFFSETS = ((0, 0), (1, 0), (1, 1), (0, 1))  # (di, dj)
+
+
+def rasterize(site, x, y, z, controlled: bool = False, quantity: str = 'percent_mpe', out: str = None,
+              tile_points: int = 1 << 18) -> np.ndarray:
+    """Evaluate a Site's exposure on a grid, in vectorized tiles.
+
+    :param site: fcc_site.Site
+    :param x: 1D array of x coordinates (feet)
+    :param y: 1D array of y coordinates (feet)
+    :param z: Height (feet) for a 2D raster, or 1D array of heights for a 3D raster
+    :param controlled: Whether the area is controlled (occupational) or uncontrolled (public). Only for 'percent_mpe'.
+    :param quantity: 'percent_mpe' (sum of percent of each emitter's MPE limit) or 'power_density' (mW/cm^2)
+    :param out: Optional path of a .npy file to create and memory-map as the output, for rasters too big for RAM
+    :param tile_points: Grid points evaluated per vectorized call
+    :return: Array of shape (len(y), len(x)), or (len(z), len(y), len(x)) if z is an array
+    :raises ValueError: if quantity is unknown
+    """
+    if quantity == 'percent_mpe':
+        evaluate = functools.partial(site.percent_mpe, controlled=controlled)
+    elif quantity == 'power_density':
+        evaluate = site.power_density
+    else:
+        raise ValueError("unknown quantity: %s" % str(quantity))
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    zs = np.atleast_1d(np.asarray(z, dtype=float))
+    shape = (len(zs), len(y), len(x))
+    if out is None:
+        raster = np.empty(shape)
+    else:
+        raster = np.lib.format.open_memmap(out, mode='w+', dtype=np.float64, shape=shape)
+    flat = raster.reshape(-1)
+    for start in range(0, flat.size, tile_points):
+        k, j, i = np.unravel_index(np.arange(start, min(start + tile_points, flat.size)), shape)
+        flat[start:start + len(i)] = evaluate(np.column_stack([x[i], y[j], zs[k]]))
+    if out is not None:
+        raster.flush()
+    return raster if np.ndim(z) else raster[0]
+
+
+def boundary_polygons(raster, x, y, level: float = 100) -> list:
+    """Trace the contour of a 2D raster at a level (marching squares).
+
+    :param raster: Array of shape (len(y), len(x))
+    :param x: 1D array of x coordinates (feet)
+    :param y: 1D array of y coordinates (feet)
+    :param level: Contour level, e.g. 100 for percent of MPE
+    :return: List of (K, 2) arrays of (x, y) vertices. A closed polygon repeats its first vertex at the end; a contour
+        that runs off the edge of the raster is left open.
+    """
+    v = np.asarray(raster, dtype=float)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    high = v >= level
+    case = (high[:-1, :-1] * 1 + high[:-1, 1:] * 2 + high[1:, 1:] * 4 + high[1:, :-1] * 8)
+    segments = []
+    for j, i in zip(*np.nonzero((case != 0) & (case != 15))):
+        c = case[j, i]
+        if c in _SADDLES:
+            center = np.mean([v[j, i], v[j, i + 1], v[j + 1, i + 1], v[j + 1, i]])
+            pairs = _SADDLES[c][center >= level]
+        else:
+            pairs = _SEGMENTS[c]
+        for a, b in pairs:
+            segments.append((_edge_key(i, j, a), _edge_key(i, j, b)))
+    return [np.array([_edge_point(v, x, y, key, level) for key in chain]) for chain in _chain(segments)]
+
+
+def _edge_key(i: int, j: int, edge: int) -> tuple:
+    """Grid edge shared by neighboring cells: (i, j, 'h') from (i, j) to (i+1, j), or (i, j, 'v') to (i, j+1)."""
+    a, b = _EDGE_CORNERS[edge]
+    (ai, aj), (bi, bj) = _CORNER_OFFSETS[a], _CORNER_OFFSETS[b]
+    return (i + min(ai, bi), j + min(aj, bj), 'h' if aj == bj else 'v')
+
+
+def _edge_point(v, x, y, key, level) -> tuple:
+    i, j, direction = key
+    i2, j2 = (i + 1, j) if direction == 'h' else (i, j + 1)
+    va, vb = v[j, i], v[j2, i2]
+    with np.errstate(invalid='ignore'):
+        t = (level - va) / (vb - va) if va != vb else 0.5
+    t = min(max(t, 0.0), 1.0) if np.isfinite(t) else 0.5
+    return x[i] + t * (x[i2] - x[i]), y[j] + t * (y[j2] - y[j])
+
+
+def _chain(segments: list) -> list:
+    """Join segments that share grid edges into polylines (lists of edge keys)."""
+    neighbors = collections.defaultdict(list)
+    for a, b in segments:
+        neighbors[a].append(b)
+        neighbors[b].append(a)
+    seen = set()
+    chains = []
+    # Open chains start at an end (an edge used once); closed ones anywhere
+    starts = [k for k in neighbors if len(neighbors[k]) == 1] + list(neighbors)
+    for start in starts:
+        if start in seen:
+            continue
+        chain = [start]
+        seen.add(start)
+        current = start
+        while True:
+            following = [k for k in neighbors[current] if k not in seen]
+            if not following:
+                if len(chain) > 2 and start in neighbors[current]:
+                    chain.append(start)  # closed
+                break
+            current = following[0]
+            seen.add(current)
+            chain.append(current)
+        chains.append(chain)
+    return chains
+
+
+def compliance_boundaries(site, x, y, z: float) -> dict:
+    """Boundaries where total exposure crosses 100% of MPE, in a horizontal plane.
+
+    :return: {'controlled': polygons, 'uncontrolled': polygons}, as boundary_polygons()
+    """
+    return {name: boundary_polygons(rasterize(site, x, y, z, controlled), x, y)
+            for name, controlled in (('controlled', True), ('uncontrolled', False))}
+
+
+def single_source_error(site, polygons: list, z: float, controlled: bool) -> float:
+    """Check boundary polygons of a single-emitter site against compliant_distance_ft(): every vertex should lie on the
+    circle where the plane at height z cuts the sphere of compliant distance around the emitter.
+
+    :return: Largest distance of a vertex from that circle (feet)
+    :raises ValueError: if the site does not have exactly one emitter
+    """
+    if len(site.emitters) != 1:
+        raise ValueError("analytic check needs exactly one emitter, not %d" % len(site.emitters))
+    e = site.emitters[0]
+    limit = e.power_density_c if controlled else e.power_density_u
+    ft = fcc.compliant_distance_ft(e.antenna.effective_isotropic_radiated_power, limit, e.ground_reflections)
+    radius = np.sqrt(max(ft ** 2 - (z - e.position[2]) ** 2, 0))
+    errors = [np.abs(np.hypot(p[:, 0] - e.position[0], p[:, 1] - e.position[1]) - radius) for p in polygons]
+    return float(max((err.max() for err in errors), default=0.0))
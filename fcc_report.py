@@ -0,0 +1,80 @@
+"""Bulk rendering of RF evaluations into station books: plain text, Markdown tables or CSV, written to a file handle in
+one pass. Rows are formatted with templates compiled once per format and written in chunks, so the cost per report is
+one % formatting and no intermediate strings.
+
+    reports = [fcc.RFEvaluationReport(dipole, ft=6, mhz=f, ground_reflections=True) for f in freqs]
+    with open('station_book.md', 'w') as f:
+        fcc_report.write_reports(reports, f, fmt='markdown')
+
+An fcc_numpy.RFEvaluationReportBatch can be passed instead of a list of reports, and is read column by column.
+"""
+import itertools
+import operator
+
+import fcc
+
+# Values of each row, in order. The columns of fcc_numpy.RFEvaluationReportBatch.
+COLUMNS = ('effective_isotropic_radiated_power', 'ft', 'mhz', 'ground_reflections', 'power_density', 'power_density_c',
+           'power_density_u', 'ft_c', 'ft_u', 'compliant_c', 'compliant_u')
+_HEADINGS = ('EIRP (mW)', 'Distance (ft)', 'Frequency (MHz)', 'Ground reflections', 'Power density (mW/cm^2)',
+             'MPE controlled (mW/cm^2)', 'MPE uncontrolled (mW/cm^2)', 'Distance controlled (ft)',
+             'Distance uncontrolled (ft)', 'Compliant controlled', 'Compliant uncontrolled')
+_FLOAT = '%.4g'
+
+
+def _compile_markdown() -> tuple:
+    header = '| %s |\n|%s\n' % (' | '.join(_HEADINGS), '---|' * len(COLUMNS))
+    cells = ['%s' if name.startswith(('ground', 'compliant')) else _FLOAT for name in COLUMNS]
+    return header, '| %s |\n' % ' | '.join(cells)
+
+
+# name: (header, template of one row filled with the values of COLUMNS)
+FORMATS = {
+    'text': ('', 'EIRP (mW): %s, distance (ft): %s, frequency (MHz): %s, ground reflections: %s\n' + fcc.REPORT_TEMPLATE
+             + '\n\n'),
+    'markdown': _compile_markdown(),
+    'csv': (','.join(COLUMNS) + '\n', ','.join(['%r'] * len(COLUMNS)) + '\n'),
+}
+
+_report_values = operator.attrgetter('antenna.effective_isotropic_radiated_power', *COLUMNS[1:])
+_row_values = operator.attrgetter(*COLUMNS)
+
+
+def _rows(reports, chunk_size: int):
+    """Yield lists of value tuples, chunk_size reports at a time."""
+    if all(hasattr(reports, name) for name in COLUMNS) and hasattr(reports, '__len__'):  # columnar batch
+        for start in range(0, len(reports), chunk_size):
+            yield list(zip(*[getattr(reports, name)[start:start + chunk_size].tolist() for name in COLUMNS]))
+        return
+    iterator = iter(reports)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield [(_report_values if isinstance(r, fcc.RFEvaluationReport) else _row_values)(r) for r in chunk]
+
+
+def write_reports(reports, file, fmt: str = 'text', header: bool = True, chunk_size: int = 4096) -> int:
+    """Render many evaluations to a file handle in one pass.
+
+    :param reports: Iterable of fcc.RFEvaluationReport (or fcc_numpy.RFEvaluationRow), or an
+        fcc_numpy.RFEvaluationReportBatch
+    :param file: Writable text file handle
+    :param fmt: One of FORMATS: 'text' (each report as str() does, after a line of its inputs), 'markdown' (one table,
+        4 significant digits) or 'csv' (full precision)
+    :param header: Whether to write the table header, e.g. False when appending to a table
+    :param chunk_size: Reports formatted per write
+    :return: Number of reports written
+    :raises ValueError: if fmt is unknown
+    """
+    if fmt not in FORMATS:
+        raise ValueError("unknown format: %s" % str(fmt))
+    head, template = FORMATS[fmt]
+    if header and head:
+        file.write(head)
+    render = template.__mod__
+    n = 0
+    for rows in _rows(reports, chunk_size):
+        file.write(''.join(map(render, rows)))
+        n += len(rows)
+    return n
@@ -0,0 +1,323 @@
+"""Local HTTP/JSON compliance service, so that interactive tools can share one warm process instead of each importing
+fcc. Requests that arrive within a short window are coalesced into one vectorized fcc_numpy call per endpoint.
+
+    python -m fcc_service serve --port 8750
+    curl -d '{"watts": 100, "t_average": 50, "duty": 40, "dbi": 2.2, "ft": 20, "mhz": 14.2,
+              "ground_reflections": true, "controlled": false}' localhost:8750/is_compliant
+    # {"compliant": true, "method": "evaluation"}
+    python -m fcc_service load --port 8750 --n 20000 --concurrency 64
+
+Endpoints (POST one JSON object, get one JSON object back):
+  /is_compliant          fields of fcc_cli.FIELDS -> compliant, method
+  /report                the same minus 'controlled' -> the columns of fcc_report.COLUMNS
+  /exempt_watts_generic  meters, mhz -> watts, method
+  /metrics (GET)         requests, errors, batches and latency percentiles per endpoint
+Errors come back as status 400 with {"error": "..."}.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import sys
+import time
+
+import numpy as np
+
+import fcc
+import fcc_cli
+import fcc_numpy
+import fcc_report
+
+REPORT_FIELDS = fcc_cli.FIELDS[:7]
+EXEMPT_FIELDS = ('meters', 'mhz')
+
+
+def _columns(records: list, fields: tuple) -> list:
+    """Float/bool columns of fields, or raise ValueError/KeyError/TypeError if any record is bad."""
+    return [np.array([fcc_cli.parse_bool(r[k]) if k in ('ground_reflections', 'controlled') else float(r[k])
+                      for r in records]) for k in fields]
+
+
+def _one_at_a_time(records: list, evaluate) -> list:
+    results = []
+    for r in records:
+        try:
+            results.append(evaluate([r])[0])
+        except (ValueError, KeyError, TypeError, ZeroDivisionError, fcc.RFEvaluationError) as e:
+            results.append({'error': str(e)})
+    return results
+
+
+def evaluate_is_compliant(records: list) -> list:
+    """:return: List of {'compliant', 'method'} or {'error'} dicts, one per record"""
+    return [{'error': method[len('error: '):]} if str(method).startswith('error') else
+            {'compliant': compliant, 'method': method} for compliant, method in fcc_cli.evaluate_chunk(records)]
+
+
+def _reports(records: list) -> list:
+    batch = fcc_numpy.RFEvaluationReportBatch(*_columns(records, REPORT_FIELDS))
+    if not np.isfinite(batch.power_density).all():
+        raise ZeroDivisionError("float division by zero")  # as fcc.RFEvaluationReport at 0 ft
+    columns = [getattr(batch, name).tolist() for name in fcc_report.COLUMNS]
+    return [dict(zip(fcc_report.COLUMNS, row)) for row in zip(*columns)]
+
+
+def evaluate_report(records: list) -> list:
+    """:return: List of {column: value} dicts of fcc.RFEvaluationReport results, or {'error'} dicts"""
+    try:
+        return _reports(records)
+    except (ValueError, KeyError, TypeError, ZeroDivisionError):
+        return _one_at_a_time(records, _reports)
+
+
+def _exempt(records: list) -> list:
+    threshold, method = fcc_numpy.exempt_watts_generic(*_columns(records, EXEMPT_FIELDS))
+    results = []
+    for r, watts, m in zip(records, threshold.tolist(), method.tolist()):
+        if m == fcc_numpy.NEARFIELD:
+            results.append({'error': "near field; must do evaluation"})
+        elif m < 0:
+            results.append({'error': "frequency out of range: %s MHz" % str(r['mhz'])})
+        else:
+            results.append({'watts': watts, 'method': str(fcc_numpy.METHODS[m])})
+    return results
+
+
+def evaluate_exempt_watts_generic(records: list) -> list:
+    """:return: List of {'watts', 'method'} or {'error'} dicts, one per record"""
+    try:
+        return _exempt(records)
+    except (ValueError, KeyError, TypeError):
+        return _one_at_a_time(records, _exempt)
+
+
+ENDPOINTS = {
+    '/is_compliant': evaluate_is_compliant,
+    '/report': evaluate_report,
+    '/exempt_watts_generic': evaluate_exempt_watts_generic,
+}
+
+
+class EndpointMetrics:
+    """Counts and recent latencies of one endpoint"""
+    def __init__(self, window: int = 10000):
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.latencies = collections.deque(maxlen=window)  # seconds, most recent requests
+
+    def snapshot(self, seconds: float) -> dict:
+        samples = sorted(self.latencies)
+        result = {'requests': self.requests, 'errors': self.errors, 'batches': self.batches,
+                  'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+                  'requests_per_second': self.requests / seconds if seconds else 0.0}
+        for p in (50, 90, 99):
+            result['p%d_ms' % p] = 1000 * samples[min(len(samples) - 1, len(samples) * p // 100)] if samples else 0.0
+        return result
+
+
+class MicroBatcher:
+    """Collects records submitted within window seconds (or until max_batch are waiting) and evaluates them with one
+    call of evaluate(list of records) -> list of results."""
+    def __init__(self, evaluate, metrics: EndpointMetrics, window: float = 0.002, max_batch: int = 4096):
+        self.evaluate = evaluate
+        self.metrics = metrics
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = []
+        self.timer = None
+
+    async def submit(self, record: dict) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((record, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        self.metrics.batches += 1
+        try:
+            results = self.evaluate([record for record, _ in pending])
+        except Exception as e:  # keep serving: fail this batch's requests, not the server
+            results = [{'error': "%s: %s" % (type(e).__name__, str(e))}] * len(pending)
+        for (_, future), result in zip(pending, results):
+            if not future.cancelled():
+                future.set_result(result)
+
+
+class Service:
+    """The HTTP server, one MicroBatcher per endpoint"""
+    def __init__(self, window: float = 0.002, max_batch: int = 4096):
+        self.metrics = {path: EndpointMetrics() for path in ENDPOINTS}
+        self.batchers = {path: MicroBatcher(evaluate, self.metrics[path], window, max_batch)
+                         for path, evaluate in ENDPOINTS.items()}
+        self.start = time.perf_counter()
+
+    def snapshot(self) -> dict:
+        seconds = time.perf_counter() - self.start
+        return {'uptime_seconds': seconds,
+                'endpoints': {path: m.snapshot(seconds) for path, m in self.metrics.items()}}
+
+    async def respond(self, method: str, path: str, body: bytes) -> tuple:
+        """:return: (HTTP status, JSON-able object)"""
+        if path == '/metrics':
+            return (200, self.snapshot()) if method == 'GET' else (405, {'error': "use GET"})
+        if path not in self.batchers:
+            return 404, {'error': "no such endpoint: %s" % path}
+        if method != 'POST':
+            return 405, {'error': "use POST"}
+        start = time.perf_counter()
+        metrics = self.metrics[path]
+        metrics.requests += 1
+        try:
+            record = json.loads(body)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            result = {'error': "bad JSON: %s" % str(e)}
+        else:
+            result = await self.batchers[path].submit(record)
+        metrics.latencies.append(time.perf_counter() - start)
+        if 'error' in result:
+            metrics.errors += 1
+            return 400, result
+        return 200, result
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path = request_line.decode('latin-1').split()[:2]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, result = await self.respond(method, path, body)
+                payload = json.dumps(result).encode()
+                writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s' % (
+                    status, _REASONS[status], len(payload), payload))
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8750):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+_REASONS = {200: b'OK', 400: b'Bad Request', 404: b'Not Found', 405: b'Method Not Allowed'}
+
+
+# Load generator ########
+
+
+async def _post(reader, writer, path: str, record: dict) -> tuple:
+    body = json.dumps(record).encode()
+    writer.write(b'POST %s HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n\r\n%s' % (path.encode(), len(body),
+                                                                                          body))
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':')[1])
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def load(host: str, port: int, records: list, path: str = '/is_compliant', concurrency: int = 64) -> dict:
+    """Send records to the service from concurrency keep-alive connections at once.
+
+    :return: {'requests', 'errors', 'seconds', 'requests_per_second', 'p50_ms', 'p90_ms', 'p99_ms'}
+    """
+    queue = collections.deque(records)
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while queue:
+                record = queue.popleft()
+                start = time.perf_counter()
+                status, _ = await _post(reader, writer, path, record)
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    result = {'requests': len(latencies), 'errors': errors, 'seconds': seconds,
+              'requests_per_second': len(latencies) / seconds}
+    for p in (50, 90, 99):
+        result['p%d_ms' % p] = 1000 * latencies[min(len(latencies) - 1, len(latencies) * p // 100)]
+    return result
+
+
+def _load_records(path: str, n: int, workload: str) -> list:
+    import fcc_bench
+    stations = fcc_bench.station_mix(workload, n)
+    if path == '/exempt_watts_generic':
+        return [{'meters': s[4] * fcc.M_PER_FT, 'mhz': s[5]} for s in stations]
+    fields = fcc_cli.FIELDS if path == '/is_compliant' else REPORT_FIELDS
+    return [dict(zip(fields, s)) for s in stations]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m fcc_service', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    for name, help_text in (('serve', "run the service"), ('load', "load-test a running service")):
+        p = commands.add_parser(name, help=help_text)
+        p.add_argument('--host', default='127.0.0.1', help="default 127.0.0.1")
+        p.add_argument('--port', type=int, default=8750, help="default 8750")
+        if name == 'serve':
+            p.add_argument('--window-ms', type=float, default=2, help="batching window (default 2 ms)")
+            p.add_argument('--max-batch', type=int, default=4096, help="largest batch (default 4096)")
+        else:
+            p.add_argument('--endpoint', default='/is_compliant', choices=list(ENDPOINTS))
+            p.add_argument('--n', type=int, default=10000, help="requests (default 10000)")
+            p.add_argument('--concurrency', type=int, default=64, help="connections (default 64)")
+            p.add_argument('--workload', default='hf_amateur', help="station mix from fcc_bench (default hf_amateur)")
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        service = Service(args.window_ms / 1000, args.max_batch)
+        print("Serving on http://%s:%d" % (args.host, args.port), file=sys.stderr)
+        try:
+            asyncio.run(service.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    records = _load_records(args.endpoint, args.n, args.workload)
+    result = asyncio.run(load(args.host, args.port, records, args.endpoint, args.concurrency))
+    print(json.dumps(result, indent=2))
+    return 1 if result['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""Multi-transmitter sites. With several emitters, compliance means the sum over emitters of each one's power density as a
+fraction of its own MPE limit must stay below 100%. A Site computes that total at arbitrary points, skipping emitters
+that are too far away to contribute more than a small fraction of their limit. Positions and distances are in feet.
+
+    site = fcc_site.Site([
+        fcc_site.Emitter(fcc.PoweredAntenna(100, 50, 40, 2.2), (0, 0, 30), mhz=14.2, ground_reflections=True),
+        fcc_site.Emitter(fcc.PoweredAntenna(50, 100, 100, 6), (10, 0, 40), mhz=146, ground_reflections=True),
+    ])
+    site.percent_mpe([(5, 5, 6), (50, 0, 6)], controlled=False)
+"""
+import collections
+import math
+
+import numpy as np
+
+import fcc
+import fcc_numpy
+
+
+class Emitter:
+    """One transmitter on a site: a PoweredAntenna at a position, on a frequency"""
+    def __init__(self, antenna: fcc.PoweredAntenna, position: tuple, mhz: float, ground_reflections: bool):
+        """
+        :param antenna:
+        :param position: (x, y, z) of the center of the antenna (feet)
+        :param mhz: Frequency of RF radiation (megahertz)
+        :param ground_reflections: Whether to account for radiation coming from ground reflections
+        :raises ValueError: if mhz is out of range
+        """
+        self.antenna = antenna
+        self.position = tuple(float(c) for c in position)
+        self.mhz = mhz
+        self.ground_reflections = ground_reflections
+        self.power_density_c, self.power_density_u = fcc.mpe_limits_cont_uncont_mwcm2(mhz)
+
+    def __repr__(self):
+        return "Emitter(%s, %s, %f, %s)" % (repr(self.antenna), repr(self.position), self.mhz, self.ground_reflections)
+
+
+class Site:
+    """A set of emitters, indexed by position so that queries only visit the emitters that matter at each point"""
+    def __init__(self, emitters: list, epsilon: float = 1e-4, cell_ft: float = None):
+        """
+        :param emitters: List of Emitter
+        :param epsilon: An emitter is skipped at points where its power density is below this fraction of its
+            (uncontrolled) MPE limit. Each skipped emitter changes the total by less than 100 * epsilon percent.
+            0 means never skip.
+        :param cell_ft: Size of the cells of the spatial grid index (feet). Default: the median cutoff radius.
+        """
+        self.emitters = list(emitters)
+        self.epsilon = epsilon
+        n = len(self.emitters)
+        self._positions = np.array([e.position for e in self.emitters], dtype=float).reshape(n, 3)
+        self._eirp = np.array([e.antenna.effective_isotropic_radiated_power for e in self.emitters], dtype=float)
+        self._reflection = np.array([fcc.reflection_constant(e.ground_reflections) for e in self.emitters])
+        self._limit_c = np.array([e.power_density_c for e in self.emitters], dtype=float)
+        self._limit_u = np.array([e.power_density_u for e in self.emitters], dtype=float)
+        if epsilon > 0:
+            self.cutoff_ft = fcc_numpy.compliant_distance_ft(self._eirp * self._reflection, self._limit_u * epsilon,
+                                                             False)
+        else:
+            self.cutoff_ft = np.full(n, np.inf)
+        finite = self.cutoff_ft[np.isfinite(self.cutoff_ft) & (self.cutoff_ft > 0)]
+        self.cell_ft = cell_ft or (float(np.median(finite)) if len(finite) else 1.0)
+        self._build_index()
+
+    def _build_index(self, max_cells: int = 64):
+        """Grid index: cell -> emitters whose cutoff sphere overlaps it. Emitters reaching more than max_cells cells
+        are checked everywhere instead."""
+        cells = collections.defaultdict(list)
+        everywhere = []
+        for i, (p, r) in enumerate(zip(self._positions, self.cutoff_ft)):
+            if r == 0:
+                continue
+            if not math.isfinite(r):
+                everywhere.append(i)
+                continue
+            low = np.floor((p - r) / self.cell_ft).astype(int)
+            high = np.floor((p + r) / self.cell_ft).astype(int)
+            if np.prod(high - low + 1) > max_cells:
+                everywhere.append(i)
+                continue
+            for key in np.ndindex(*(high - low + 1)):
+                cells[tuple(low + key)].append(i)
+        self._cells = {k: np.array(v) for k, v in cells.items()}
+        self._everywhere = np.array(everywhere, dtype=int)
+
+    def candidates(self, point) -> np.ndarray:
+        """Indices of emitters that might contribute at a point (feet), from the grid index."""
+        key = tuple(np.floor(np.asarray(point, dtype=float) / self.cell_ft).astype(int))
+        return np.union1d(self._cells.get(key, np.empty(0, dtype=int)), self._everywhere)
+
+    def percent_mpe(self, points, controlled: bool) -> np.ndarray:
+        """Total exposure at each point, as the sum over emitters of percent of each one's MPE limit.
+
+        :param points: Array of (x, y, z) points (feet), shape (N, 3)
+        :param controlled: Whether the points are in a controlled (occupational) or uncontrolled (public) area
+        :return: Array of N totals (percent). At or above 100 is not compliant.
+        """
+        limit = self._limit_c if controlled else self._limit_u
+        return self._sum(points, 100 / limit)
+
+    def power_density(self, points) -> np.ndarray:
+        """Total power density at each point, summed over emitters.
+
+        :param points: Array of (x, y, z) points (feet), shape (N, 3)
+        :return: Array of N power densities (mW/cm^2)
+        """
+        return self._sum(points, np.ones(len(self.emitters)))
+
+    def _sum(self, points, weights: np.ndarray) -> np.ndarray:
+        """Sum over emitters of weight * power density at each point, visiting only the emitters within cutoff."""
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        total = np.zeros(len(points))
+        if not len(points) or not self.emitters:
+            return total
+        keys, inverse, counts = np.unique(np.floor(points / self.cell_ft).astype(int), axis=0, return_inverse=True,
+                                          return_counts=True)
+        by_cell = np.split(np.argsort(inverse.reshape(-1), kind='stable'), np.cumsum(counts)[:-1])
+        for key, rows in zip(keys, by_cell):
+            emitters = np.union1d(self._cells.get(tuple(key), np.empty(0, dtype=int)), self._everywhere)
+            if not len(emitters):
+                continue
+            ft = np.linalg.norm(points[rows, None, :] - self._positions[None, emitters, :], axis=2)
+            with np.errstate(divide='ignore'):
+                density = fcc_numpy.power_density_mwcm2(self._eirp[emitters] * self._reflection[emitters], ft, False)
+            weighted = np.where(ft < self.cutoff_ft[emitters], density * weights[emitters], 0)
+            total[rows] = weighted.sum(axis=1)
+        return total
+
+    def is_compliant(self, points, controlled: bool) -> np.ndarray:
+        """:return: Array of bool, whether the total exposure at each point (feet) is below 100% of MPE"""
+        return self.percent_mpe(points, controlled) < 100
+
+
+class PowerBudget:
+    """The most power each emitter of a site can run while every accessible point stays compliant. Power density is
+    linear in feedpoint power, so the site is compliant where A @ watts < 100, with A[j, i] the percent of MPE at point j
+    per watt of emitter i. The matrix is built once from the site's geometry, and each solve reuses it, for any limits,
+    weights and caps.
+
+        budget = fcc_site.PowerBudget(site, points)
+        budget.max_min_fair(controlled=False, max_watts=1500)  # watts per emitter
+    """
+    def __init__(self, site: Site, points):
+        """
+        :param site: Site. The power of each emitter's antenna is ignored; its duty, time average and gain are kept.
+        :param points: Array of (x, y, z) accessible points (feet), shape (N, 3)
+        """
+        self.site = site
+        self.points = np.asarray(points, dtype=float).reshape(-1, 3)
+        eirp_per_watt = np.array([fcc_numpy.effective_isotropic_radiated_power(1, e.antenna.t_average, e.antenna.duty,
+                                                                               e.antenna.dbi)
+                                  for e in site.emitters], dtype=float)
+        ft = np.linalg.norm(self.points[:, None, :] - site._positions[None, :, :], axis=2)
+        with np.errstate(divide='ignore'):
+            # mW/cm^2 per watt, shape (N points, emitters), without the site's cutoff
+            self.density_per_watt = fcc_numpy.power_density_mwcm2(eirp_per_watt * site._reflection, ft, False)
+        self._matrices = {}
+
+    def matrix(self, controlled: bool) -> np.ndarray:
+        """:return: A, percent of MPE at each point per watt of each emitter, shape (N points, emitters)"""
+        if controlled not in self._matrices:
+            limit = self.site._limit_c if controlled else self.site._limit_u
+            self._matrices[controlled] = self.density_per_watt * (100 / limit)
+        return self._matrices[controlled]
+
+    def _setup(self, controlled: bool, weights, percent, max_watts) -> tuple:
+        """Arguments of the solvers as arrays, with the emitters that are not limited by any point set aside: no power
+        for an emitter at an accessible point, infinite (or capped) power for one that reaches none."""
+        a = self.matrix(controlled)
+        n = a.shape[1]
+        weights = np.broadcast_to(np.asarray(1.0 if weights is None else weights, dtype=float), (n,))
+        if (weights < 0).any():
+            raise ValueError("weights must not be negative")
+        caps = np.broadcast_to(np.asarray(np.inf if max_watts is None else max_watts, dtype=float), (n,))
+        percent = np.broadcast_to(np.asarray(percent, dtype=float), (a.shape[0],))
+        if (percent <= 0).any() or (caps < 0).any():
+            raise ValueError("percent must be positive and max_watts not negative")
+        watts = np.zeros(n)
+        blocked = np.isinf(a).any(axis=0)
+        free = ~blocked & ~(a > 0).any(axis=0)
+        watts[free] = caps[free]
+        return a, weights, caps, percent, watts, ~blocked & ~free
+
+    def max_min_fair(self, controlled: bool, weights=None, percent=100, max_watts=None) -> np.ndarray:
+        """Weighted max-min fair powers: raise every emitter's power in proportion to its weight until a point reaches
+        the limit or the emitter reaches its cap, hold the emitters that contribute to that point (or capped) at their
+        power, and go on raising the others. No emitter can get more power without another of no more power per weight
+        getting less. Every emitter adds to the total at every point, so without caps the first point to reach the
+        limit usually holds all of them.
+
+        :param controlled: Whether the points are in a controlled (occupational) or uncontrolled (public) area
+        :param weights: Power per emitter, relative to the others, as they are raised (default equal). 0 leaves an
+            emitter off.
+        :param percent: Limit of the total percent of MPE, for all points or per point
+        :param max_watts: Cap on the power of each emitter (watts), for all or per emitter
+        :return: Array of watts per emitter, rounded down by a relative 1e-9 so that every total is below percent.
+            Infinite for an emitter with no weight on any point and no cap.
+        :raises ValueError: if weights, percent or max_watts are out of range
+        """
+        a, weights, caps, percent, watts, active = self._setup(controlled, weights, percent, max_watts)
+        active &= weights > 0
+        load = np.zeros(len(percent))
+        while active.any():
+            rate = a[:, active] @ weights[active]  # percent per unit of raise
+            with np.errstate(divide='ignore', invalid='ignore'):
+                to_limit = np.where(rate > 0, (percent - load) / rate, np.inf)
+            to_cap = (caps[active] - watts[active]) / weights[active]
+            step = max(min(to_limit.min(initial=np.inf), to_cap.min()), 0.0)
+            watts[active] += step * weights[active]
+            load += step * rate
+            held = (a[to_limit <= step * (1 + 1e-12)] > 0).any(axis=0)
+            held[active] |= to_cap <= step * (1 + 1e-12)
+            active &= ~held
+        return watts * (1 - 1e-9)
+
+    def max_weighted(self, controlled: bool, weights=None, percent=100, max_watts=None) -> np.ndarray:
+        """Powers that maximize the weighted total power, by linear programming. Unlike max_min_fair(), this may leave
+        an emitter off when its power is better spent on others.
+
+        Most points never limit the optimum, so the program starts with the point most affected by each emitter, and
+        adds the points over the limit until there are none (constraint generation).
+
+        :param controlled: Whether the points are in a controlled (occupational) or uncontrolled (public) area
+        :param weights: Value of a watt of each emitter (default equal)
+        :param percent: Limit of the total percent of MPE, for all points or per point
+        :param max_watts: Cap on the power of each emitter (watts), for all or per emitter
+        :return: Array of watts per emitter, rounded down by a relative 1e-9 so that every total is below percent.
+            Infinite for an emitter with no weight on any point and no cap.
+        :raises ValueError: if weights, percent or max_watts are out of range
+        """
+        a, weights, caps, percent, watts, active = self._setup(controlled, weights, percent, max_watts)
+        columns = np.flatnonzero(active)
+        if not len(columns):
+            return watts
+        scaled = a[:, columns] / percent[:, None]  # total <= 1 at every point
+        rows = np.unique(scaled.argmax(axis=0))
+        capped = np.flatnonzero(np.isfinite(caps[columns]))
+        cap_rows = np.zeros((len(capped), len(columns)))
+        cap_rows[np.arange(len(capped)), capped] = 1
+        while True:
+            g = np.vstack([scaled[rows] / scaled[rows].max(axis=1, keepdims=True), cap_rows])
+            h = np.concatenate([1 / scaled[rows].max(axis=1), caps[columns][capped]])
+            x = _simplex(weights[columns], g, h)
+            totals = scaled @ x
+            over = np.flatnonzero(totals > 1 + 1e-9)
+            over = over[~np.isin(over, rows)]
+            if not len(over):
+                break
+            rows = np.concatenate([rows, over[np.argsort(-totals[over])][:max(len(columns), 8)]])
+        watts[columns] = x
+        return watts * (1 - 1e-9)
+
+
+def _simplex(c: np.ndarray, g: np.ndarray, h: np.ndarray, tol: float = 1e-12) -> np.ndarray:
+    """Maximize c @ x subject to g @ x <= h and x >= 0, for h >= 0 and a bounded program, by the simplex method on a
+    dense tableau. Enters the most negative reduced cost, and falls back to Bland's rule (which cannot cycle) after
+    many pivots."""
+    k, n = g.shape
+    tableau = np.zeros((k + 1, n + k + 1))
+    tableau[:k, :n] = g
+    tableau[:k, n:n + k] = np.eye(k)
+    tableau[:k, -1] = h
+    tableau[k, :n] = -c
+    basis = np.arange(n, n + k)
+    for pivots in range(100 * (n + k) + 1000):
+        costs = tableau[k, :-1]
+        entering = np.flatnonzero(costs < -tol)
+        if not len(entering):
+            break
+        j = entering[0] if pivots > 10 * (n + k) else entering[np.argmin(costs[entering])]
+        column = tableau[:k, j]
+        positive = np.flatnonzero(column > tol)
+        if not len(positive):
+            raise ValueError("unbounded linear program")
+        ratios = tableau[positive, -1] / column[positive]
+        ties = positive[ratios <= ratios.min() + tol]
+        r = ties[np.argmin(basis[ties])]
+        tableau[r] /= tableau[r, j]
+        others = np.arange(k + 1) != r
+        tableau[others] -= np.outer(tableau[others, j], tableau[r])
+        basis[r] = j
+    else:
+        raise ValueError("linear program did not converge")
+    x = np.zeros(n + k)
+    x[basis] = tableau[:k, -1]
+    return np.maximum(x[:n], 0)
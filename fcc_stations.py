@@ -0,0 +1,148 @@
+"""Binary station files: a fixed-width record per station, stored as a NumPy structured array in a .npy file, so that
+batch evaluation can memory-map the file and work through it in slices with no parsing and no copies.
+
+Each record is STATION_DTYPE, 58 bytes, little-endian, packed (no padding), in this order:
+    watts, t_average, duty, dbi        float64  the fields of PoweredAntenna
+    ft, mhz                            float64  distance (feet) and frequency (megahertz)
+    effective_isotropic_radiated_power float64  EIRP (milliwatts), computed once when the file is written
+    ground_reflections, controlled     bool     one byte each
+The .npy header records the dtype and the number of stations, so np.load(path, mmap_mode='r') reads any station file.
+
+    python -m fcc_stations from-csv stations.csv stations.npy
+    python -m fcc_stations evaluate stations.npy -o results.npy
+    python -m fcc_stations to-csv stations.npy stations.csv
+"""
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+import fcc_cli
+import fcc_numpy
+
+STATION_DTYPE = np.dtype([
+    ('watts', '<f8'), ('t_average', '<f8'), ('duty', '<f8'), ('dbi', '<f8'), ('ft', '<f8'), ('mhz', '<f8'),
+    ('effective_isotropic_radiated_power', '<f8'), ('ground_reflections', '?'), ('controlled', '?')])
+# Results of evaluate_file(): method is an index into fcc_numpy.METHODS
+RESULT_DTYPE = np.dtype([('compliant', '?'), ('method', 'u1')])
+
+
+def from_records(records: list) -> np.ndarray:
+    """Station array from records (dicts with fcc_cli.FIELDS), with the EIRP column computed.
+
+    :raises ValueError: if a record cannot be evaluated (bad number or boolean, t_average / duty out of range)
+    """
+    stations = np.empty(len(records), dtype=STATION_DTYPE)
+    for k in fcc_cli.FIELDS[:6]:
+        stations[k] = [float(r[k]) for r in records]
+    for k in fcc_cli.FIELDS[6:]:
+        stations[k] = [fcc_cli.parse_bool(r[k]) for r in records]
+    stations['effective_isotropic_radiated_power'] = fcc_numpy.effective_isotropic_radiated_power(
+        stations['watts'], stations['t_average'], stations['duty'], stations['dbi'])
+    return stations
+
+
+def load(path: str) -> np.ndarray:
+    """Memory-map a station file read-only.
+
+    :raises ValueError: if the file does not hold STATION_DTYPE records
+    """
+    stations = np.load(path, mmap_mode='r')
+    if stations.dtype != STATION_DTYPE:
+        raise ValueError("not a station file: %s has dtype %s" % (path, str(stations.dtype)))
+    return stations
+
+
+def from_csv(src: str, dst: str, chunk_size: int = 100000) -> int:
+    """Convert a CSV station inventory (header with fcc_cli.FIELDS) into a station file, chunk_size rows at a time.
+
+    :return: Number of stations
+    :raises ValueError: if a row cannot be evaluated
+    """
+    with open(src, newline='') as f:
+        n = sum(1 for _ in csv.DictReader(f))
+    stations = np.lib.format.open_memmap(dst, mode='w+', dtype=STATION_DTYPE, shape=(n,))
+    with open(src, newline='') as f:
+        start = 0
+        for chunk in fcc_cli.chunked(csv.DictReader(f), chunk_size):
+            try:
+                stations[start:start + len(chunk)] = from_records(chunk)
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError("bad station in rows %d-%d of %s: %s" % (start + 1, start + len(chunk), src, str(e)))
+            start += len(chunk)
+    stations.flush()
+    return n
+
+
+def to_csv(src: str, dst: str, chunk_size: int = 100000) -> int:
+    """Convert a station file back into CSV with fcc_cli.FIELDS (the EIRP column is not written). Numbers are written
+    with repr(), so from_csv() reads back exactly the same values.
+
+    :return: Number of stations
+    """
+    stations = load(src)
+    template = ','.join(['%r'] * 6 + ['%s'] * 2) + '\n'
+    with open(dst, 'w', newline='') as f:
+        f.write(','.join(fcc_cli.FIELDS) + '\n')
+        for start in range(0, len(stations), chunk_size):
+            part = stations[start:start + chunk_size]
+            f.write(''.join(template % row for row in zip(*[part[k].tolist() for k in fcc_cli.FIELDS])))
+    return len(stations)
+
+
+def evaluate(stations: np.ndarray, chunk_size: int = 1 << 18):
+    """Evaluate is_compliant() for every station, slice by slice. Slices of a memory-mapped file are views, so only
+    the stations being evaluated are read into memory.
+
+    :return: Generator of (start index, compliant bool array, method index array into fcc_numpy.METHODS)
+    :raises ValueError: if any station would make fcc.is_compliant() raise
+    """
+    for start in range(0, len(stations), chunk_size):
+        s = stations[start:start + chunk_size]
+        compliant, method = fcc_numpy.is_compliant_batch(
+            s['watts'], s['t_average'], s['duty'], s['dbi'], s['ft'], s['mhz'], s['ground_reflections'],
+            s['controlled'], eirp=s['effective_isotropic_radiated_power'])
+        codes = np.zeros(len(method), dtype=np.uint8)
+        for i, name in enumerate(fcc_numpy.METHODS):
+            codes[method == name] = i
+        yield start, compliant, codes
+
+
+def evaluate_file(src: str, dst: str, chunk_size: int = 1 << 18) -> int:
+    """Evaluate a station file into a .npy file of RESULT_DTYPE records, one per station, in order.
+
+    :return: Number of stations
+    """
+    stations = load(src)
+    results = np.lib.format.open_memmap(dst, mode='w+', dtype=RESULT_DTYPE, shape=(len(stations),))
+    for start, compliant, method in evaluate(stations, chunk_size):
+        results['compliant'][start:start + len(compliant)] = compliant
+        results['method'][start:start + len(method)] = method
+    results.flush()
+    return len(stations)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m fcc_stations', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    p = commands.add_parser('from-csv', help="convert a CSV inventory into a station file")
+    p.add_argument('input')
+    p.add_argument('output')
+    p.set_defaults(func=lambda args: from_csv(args.input, args.output))
+    p = commands.add_parser('to-csv', help="convert a station file into a CSV inventory")
+    p.add_argument('input')
+    p.add_argument('output')
+    p.set_defaults(func=lambda args: to_csv(args.input, args.output))
+    p = commands.add_parser('evaluate', help="evaluate is_compliant() for a station file")
+    p.add_argument('input')
+    p.add_argument('-o', '--output', required=True, help=".npy file of (compliant, method index) records")
+    p.set_defaults(func=lambda args: evaluate_file(args.input, args.output))
+    args = parser.parse_args(argv)
+    print("%d stations." % args.func(args), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
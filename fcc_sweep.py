@@ -0,0 +1,171 @@
+"""Parameter sweeps: evaluate a quantity over the Cartesian product of axes (frequency x distance x power x gain ...),
+like mpe_vs_sar.py does with nested loops, but vectorized and tiled across a process pool. Workers write straight into
+one shared output array (shared memory, or a memory-mapped .npy file), so results are never pickled.
+
+    import numpy as np
+    import fcc_sweep
+    axes = {'mhz': np.linspace(300, 6000, 571), 'meters': np.linspace(0.01, 0.4, 40)}
+    result, stats = fcc_sweep.sweep('exempt_watts', axes, workers=4)
+    # result.shape == (571, 40)
+"""
+import time
+
+import numpy as np
+
+import fcc
+import fcc_numpy
+
+# Values used for any parameter that is neither an axis nor given in 'fixed'
+DEFAULTS = {'watts': 1.0, 't_average': 100.0, 'duty': 100.0, 'dbi': 0.0, 'ground_reflections': False,
+            'controlled': False}
+
+
+def _eirp(p):
+    return fcc_numpy.effective_isotropic_radiated_power(p['watts'], p['t_average'], p['duty'], p['dbi'])
+
+
+def _percent_mpe(p):
+    limit_c, limit_u = fcc_numpy.mpe_limits_cont_uncont_mwcm2(p['mhz'])
+    density = fcc_numpy.power_density_mwcm2(_eirp(p), p['ft'], p['ground_reflections'])
+    return 100 * density / np.where(p['controlled'], limit_c, limit_u)
+
+
+# name: (function of a dict of parameter arrays, output dtype)
+QUANTITIES = {
+    'exempt_watts': (lambda p: fcc_numpy.exempt_watts_generic(p['meters'], p['mhz'])[0], np.float64),
+    'min_exempt_meters': (lambda p: fcc_numpy.min_exempt_distance(p['watts'], p['mhz']), np.float64),
+    'power_density': (lambda p: fcc_numpy.power_density_mwcm2(_eirp(p), p['ft'], p['ground_reflections']),
+                      np.float64),
+    'percent_mpe': (_percent_mpe, np.float64),
+    'compliant': (lambda p: fcc_numpy.is_compliant_batch(p['watts'], p['t_average'], p['duty'], p['dbi'], p['ft'],
+                                                         p['mhz'], p['ground_reflections'], p['controlled'])[0],
+                  np.bool_),
+}
+
+
+class SweepStats:
+    """Progress and throughput of a sweep"""
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+
+    @property
+    def points_per_second(self) -> float:
+        return self.done / self.seconds if self.seconds else 0.0
+
+    def update(self, points: int):
+        self.done += points
+        self.seconds = time.perf_counter() - self.start
+
+    def __str__(self):
+        return "%d / %d points (%.1f%%) in %.2f s, %.0f points/s" % (
+            self.done, self.total, 100 * self.done / self.total if self.total else 100, self.seconds,
+            self.points_per_second)
+
+
+def _parameters(names: list, values: list, fixed: dict) -> dict:
+    """Complete set of parameter arrays for one tile, with distance available both in ft and in meters."""
+    p = dict(DEFAULTS)
+    p.update(fixed)
+    p.update(zip(names, values))
+    if 'meters' in p and 'ft' not in p:
+        p['ft'] = p['meters'] / fcc.M_PER_FT
+    elif 'ft' in p and 'meters' not in p:
+        p['meters'] = p['ft'] * fcc.M_PER_FT
+    return p
+
+
+def evaluate_tile(quantity: str, axes: dict, fixed: dict, start: int, stop: int) -> np.ndarray:
+    """Evaluate quantity at flat indices [start, stop) of the Cartesian product of axes (C order).
+
+    :return: 1D array of stop - start results
+    """
+    names = list(axes)
+    index = np.unravel_index(np.arange(start, stop), [len(v) for v in axes.values()])
+    values = [np.asarray(axes[name])[i] for name, i in zip(names, index)]
+    function, dtype = QUANTITIES[quantity]
+    return np.asarray(function(_parameters(names, values, fixed)), dtype=dtype)
+
+
+_worker = {}
+
+
+def _attach(quantity, axes, fixed, shm_name, path, size, dtype):
+    """Pool initializer: open the shared output once per worker."""
+    if path is not None:
+        out = np.load(path, mmap_mode='r+')
+        _worker['keep'] = out
+    else:
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(name=shm_name)
+        out = np.ndarray((size,), dtype=dtype, buffer=shm.buf)
+        _worker['keep'] = shm
+    _worker.update(quantity=quantity, axes=axes, fixed=fixed, out=out.reshape(-1))
+
+
+def _work(tile):
+    start, stop = tile
+    _worker['out'][start:stop] = evaluate_tile(_worker['quantity'], _worker['axes'], _worker['fixed'], start, stop)
+    return stop - start
+
+
+def sweep(quantity: str, axes: dict, fixed: dict = None, workers: int = 1, tile_size: int = 1 << 20, out: str = None,
+          progress=None) -> tuple:
+    """Evaluate quantity over the Cartesian product of axes.
+
+    :param quantity: One of QUANTITIES
+    :param axes: Ordered {parameter name: 1D array of values}. Names are those of fcc_numpy.is_compliant_batch(), plus
+        'meters' as an alternative to 'ft'.
+    :param fixed: {parameter name: value} for parameters that are not swept (others default to DEFAULTS)
+    :param workers: Number of processes. Tiles are handed out dynamically, and each worker writes its tiles directly
+        into the output.
+    :param tile_size: Points evaluated per vectorized call
+    :param out: Optional path of a .npy file to create and memory-map as the output, for sweeps too big for RAM
+    :param progress: Optional function called with a SweepStats after each tile
+    :return: A (result array with one dimension per axis, SweepStats) tuple
+    :raises ValueError: if quantity is unknown
+    """
+    if quantity not in QUANTITIES:
+        raise ValueError("unknown quantity: %s" % str(quantity))
+    fixed = dict(fixed or {})
+    axes = {name: np.asarray(values) for name, values in axes.items()}
+    shape = tuple(len(v) for v in axes.values())
+    size = int(np.prod(shape))
+    dtype = np.dtype(QUANTITIES[quantity][1])
+    tiles = [(start, min(start + tile_size, size)) for start in range(0, size, tile_size)]
+    stats = SweepStats(size)
+    if out is not None:
+        result = np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=shape)
+    if workers <= 1:
+        if out is None:
+            result = np.empty(shape, dtype=dtype)
+        flat = result.reshape(-1)
+        for start, stop in tiles:
+            flat[start:stop] = evaluate_tile(quantity, axes, fixed, start, stop)
+            stats.update(stop - start)
+            if progress:
+                progress(stats)
+        return result, stats
+    import multiprocessing
+    shm = None
+    if out is None:
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(create=True, size=max(size * dtype.itemsize, 1))
+    else:
+        result.flush()
+    try:
+        initargs = (quantity, axes, fixed, shm and shm.name, out, size, dtype)
+        with multiprocessing.Pool(workers, initializer=_attach, initargs=initargs) as pool:
+            for n in pool.imap_unordered(_work, tiles):
+                stats.update(n)
+                if progress:
+                    progress(stats)
+        if shm is not None:
+            result = np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+    return result, stats
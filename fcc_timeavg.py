@@ -0,0 +1,231 @@
+"""Time-averaged exposure from transmit logs. Instead of guessing t_average and duty, replay the log of when the station
+was keyed, at what power and in what mode, and follow the average power over the regulatory averaging windows: 6
+minutes for controlled and 30 minutes for uncontrolled environments. Each window slides over the log in O(1) amortized
+time per event and holds only the transmissions inside it, so months of logs stream through in bounded memory.
+
+    events = fcc_timeavg.read_log(open('keying.csv'))  # columns: start, seconds (or end), watts, mode (or duty)
+    for e in fcc_timeavg.exceedances(events, dbi=2.2, ft=10, mhz=14.2, ground_reflections=True):
+        print(e)
+"""
+import argparse
+import collections
+import csv
+import datetime
+import math
+import sys
+
+import fcc
+
+WINDOW_SECONDS = {True: 6 * 60, False: 30 * 60}  # controlled: averaging window
+# Duty factor (percent) of common modes within a transmission (see Readme)
+DUTY_FACTORS = {'SSB': 20, 'SSB processed': 40, 'FM': 100, 'FSK': 100, 'RTTY': 100, 'AFSK': 100, 'FT4': 50, 'FT8': 50,
+                'CW': 40, 'carrier': 100}
+
+TxEvent = collections.namedtuple('TxEvent', 'start end watts duty')
+TxEvent.__doc__ = "One transmission, from start to end (seconds), at watts feedpoint power and duty percent"
+Exceedance = collections.namedtuple('Exceedance', 'controlled start end peak_percent_mpe')
+Exceedance.__doc__ = """Interval of window end times (seconds) when the time-averaged power density is at or above the
+MPE limit, and the highest percent of MPE within it"""
+
+
+def _seconds(value) -> float:
+    """Epoch seconds from a number or an ISO 8601 timestamp (naive timestamps are taken as UTC)."""
+    try:
+        return float(value)
+    except ValueError:
+        t = datetime.datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+        if t.tzinfo is None:
+            t = t.replace(tzinfo=datetime.timezone.utc)
+        return t.timestamp()
+
+
+def read_log(stream):
+    """Yield TxEvents from a CSV keying log with a header.
+
+    Columns: 'start' (epoch seconds or ISO 8601), either 'seconds' (key-down time) or 'end', 'watts', and either
+    'duty' (percent) or 'mode' (a key of DUTY_FACTORS).
+
+    :raises ValueError: on a row that cannot be read, or an unknown mode
+    """
+    for row in csv.DictReader(stream):
+        start = _seconds(row['start'])
+        end = start + float(row['seconds']) if row.get('seconds') not in (None, '') else _seconds(row['end'])
+        if row.get('duty') not in (None, ''):
+            duty = float(row['duty'])
+        elif row.get('mode') in DUTY_FACTORS:
+            duty = DUTY_FACTORS[row['mode']]
+        else:
+            raise ValueError("unknown mode: %s" % str(row.get('mode')))
+        yield TxEvent(start, end, float(row['watts']), duty)
+
+
+class SlidingWindow:
+    """Energy of the transmissions within the last 'seconds', as the window end moves forward"""
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.events = collections.deque()  # (start, end, average watts) overlapping the window, in order
+        self.joules = 0.0  # full energy of self.events
+
+    def add(self, start: float, end: float, watts: float):
+        self.events.append((start, end, watts))
+        self.joules += watts * (end - start)
+
+    def average_watts(self, t: float) -> float:
+        """Average power over (t - seconds, t]. t must not decrease between calls, and must not be before the start of
+        the last event added."""
+        begin = t - self.seconds
+        while self.events and self.events[0][1] <= begin:
+            start, end, watts = self.events.popleft()
+            self.joules -= watts * (end - start)
+        if not self.events:
+            self.joules = 0.0  # no drift across idle periods
+            return 0.0
+        joules = self.joules
+        start, end, watts = self.events[0]
+        joules -= watts * max(begin - start, 0)  # only the first event can begin before the window
+        start, end, watts = self.events[-1]
+        joules -= watts * max(end - t, 0)  # only the last can end after it
+        return max(joules, 0.0) / self.seconds
+
+
+class RollingAverage:
+    """Time-averaged power over a sliding window, at every point where it changes slope: at the start and end of each
+    transmission, and one window length after them. Between these points it is linear."""
+    def __init__(self, seconds: float):
+        self.window = SlidingWindow(seconds)
+        self.pending = collections.deque()  # ends of windows that begin at earlier starts and ends, in order
+        self.last_end = -math.inf
+
+    def add(self, event: TxEvent) -> list:
+        """:return: List of (window end time, average watts) up to the end of event
+        :raises ValueError: if event overlaps or comes before the previous one
+        """
+        if event.start < self.last_end or event.end < event.start:
+            raise ValueError("transmissions out of order or overlapping at %s" % str(event.start))
+        window, pending = self.window, self.pending
+        samples = []
+        while pending and pending[0] <= event.start:
+            t = pending.popleft()
+            samples.append((t, window.average_watts(t)))
+        window.add(event.start, event.end, event.watts * event.duty / 100)
+        samples.append((event.start, window.average_watts(event.start)))
+        pending.append(event.start + window.seconds)  # within this event, if it is longer than the window
+        while pending and pending[0] < event.end:
+            t = pending.popleft()
+            samples.append((t, window.average_watts(t)))
+        samples.append((event.end, window.average_watts(event.end)))
+        pending.append(event.end + window.seconds)
+        self.last_end = event.end
+        return samples
+
+    def finish(self) -> list:
+        """:return: List of (window end time, average watts) until the window is past the last event"""
+        samples = [(t, self.window.average_watts(t)) for t in self.pending]
+        self.pending.clear()
+        return samples
+
+
+def rolling(events, seconds: float):
+    """:return: Generator of (window end time, average watts) over events (TxEvents in order, not overlapping), as
+        RollingAverage"""
+    average = RollingAverage(seconds)
+    for e in events:
+        yield from average.add(e)
+    yield from average.finish()
+
+
+class ExceedanceTracker:
+    """Follows the time-averaged exposure of one environment and finds where it is at or above 100% of MPE"""
+    def __init__(self, dbi: float, ft: float, mhz: float, ground_reflections: bool, controlled: bool):
+        """Arguments as exceedances().
+
+        :raises ValueError: if mhz is out of range
+        """
+        self.controlled = controlled
+        self.average = RollingAverage(WINDOW_SECONDS[controlled])
+        # percent of MPE per watt of average feedpoint power
+        limit = fcc.mpe_limits_cont_uncont_mwcm2(mhz)[0 if controlled else 1]
+        self.percent_per_watt = 100 * fcc.power_density_mwcm2(1000 * 10 ** (dbi / 10), ft, ground_reflections) / limit
+        self.previous = None  # (t, percent)
+        self.begin = None
+        self.peak = 0.0
+
+    def _update(self, samples: list) -> list:
+        """Percent of MPE is linear between samples, so crossings of 100% are interpolated."""
+        found = []
+        for t, watts in samples:
+            pct = watts * self.percent_per_watt
+            if self.previous is None:
+                if pct >= 100:
+                    self.begin, self.peak = t, pct
+            else:
+                t0, p0 = self.previous
+                if self.begin is None and pct >= 100:
+                    self.begin = t0 + (100 - p0) / (pct - p0) * (t - t0) if p0 < 100 and t > t0 else t
+                    self.peak = pct
+                elif self.begin is not None and pct < 100:
+                    end = t0 + (100 - p0) / (pct - p0) * (t - t0) if t > t0 else t
+                    found.append(Exceedance(self.controlled, self.begin, end, self.peak))
+                    self.begin = None
+                elif self.begin is not None:
+                    self.peak = max(self.peak, pct)
+            self.previous = (t, pct)
+        return found
+
+    def add(self, event: TxEvent) -> list:
+        """:return: List of the Exceedances that ended by the end of event"""
+        return self._update(self.average.add(event))
+
+    def finish(self) -> list:
+        """:return: List of the remaining Exceedances"""
+        return self._update(self.average.finish())
+
+
+def exceedances(events, dbi: float, ft: float, mhz: float, ground_reflections: bool, controlled: bool = None):
+    """Intervals where RFEvaluationReport compliance fails on the time-averaged power of a log.
+
+    :param events: Iterable of TxEvent, in order of start, not overlapping
+    :param dbi: Gain relative to isotropic (decibels)
+    :param ft: Distance from center of ANT to area of interest (feet)
+    :param mhz: Frequency of RF radiation (megahertz)
+    :param ground_reflections: Whether to account for radiation coming from ground reflections
+    :param controlled: Check only the controlled (True) or uncontrolled (False) environment; default both, in one
+        pass over events
+    :return: Generator of Exceedance, as they end
+    :raises ValueError: if events overlap or are out of order, or mhz is out of range
+    """
+    environments = (True, False) if controlled is None else (controlled,)
+    trackers = [ExceedanceTracker(dbi, ft, mhz, ground_reflections, c) for c in environments]
+    for e in events:
+        for tracker in trackers:
+            yield from tracker.add(e)
+    for tracker in trackers:
+        yield from tracker.finish()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m fcc_timeavg', description=__doc__.splitlines()[0])
+    parser.add_argument('log', help="CSV keying log (see read_log()), or - for stdin")
+    parser.add_argument('--dbi', type=float, required=True, help="antenna gain (dBi)")
+    parser.add_argument('--ft', type=float, required=True, help="distance to the area of interest (feet)")
+    parser.add_argument('--mhz', type=float, required=True, help="frequency (MHz)")
+    parser.add_argument('--ground-reflections', action='store_true')
+    args = parser.parse_args(argv)
+    stream = sys.stdin if args.log == '-' else open(args.log, newline='')
+    n = 0
+    try:
+        for e in exceedances(read_log(stream), args.dbi, args.ft, args.mhz, args.ground_reflections):
+            n += 1
+            print("%s: %s to %s, peak %.1f%% of MPE" % (
+                'controlled' if e.controlled else 'uncontrolled',
+                datetime.datetime.fromtimestamp(e.start, datetime.timezone.utc).isoformat(),
+                datetime.datetime.fromtimestamp(e.end, datetime.timezone.utc).isoformat(), e.peak_percent_mpe))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print("%d intervals over the MPE limit." % n, file=sys.stderr)
+    return 1 if n else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
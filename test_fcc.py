@@ -58,9 +58,24 @@ def one_web(pwr, gain, meters, mhz, ground, expected, rel=0.05):
     # assertions
     keys_in_order = "power_density power_density_c power_density_u ft_c ft_u compliant_c compliant_u".split()
     for i, k in enumerate(keys_in_order):
-        assert report.__dict__[k] == pytest.approx(expected[i], rel=rel)  # percentage is surprisingly high
+        assert getattr(report, k) == pytest.approx(expected[i], rel=rel)  # percentage is surprisingly high
 
 
+
+def test_rf_evaluation_report_lazy():
+    ant = fcc.PoweredAntenna(100, 50, 20, 2.2)
+    report = fcc.RFEvaluationReport(ant, 10, 29, True)
+    assert not hasattr(ant, '__dict__') and not hasattr(report, '__dict__')
+    assert report._ft_c is None and report._ft_u is None and report._text is None
+    assert report.compliant_u == (report.power_density < report.power_density_u)
+    assert report._ft_u is None  # compliance did not need the distance solve
+    ft_u = report.ft_u
+    assert report._ft_u == ft_u == fcc.compliant_distance_ft(ant.effective_isotropic_radiated_power,
+                                                            report.power_density_u, True)
+    assert str(report) is str(report)
+    with pytest.raises(AttributeError):
+        ant.color = 'red'
+
 def test_rf_evaluation_report():
     one_web(123, 2, 10, 420, True, [0.0398, 1.41, 0.29, 5.58, 12.41, True, True])
     one_web(456, 3, 17, 123, True, [0.0642, 1.01, 0.21, 14.17, 31.63, True, True])
@@ -88,6 +103,19 @@ def test_mpe_limits_cont_uncont_mwcm2():
     assert fcc.mpe_limits_cont_uncont_mwcm2(3000) == [5, 1]
 
 
+def test_band_index():
+    assert fcc.band_index(-1) is None
+    assert fcc.band_index(100000) is None
+    assert fcc.band_index(0.1) == 0
+    assert fcc.band_index(1.34) == 2
+    assert fcc.band_index(1.35) == 3
+    assert fcc.band_index(99999) == len(fcc.BAND_EDGES_MHZ) - 2
+    for table in [fcc.MPE_LIMIT_CONTROLLED, fcc.MPE_LIMIT_UNCONTROLLED, fcc.MPE_EXEMPTION]:
+        assert len(table) == len(fcc.BAND_EDGES_MHZ) - 1
+    assert fcc.mpe_limits_cont_uncont_mwcm2(1.34) == [100, 100]
+    assert fcc.mpe_limits_cont_uncont_mwcm2(1.35)[1] == 180 / 1.35 ** 2
+
+
 def test_inverses():
     """distance = f(power, density)
     density = f(power, distance)
@@ -220,6 +248,32 @@ def test_exempt_watts_generic():
     print("\n    Looped %d tests of exempt_watts_generic()." % n, end='')
 
 
+def test_exempt_threshold():
+    n = 0
+    for ghz, cm, mw in fcc_table():
+        assert fcc.exempt_threshold(cm / 100, ghz * 1000) == fcc.exempt_watts_generic(cm / 100, ghz * 1000)
+        n += 1
+    for meters, mhz in mpe_usable_values():
+        assert fcc.exempt_threshold(meters, mhz) == fcc.exempt_watts_generic(meters, mhz)
+        n += 1
+    for meters, mhz, why_exception in mpe_exception_values():
+        w, s = fcc.exempt_threshold(meters, mhz)
+        assert math.isnan(w)
+        assert s == (fcc.OUT_OF_RANGE if why_exception == 'freq' else fcc.NEARFIELD)
+        n += 1
+    w, s = fcc.exempt_threshold(1, 0)
+    assert math.isnan(w) and s == fcc.OUT_OF_RANGE
+    print("\n    Looped %d tests of exempt_threshold()." % n, end='')
+
+
+def test_validate_crossover():
+    for ghz_low, ghz_high, crossover_cm in fcc.SAR_CROSSOVER:
+        assert crossover_cm == pytest.approx(39.92, abs=0.01)
+    assert fcc.validate_crossover(mhz_step=50, cm_step=0.1) == []
+    w, s = fcc.exempt_watts_generic(0.3992179855667828, 1000)  # right at the crossover, uses both methods
+    assert s in ('SAR wins', 'MPE wins')
+
+
 def test_exempt_milliwatts_sar():
     n = 0
     for f, d, ref in fcc_table():
@@ -315,3 +369,110 @@ def fcc_table():
         for cm in [0.5, 1, 1.5, 2]:  # First 4 columns
             yield ghz, cm, reference_mw[i]
             i += 1
+
+
+# Inverse functions ########
+
+
+def test_max_exempt_watts():
+    for ghz, cm, mw in fcc_table():
+        assert fcc.max_exempt_watts(cm / 100, ghz * 1000, 'SAR') == fcc.exempt_milliwatts_sar(cm, ghz) / 1000
+        assert fcc.max_exempt_watts(cm / 100, ghz * 1000) == fcc.exempt_watts_generic(cm / 100, ghz * 1000)[0]
+    for meters, mhz in mpe_usable_values():
+        assert fcc.max_exempt_watts(meters, mhz, 'MPE') == fcc.exempt_watts_mpe(meters, mhz)
+    for meters, mhz, dummy in mpe_exception_values():
+        assert fcc.max_exempt_watts(meters, mhz) == 0
+    assert fcc.max_exempt_watts(0.5, 450, 'SAR') == 0  # beyond 40 cm
+    with pytest.raises(ValueError):
+        fcc.max_exempt_watts(1, 450, 'ESP')
+
+
+def test_min_exempt_distance():
+    n = 0
+    for watts in [0.001, 0.02, 0.5, 3, 5, 100, 1500]:
+        for mhz in [0.5, 1, 3.9, 14.2, 29, 50, 146, 310, 450, 1000, 2400, 5800, 10000]:
+            for method in ['SAR', 'MPE', 'generic']:
+                meters = fcc.min_exempt_distance(watts, mhz, method)
+                if math.isinf(meters):
+                    assert method == 'SAR'  # MPE exemption always applies far enough away
+                    continue
+                assert fcc.max_exempt_watts(meters * (1 + 1e-9), mhz, method) > watts
+                assert fcc.max_exempt_watts(meters * (1 - 1e-9), mhz, method) <= watts
+                n += 1
+    print("\n    Looped %d tests of min_exempt_distance()." % n, end='')
+    assert fcc.min_exempt_distance(4, 450, 'SAR') == math.inf  # above the 20 cm SAR threshold
+    assert fcc.min_exempt_distance(1, 101000) == math.inf
+    with pytest.raises(ValueError):
+        fcc.min_exempt_distance(1, 450, 'ESP')
+
+
+def test_compliance_margin():
+    ssb = fcc.PoweredAntenna(100, 50, 20, 2.2)
+    for ft in [0.3, 1, 3, 10, 300]:
+        for mhz in [0.5, 3.9, 14.2, 29, 146, 450, 2400, 5800, 10000]:
+            for controlled in [True, False]:
+                compliant = fcc.is_compliant(ssb, ft, mhz, True, controlled)[0]
+                assert compliant == (fcc.compliance_margin(ssb, ft, mhz, True, controlled) > 1)
+    assert fcc.compliance_margin(fcc.PoweredAntenna(0, 50, 20, 2.2), 3, 29, True, True) == math.inf
+    with pytest.raises(ValueError):
+        fcc.compliance_margin(ssb, 3, 101000, True, True)
+
+
+def test_worst_case_over_band():
+    n = 0
+    for watts in [0.01, 0.5, 5, 100, 1500]:
+        for ft in [0.1, 0.6, 1.3, 3, 50]:
+            for f_lo, f_hi in [(0.3, 99999), (1, 2), (1.8, 54), (25, 6500), (280, 1600), (5000, 7000)]:
+                antenna = fcc.PoweredAntenna(watts, 50, 40, 6)
+                mhz, margin, method = fcc.worst_case_over_band(antenna, ft, f_lo, f_hi, True, False)
+                assert f_lo <= mhz <= f_hi
+                assert margin == fcc.compliance_margin(antenna, ft, mhz, True, False)
+                assert method == fcc.is_compliant(antenna, ft, mhz, True, False)[1]
+                for k in range(1001):  # no frequency of a dense scan is worse
+                    f = min(f_lo * (f_hi / f_lo) ** (k / 1000), f_hi)
+                    assert margin <= fcc.compliance_margin(antenna, ft, f, True, False) * (1 + 1e-12)
+                n += 1
+    print("\n    Looped %d tests of worst_case_over_band()." % n, end='')
+    assert fcc.worst_case_over_band(fcc.PoweredAntenna(100, 100, 40, 2.2), 6, 1.8, 54, True, False)[0] == 30
+    assert fcc.worst_case_over_band(fcc.PoweredAntenna(100, 100, 40, 2.2), 6, 14, 14, True, False)[0] == 14
+    with pytest.raises(ValueError):
+        fcc.worst_case_over_band(fcc.PoweredAntenna(100, 100, 40, 2.2), 6, 54, 1.8, True, False)
+    with pytest.raises(ValueError):
+        fcc.worst_case_over_band(fcc.PoweredAntenna(100, 100, 40, 2.2), 6, 50000, 150000, True, False)
+
+
+# Instrumentation ########
+
+
+def test_stats():
+    fcc.reset_stats()
+    ssb = fcc.PoweredAntenna(100, 50, 20, 2.2)
+    fcc.is_compliant(ssb, 3, 29, True, True)  # evaluation
+    assert fcc.stats_snapshot()['counters'] == {}  # disabled
+    fcc.enable_stats()
+    try:
+        fcc.enable_stats()  # twice is harmless
+        fcc.is_compliant(ssb, 300, 29, True, False)  # MPE
+        fcc.is_compliant(ssb, 3, 29, True, True)  # near field, evaluation
+        fcc.is_compliant(fcc.PoweredAntenna(0.031, 100, 100, 0), 1 / 12 / 2.54, 300, True, False)  # SAR
+        fcc.exempt_watts_generic(0.16, 310)
+        fcc.min_exempt_distance(5, 420)
+        snapshot = fcc.stats_snapshot()
+    finally:
+        fcc.disable_stats()
+    assert snapshot['enabled'] and not fcc.stats_snapshot()['enabled']
+    counters = snapshot['counters']
+    assert counters['is_compliant/MPE'] == 1
+    assert counters['is_compliant/evaluation'] == 1
+    assert counters['is_compliant/SAR'] == 1
+    assert counters['is_exempt/nearfield'] == 1
+    assert counters['exempt_threshold/SAR wins'] == 1
+    timings = snapshot['timings']
+    assert timings['exemption']['calls'] == 3
+    assert timings['evaluation']['calls'] == 1
+    assert timings['distance solve']['calls'] == 1  # the evaluation's are lazy
+    assert all(t['seconds'] > 0 for t in timings.values())
+    fcc.is_compliant(ssb, 300, 29, True, False)
+    assert fcc.stats_snapshot()['counters'] == counters  # kept, but no longer counting
+    fcc.reset_stats()
+    assert fcc.stats_snapshot() == {'enabled': False, 'counters': {}, 'timings': {}}
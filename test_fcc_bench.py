@@ -0,0 +1,32 @@
+import pytest
+import fcc_bench
+
+
+def test_run_suite():
+    results = fcc_bench.run_suite(n=20, only='microwave')
+    assert 'is_compliant/microwave' in results
+    assert 'is_compliant_batch/microwave' in results
+    assert all(r['calls_per_second'] > 0 and r['p50_us'] <= r['p99_us'] for r in results.values())
+    slower = {name: dict(r, calls_per_second=r['calls_per_second'] * 2) for name, r in results.items()}
+    assert fcc_bench.compare(results, results) == []
+    assert len(fcc_bench.compare(results, slower, threshold=0.2)) == len(results)
+    assert fcc_bench.compare(results, slower, threshold=0.6) == []
+
+
+def test_station_mix():
+    for workload in fcc_bench.WORKLOADS:
+        assert len(fcc_bench.station_mix(workload, 10)) == 10
+    with pytest.raises(ValueError):
+        fcc_bench.station_mix('vibes')
+
+
+def test_main(tmp_path):
+    path = str(tmp_path / 'baseline.json')
+    assert fcc_bench.main(['--n', '20', '--only', 'near_field', '--save', path]) == 0
+    assert fcc_bench.main(['--n', '20', '--only', 'near_field', '--compare', path, '--threshold', '0.99']) == 0
+
+
+def test_run_startup():
+    results = fcc_bench.run_startup(n=5, repeat=1)
+    assert set(results) == set(fcc_bench.STARTUP_COMMANDS) | {'startup/served query'}
+    assert all(r['calls_per_second'] > 0 and r['p50_us'] <= r['p99_us'] for r in results.values())
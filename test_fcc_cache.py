@@ -0,0 +1,60 @@
+import fcc_cache
+import fcc_cli
+from test_fcc_cli import inventory, expected
+
+
+def test_evaluate(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    records = list(inventory(100))
+    calls = []
+
+    def evaluate(chunk):
+        calls.append(len(chunk))
+        return fcc_cli.evaluate_chunk(chunk)
+
+    with fcc_cache.ResultCache(path) as cache:
+        assert cache.evaluate(records, evaluate) == [expected(r) for r in records]
+        assert cache.stats() == {'hits': 0, 'misses': 100, 'hit_rate': 0.0, 'evictions': 0, 'entries': 100}
+    changed = [dict(r, watts=str(r['watts'])) for r in records]  # same values, canonicalized
+    changed[3] = dict(changed[3], ft=changed[3]['ft'] + 1)
+    changed[5] = dict(changed[5], mhz='bad')
+    with fcc_cache.ResultCache(path) as cache:  # persistent
+        results = cache.evaluate(changed, evaluate)
+        assert results[3] == expected(dict(records[3], ft=records[3]['ft'] + 1))
+        assert results[5][1].startswith('error')
+        assert results[:3] == [expected(r) for r in records[:3]]
+        assert calls == [100, 2]
+        assert cache.stats()['hits'] == 98 and cache.stats()['entries'] == 101  # errors are not stored
+    with fcc_cache.ResultCache(path, version='other') as cache:
+        cache.evaluate(records[:10], evaluate)
+        assert cache.stats()['hits'] == 0
+        assert cache.purge() == 101
+        assert cache.stats()['entries'] == 10
+
+
+def test_eviction(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    records = list(inventory(50))
+    with fcc_cache.ResultCache(path, max_entries=30) as cache:
+        cache.evaluate(records[:20], fcc_cli.evaluate_chunk)
+    with fcc_cache.ResultCache(path, max_entries=30) as cache:
+        cache.evaluate(records[:10], fcc_cli.evaluate_chunk)  # used again
+        cache.evaluate(records[20:40], fcc_cli.evaluate_chunk)
+        stats = cache.stats()
+        assert stats['entries'] == 30 and stats['evictions'] == 10
+        results, misses, keys = cache.lookup(records[:20])
+        assert misses == list(range(10, 20))  # the least recently used went first
+    with fcc_cache.ResultCache(path, max_entries=30) as cache:
+        assert cache.stats()['entries'] == len(cache.results) == 30
+
+
+def test_batch_with_cache(tmp_path, capsys):
+    records = list(inventory(60))
+    for workers in (1, 2):
+        path = str(tmp_path / ('cache%d.sqlite' % workers))
+        with fcc_cache.ResultCache(path) as cache:
+            cache.evaluate(records[:40], fcc_cli.evaluate_chunk)
+        with fcc_cache.ResultCache(path) as cache:
+            results = list(fcc_cli.evaluate_stream(iter(records), chunk_size=7, workers=workers, cache=cache))
+            assert [result for r, result in results] == [expected(r) for r in records]
+            assert (cache.stats()['hits'], cache.stats()['misses']) == (40, 20)
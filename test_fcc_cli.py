@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+import fcc
+import fcc_cli
+
+
+def inventory(n):
+    for i in range(n):
+        yield {'watts': 5 + i % 1500, 't_average': 50, 'duty': [20, 40, 100][i % 3], 'dbi': 2.2, 'ft': 0.5 + i % 40,
+               'mhz': [3.9, 14.2, 146, 450, 2400][i % 5], 'ground_reflections': i % 2 == 0, 'controlled': i % 7 == 0}
+
+
+def expected(record):
+    antenna = fcc.PoweredAntenna(record['watts'], record['t_average'], record['duty'], record['dbi'])
+    return fcc.is_compliant(antenna, record['ft'], record['mhz'], record['ground_reflections'], record['controlled'])
+
+
+def test_evaluate_stream():
+    records = list(inventory(250))
+    for workers in [1, 2]:
+        results = list(fcc_cli.evaluate_stream(iter(records), chunk_size=16, workers=workers))
+        assert [r for r, result in results] == records  # input order kept
+        assert [result for r, result in results] == [expected(r) for r in records]
+
+
+def test_evaluate_chunk_errors():
+    records = list(inventory(3))
+    records[1] = dict(records[1], mhz=101000)
+    results = fcc_cli.evaluate_chunk(records)
+    assert results[0] == expected(records[0]) and results[2] == expected(records[2])
+    assert results[1][1].startswith('error')
+
+
+def test_batch(tmp_path):
+    records = list(inventory(40))
+    src = tmp_path / 'stations.csv'
+    with open(str(src), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fcc_cli.FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+    out = tmp_path / 'results.jsonl'
+    assert fcc_cli.main(['batch', str(src), '-o', str(out), '--chunk-size', '7']) == 0
+    rows = [json.loads(line) for line in io.StringIO(out.read_text())]
+    assert [(r['compliant'], r['method']) for r in rows] == [expected(r) for r in records]
+
+
+def test_parse_bool():
+    assert fcc_cli.parse_bool('True') is True
+    assert fcc_cli.parse_bool(' no ') is False
+    assert fcc_cli.parse_bool(0) is False
+
+
+def test_answer():
+    ssb = fcc.PoweredAntenna(100, 50, 40, 2.2)
+    assert fcc_cli.answer('is_compliant 100 50 40 2.2 20 14.2 true false\n') == '%s\t%s' % fcc.is_compliant(
+        ssb, 20, 14.2, True, False)
+    assert fcc_cli.answer('  exempt_watts_generic 0.16 310') == '%r\t%s' % fcc.exempt_watts_generic(0.16, 310)
+    assert fcc_cli.answer('min_exempt_distance 100 146') == repr(fcc.min_exempt_distance(100, 146))
+    assert fcc_cli.answer('max_exempt_watts 1 444') == repr(fcc.max_exempt_watts(1, 444))
+    assert fcc_cli.answer('is_exempt 1 0.5 14.2') == '%s\t%s' % fcc.is_exempt(1, 0.5, 14.2)
+    assert fcc_cli.answer('is_exempt 1 0.5').startswith('error\tusage: is_exempt watts meters mhz')
+    assert fcc_cli.answer('exempt_watts_generic 0.1 14').startswith('error\tR < L/2pi')
+    assert fcc_cli.answer('is_compliant 100 50 40 2.2 20 14.2 maybe false').startswith('error\tnot a boolean')
+    assert fcc_cli.answer('vibes 1 2').startswith('error\tunknown query')
+    assert fcc_cli.answer('').startswith('error\tunknown query')
+
+
+def test_serve():
+    out = io.StringIO()
+    fcc_cli.serve(io.StringIO('min_exempt_distance 100 146\n\nis_exempt 1 0.5 14.2\n'), out)
+    assert out.getvalue().splitlines() == [fcc_cli.answer('min_exempt_distance 100 146'), fcc_cli.answer(''),
+                                           fcc_cli.answer('is_exempt 1 0.5 14.2')]
+
+
+def test_socket_server(tmp_path):
+    import socket
+    import threading
+    path = str(tmp_path / 'fcc.sock')
+    with fcc_cli.socket_server(path) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with socket.socket(socket.AF_UNIX) as client:
+                client.connect(path)
+                with client.makefile('rw') as stream:
+                    for line in ['is_compliant 100 50 40 2.2 20 14.2 true false', 'exempt_watts_generic 0.16 310']:
+                        stream.write(line + '\n')
+                        stream.flush()
+                        assert stream.readline() == fcc_cli.answer(line) + '\n'
+        finally:
+            server.shutdown()
+    with fcc_cli.socket_server(path) as server:  # the stale socket file is replaced
+        pass
+
+
+def test_main_query(capsys):
+    assert fcc_cli.main(['is_compliant', '100', '50', '40', '2.2', '20', '14.2', 'true', 'false']) == 0
+    assert capsys.readouterr().out == fcc_cli.answer('is_compliant 100 50 40 2.2 20 14.2 true false') + '\n'
+    assert fcc_cli.main(['exempt_watts_generic', '0.1', '14']) == 1
+    assert capsys.readouterr().out.startswith('error')
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+import fcc
+import fcc_montecarlo
+
+INPUTS = {'watts': ('uniform', 70, 100), 't_average': 50, 'duty': 40, 'dbi': ('normal', 2.2, 0.5),
+          'ft': ('triangular', 1.5, 2, 3)}
+
+
+def test_no_uncertainty():
+    fixed = {'watts': 100, 't_average': 50, 'duty': 40, 'dbi': 2.2, 'ft': 2}
+    result = fcc_montecarlo.run(fixed, 14.2, True, samples=1000, block_size=300)
+    report = fcc.RFEvaluationReport(fcc.PoweredAntenna(100, 50, 40, 2.2), 2, 14.2, True)
+    assert result.samples == 1000
+    assert result.stats['power_density'].mean == pytest.approx(report.power_density, rel=1e-12)
+    assert result.stats['power_density'].std == pytest.approx(0, abs=1e-9)
+    assert result.stats['ft_u'].max == pytest.approx(report.ft_u, rel=1e-12)
+    assert result.quantile('ft_u', 0.5) == pytest.approx(report.ft_u, rel=0.005)
+    assert result.exceedance_probability(False) == (not report.compliant_u)
+    assert result.exceedance_probability(True) == (not report.compliant_c)
+
+
+def test_statistics_match_samples():
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(0, 2, 50000)
+    stats = fcc_montecarlo.RunningStats()
+    sketch = fcc_montecarlo.QuantileSketch(0.01)
+    for part in np.array_split(values, 7):
+        stats.add(part)
+        sketch.add(part)
+    assert stats.count == 50000
+    assert stats.mean == pytest.approx(values.mean(), rel=1e-10)
+    assert stats.variance == pytest.approx(values.var(ddof=1), rel=1e-10)
+    for q in (0.01, 0.5, 0.9, 0.999):
+        assert sketch.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.03)
+
+
+def test_reproducible():
+    one = fcc_montecarlo.run(INPUTS, 14.2, True, samples=20000, block_size=4096, seed=7)
+    two = fcc_montecarlo.run(INPUTS, 14.2, True, samples=20000, block_size=4096, seed=7, workers=2)
+    other = fcc_montecarlo.run(INPUTS, 14.2, True, samples=20000, block_size=4096, seed=8)
+    assert str(one) == str(two) != str(other)
+    assert one.stats['percent_mpe_u'].mean == two.stats['percent_mpe_u'].mean
+    assert 0 < one.exceedance_probability(False) < 1  # 2 ft is marginal for the uncontrolled limit
+    assert one.exceedance_stderr(False) < 0.005
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        fcc_montecarlo.run(dict(INPUTS, ft=('gamma', 1, 2)), 14.2, True, samples=10)
+    with pytest.raises(ValueError):
+        fcc_montecarlo.run({'watts': 5}, 14.2, True, samples=10)
+    with pytest.raises(ValueError):
+        fcc_montecarlo.run(INPUTS, 101000, True, samples=10)
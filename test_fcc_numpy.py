@@ -0,0 +1,132 @@
+import itertools
+import numpy as np
+import pytest
+import fcc
+import fcc_numpy
+
+
+def scalar_grid():
+    """Inputs spanning HF through microwave, near field through far field, exempt and non-exempt."""
+    rng = np.random.default_rng(1234)
+    n = 4000
+    watts = 10 ** rng.uniform(-3, 3.5, n)
+    t_average = rng.choice([10, 50, 100], n)
+    duty = rng.choice([20, 40, 100], n)
+    dbi = rng.uniform(-3, 20, n)
+    ft = 10 ** rng.uniform(-2.5, 2.5, n)
+    mhz = 10 ** rng.uniform(np.log10(0.31), np.log10(99999), n)
+    ground = rng.random(n) < 0.5
+    controlled = rng.random(n) < 0.5
+    return watts, t_average, duty, dbi, ft, mhz, ground, controlled
+
+
+def test_is_compliant_batch():
+    args = scalar_grid()
+    compliant, method = fcc_numpy.is_compliant_batch(*args)
+    n = 0
+    for i, (w, t, du, db, ft, mhz, gr, co) in enumerate(zip(*[a.tolist() for a in args])):
+        expected = fcc.is_compliant(fcc.PoweredAntenna(w, t, du, db), ft, mhz, gr, co)
+        assert (bool(compliant[i]), str(method[i])) == expected
+        n += 1
+    assert set(method) >= {'SAR', 'MPE', 'SAR wins', 'evaluation'}
+    print("\n    Looped %d tests of is_compliant_batch()." % n, end='')
+    with pytest.raises(ValueError):
+        fcc_numpy.is_compliant_batch(5, 100, 100, 0, [1, 100000], 101000, False, False)
+    with pytest.raises(ValueError):
+        fcc_numpy.is_compliant_batch(5, 110, 100, 0, 1, 420, False, False)
+    with pytest.raises(ValueError):
+        fcc_numpy.is_compliant_batch(5, 100, 100, 0, 1, 420, 'y', False)
+
+
+def test_exempt_watts_generic():
+    meters = [0.005, 0.01, 0.16, 0.398, 0.4, 1, 3, 50, 30000]
+    mhz = [0.5, 1, 20, 120, 310, 450, 1000, 2000, 7000, 10000]
+    n = 0
+    for m, f in itertools.product(meters, mhz):
+        threshold, method = fcc_numpy.exempt_watts_generic(m, f)
+        try:
+            expected_threshold, expected_method = fcc.exempt_watts_generic(m, f)
+            assert threshold == pytest.approx(expected_threshold, rel=1e-12)
+            assert fcc_numpy.METHODS[method] == expected_method
+        except fcc.RFEvaluationError:
+            assert np.isnan(threshold) and method == fcc_numpy.NEARFIELD
+        n += 1
+    print("\n    Looped %d tests of exempt_watts_generic()." % n, end='')
+    threshold, method = fcc_numpy.exempt_watts_generic(30000, 101000)
+    assert np.isnan(threshold) and method == -1
+
+
+def test_is_exempt_batch():
+    exempt, method = fcc_numpy.is_exempt_batch([5, 5], [1, 0.01], [420, 144])
+    assert list(exempt) == [True, False]
+    assert list(method) == ['MPE', 'nearfield']
+    with pytest.raises(ValueError):
+        fcc_numpy.is_exempt_batch(0.42, 30000, 0.1)
+
+
+def test_mpe_limits_cont_uncont_mwcm2():
+    mhz = [0.5, 1.34, 2, 3, 15, 30, 40, 300, 420, 1500, 3000]
+    controlled, uncontrolled = fcc_numpy.mpe_limits_cont_uncont_mwcm2(mhz)
+    for i, f in enumerate(mhz):
+        assert [controlled[i], uncontrolled[i]] == fcc.mpe_limits_cont_uncont_mwcm2(f)
+    controlled, uncontrolled = fcc_numpy.mpe_limits_cont_uncont_mwcm2([0, -12.34, 101000])
+    assert np.isnan(controlled).all() and np.isnan(uncontrolled).all()
+
+
+def test_band_index():
+    mhz = [-1, 0, 0.1, 0.3, 1.34, 1.35, 3, 29, 30, 300, 1500, 99999, 100000]
+    expected = [fcc.band_index(f) for f in mhz]
+    expected = [len(fcc.BAND_EDGES_MHZ) - 1 if i is None else i for i in expected]
+    assert list(fcc_numpy.band_index(mhz)) == expected
+
+
+def test_exempt_milliwatts_sar():
+    for ghz, cm in itertools.product([0.3, 0.45, 0.835, 1.5, 6], [0, 0.5, 1, 20, 40]):
+        assert fcc_numpy.exempt_milliwatts_sar(cm, ghz) == pytest.approx(fcc.exempt_milliwatts_sar(cm, ghz), rel=1e-12)
+    assert np.isnan(fcc_numpy.exempt_milliwatts_sar([41, 20, 20, -1], [1, 0.1, 7, 0.4])).all()
+
+
+def test_rf_evaluation_report_batch():
+    watts, t_average, duty, dbi, ft, mhz, ground, controlled = scalar_grid()
+    batch = fcc_numpy.RFEvaluationReportBatch(watts, t_average, duty, dbi, ft, mhz, ground)
+    assert len(batch) == len(watts)
+    keys = "power_density power_density_c power_density_u ft_c ft_u compliant_c compliant_u".split()
+    for i in range(0, len(batch), 7):
+        report = fcc.RFEvaluationReport(fcc.PoweredAntenna(watts[i], t_average[i], duty[i], dbi[i]), ft[i], mhz[i],
+                                        bool(ground[i]))
+        row = batch[i]
+        for k in keys:
+            assert getattr(row, k) == pytest.approx(getattr(report, k), rel=1e-12)
+        assert str(row).splitlines()[0].startswith("Power density (mW/cm^2):")
+    assert batch[-1].ft == ft[-1]
+    with pytest.raises(IndexError):
+        batch[len(batch)]
+    sub = batch[batch.compliant_u]
+    assert len(sub) == batch.compliant_u.sum() and sub.compliant_u.all()
+    assert list(batch.to_numpy().dtype.names) == list(fcc_numpy.RFEvaluationReportBatch.columns)
+    with pytest.raises(ValueError):
+        fcc_numpy.RFEvaluationReportBatch(5, 100, 100, 0, 1, [420, 101000], False)
+
+
+def test_rf_evaluation_report_batch_csv(tmp_path):
+    batch = fcc_numpy.RFEvaluationReportBatch(100, 50, 20, 2.2, [3, 6, 300], 29, True)
+    path = tmp_path / "reports.csv"
+    batch.to_csv(str(path))
+    lines = path.read_text().splitlines()
+    assert lines[0] == ','.join(fcc_numpy.RFEvaluationReportBatch.columns)
+    assert len(lines) == 4
+    table = np.genfromtxt(str(path), delimiter=',', names=True)
+    assert table['power_density'] == pytest.approx(batch.power_density)
+
+
+def test_min_exempt_distance():
+    watts, mhz = np.meshgrid([0, 0.001, 0.02, 0.5, 3, 5, 100, 1500], [0.1, 0.5, 14.2, 146, 310, 450, 2400, 10000, 101000])
+    for method in ['SAR', 'MPE', 'generic']:
+        meters = fcc_numpy.min_exempt_distance(watts, mhz, method)
+        expected = [fcc.min_exempt_distance(w, f, method) for w, f in zip(watts.flat, mhz.flat)]
+        assert meters.ravel() == pytest.approx(expected, rel=1e-12)
+        thresholds = fcc_numpy.max_exempt_watts(meters, mhz, method)
+        expected = [fcc.max_exempt_watts(m, f, method) for m, f in zip(meters.flat, mhz.flat)]
+        assert thresholds.ravel() == pytest.approx(expected, rel=1e-12)
+    with pytest.raises(ValueError):
+        fcc_numpy.min_exempt_distance(1, 450, 'ESP')
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import fcc
+import fcc_pattern
+
+
+def cardioid(resolution=0.5):
+    az = np.arange(0, 360, 10.0)
+    el = np.arange(-90, 91, 15.0)
+    gain = 6 + 10 * np.log10(np.maximum((1 + np.cos(np.radians(az)))[None, :] / 2 * np.cos(np.radians(el))[:, None],
+                                        1e-3))
+    return fcc_pattern.AntennaPattern(az, el, gain, resolution), az, el, gain
+
+
+def test_lookup():
+    pattern, az, el, gain = cardioid()
+    assert pattern.peak_dbi == pytest.approx(6)
+    assert pattern.gain_dbi(az[None, :], el[:, None]) == pytest.approx(gain)  # table points are grid points
+    assert pattern.gain_dbi(359.9, 0) == pattern.gain_dbi(0, 0) == pattern.gain_dbi(-360, 0)
+    assert pattern.gain_dbi(5, 0) == pytest.approx((gain[6, 0] + gain[6, 1]) / 2)  # bilinear between columns
+    assert pattern.gain_dbi(0, 120) == pattern.gain_dbi(0, 90)
+    assert pattern.gain_dbi(180, 0) < -20
+    with pytest.raises(ValueError):
+        fcc_pattern.AntennaPattern([0, 10], [0], [[1, 2, 3]])
+    with pytest.raises(ValueError):
+        fcc_pattern.AntennaPattern([10, 0], [0], [[1, 2]])
+
+
+def test_isotropic_matches_scalar():
+    antenna = fcc.PoweredAntenna(50, 100, 100, 2.2)
+    pattern = fcc_pattern.AntennaPattern.isotropic(2.2)
+    ft, az, el = fcc_pattern.observe((0, 0, 30), [(10, 0, 6), (0, -40, 6), (3, 3, 30)])
+    batch = fcc_pattern.evaluate(antenna, pattern, ft, 146, True, az, el)
+    for i, distance in enumerate(ft):
+        report = fcc.RFEvaluationReport(antenna, distance, 146, True)
+        assert batch[i].power_density == pytest.approx(report.power_density, rel=1e-12)
+        assert batch[i].ft_u == pytest.approx(report.ft_u, rel=1e-12)
+    density = fcc_pattern.power_density_mwcm2(antenna, pattern, ft, az, el, True)
+    assert density == pytest.approx(batch.power_density, rel=1e-12)
+
+
+def test_directional():
+    pattern = cardioid()[0]
+    antenna = fcc.PoweredAntenna(50, 100, 100, pattern.peak_dbi)
+    points = [(20, 0, 0), (0, 20, 0), (-20, 0, 0)]
+    ft, az, el = fcc_pattern.observe((0, 0, 0), points, boresight=90)
+    assert az == pytest.approx([270, 0, 90])
+    assert el == pytest.approx([0, 0, 0])
+    batch = fcc_pattern.evaluate(antenna, pattern, ft, 146, False, az, el)
+    front = fcc.RFEvaluationReport(antenna, 20, 146, False)
+    assert batch[1].power_density == pytest.approx(front.power_density)  # on the beam: the peak gain
+    assert batch[0].power_density < front.power_density / 2
+    assert batch[0].ft_u < front.ft_u
+    _, _, tilted = fcc_pattern.observe((0, 0, 0), points, boresight=90, downtilt=10)
+    assert tilted == pytest.approx([10, 10, 10])
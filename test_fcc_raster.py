@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import fcc
+import fcc_raster
+import fcc_site
+
+
+def one_emitter_site():
+    antenna = fcc.PoweredAntenna(1500, 100, 100, 2.2)
+    return fcc_site.Site([fcc_site.Emitter(antenna, (3, -2, 10), 14.2, True)])
+
+
+def test_rasterize(tmp_path):
+    site = one_emitter_site()
+    x = np.linspace(-40, 40, 81)
+    y = np.linspace(-30, 30, 61)
+    raster = fcc_raster.rasterize(site, x, y, z=6, controlled=False, tile_points=1000)
+    assert raster.shape == (61, 81)
+    assert raster[10, 20] == pytest.approx(site.percent_mpe([(x[20], y[10], 6)], False)[0])
+    density = fcc_raster.rasterize(site, x, y, z=[0, 6], quantity='power_density', out=str(tmp_path / 'r.npy'))
+    assert density.shape == (2, 61, 81)
+    assert np.load(str(tmp_path / 'r.npy'))[1] == pytest.approx(site.power_density(
+        np.column_stack([np.tile(x, 61), np.repeat(y, 81), np.full(61 * 81, 6)])).reshape(61, 81))
+    with pytest.raises(ValueError):
+        fcc_raster.rasterize(site, x, y, 6, quantity='vibes')
+
+
+def test_compliance_boundaries():
+    site = one_emitter_site()
+    x = np.linspace(-60, 60, 241)
+    y = np.linspace(-60, 60, 241)
+    boundaries = fcc_raster.compliance_boundaries(site, x, y, z=6)
+    for name, controlled in [('controlled', True), ('uncontrolled', False)]:
+        polygons = boundaries[name]
+        assert len(polygons) == 1
+        assert (polygons[0][0] == polygons[0][-1]).all()  # closed
+        assert fcc_raster.single_source_error(site, polygons, 6, controlled) < 0.5  # grid step is 0.5 ft
+    with pytest.raises(ValueError):
+        fcc_raster.single_source_error(fcc_site.Site([]), [], 6, True)
+
+
+def test_boundary_polygons_open():
+    x = np.arange(5.0)
+    y = np.arange(4.0)
+    raster = np.tile(x * 50, (4, 1))  # crosses 100 at x == 2, top to bottom
+    polygons = fcc_raster.boundary_polygons(raster, x, y)
+    assert len(polygons) == 1
+    assert polygons[0][:, 0] == pytest.approx(2)
+    assert sorted(polygons[0][:, 1]) == pytest.approx(y)
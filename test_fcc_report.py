@@ -0,0 +1,63 @@
+import csv
+import io
+import numpy as np
+import pytest
+import fcc
+import fcc_numpy
+import fcc_report
+
+
+def reports():
+    dipole = fcc.PoweredAntenna(100, 100, 40, 2.2)
+    return [fcc.RFEvaluationReport(dipole, ft, mhz, True) for ft in (0.5, 6, 20) for mhz in (7.05, 14.05, 50.05, 446)]
+
+
+def test_text():
+    out = io.StringIO()
+    assert fcc_report.write_reports(reports(), out, chunk_size=5) == 12
+    blocks = out.getvalue().split('\n\n')
+    assert len(blocks) == 13 and blocks[-1] == ''
+    for block, report in zip(blocks, reports()):
+        first, rest = block.split('\n', 1)
+        assert first.startswith('EIRP (mW): %s, distance (ft): %s' % (report.antenna.effective_isotropic_radiated_power,
+                                                                     report.ft))
+        assert rest == str(report)
+
+
+def test_markdown():
+    out = io.StringIO()
+    fcc_report.write_reports(reports(), out, fmt='markdown')
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 2 + 12
+    assert all(line.count('|') == len(fcc_report.COLUMNS) + 1 for line in lines)
+    assert lines[2].split(' | ')[-2:] == ['False', 'False |']  # 0.5 ft from 100 W at 7 MHz
+    out = io.StringIO()
+    fcc_report.write_reports(reports()[:1], out, fmt='markdown', header=False)
+    assert out.getvalue() == lines[2] + '\n'
+    with pytest.raises(ValueError):
+        fcc_report.write_reports(reports(), out, fmt='pdf')
+
+
+def test_csv_batch():
+    """A columnar batch, its rows, and the equivalent reports all render the same."""
+    ft = np.array([0.5, 6, 20, 100])
+    mhz = np.array([7.05, 146, 446, 2400])
+    batch = fcc_numpy.RFEvaluationReportBatch(100, 100, 40, 2.2, ft, mhz, True)
+    dipole = fcc.PoweredAntenna(100, 100, 40, 2.2)
+    scalar = [fcc.RFEvaluationReport(dipole, f, m, True) for f, m in zip(ft.tolist(), mhz.tolist())]
+    outputs = []
+    for source in (batch, list(batch), scalar):
+        out = io.StringIO()
+        assert fcc_report.write_reports(source, out, fmt='csv', chunk_size=3) == 4
+        outputs.append(out.getvalue())
+    table = list(csv.DictReader(io.StringIO(outputs[0])))
+    assert len(table) == 4 and list(table[0]) == list(fcc_report.COLUMNS)
+    assert float(table[1]['ft_u']) == batch.ft_u[1]
+    assert outputs[1] == outputs[0]
+    for line, expected in zip(outputs[2].splitlines()[1:], table):
+        values = line.split(',')
+        for name, value in zip(fcc_report.COLUMNS, values):
+            if value in ('True', 'False'):
+                assert value == expected[name]
+            else:
+                assert float(value) == pytest.approx(float(expected[name]), rel=1e-12)
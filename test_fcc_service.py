@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+import fcc
+import fcc_bench
+import fcc_service
+
+
+def run_with_service(coroutine_function, **kwargs):
+    """Start a Service on a free port, run coroutine_function(service, port), and return its result."""
+    async def main():
+        service = fcc_service.Service(**kwargs)
+        server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+        try:
+            return await coroutine_function(service, server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(main())
+
+
+def test_is_compliant():
+    records = fcc_service._load_records('/is_compliant', 300, 'near_field')
+
+    async def check(service, port):
+        result = await fcc_service.load('127.0.0.1', port, records, concurrency=16)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        responses = [await fcc_service._post(reader, writer, '/is_compliant', r) for r in records[:20]]
+        writer.close()
+        return result, responses, service.snapshot()
+
+    result, responses, metrics = run_with_service(check, window=0.005)
+    assert result['requests'] == 300 and result['errors'] == 0
+    for r, (status, response) in zip(records, responses):
+        antenna = fcc.PoweredAntenna(r['watts'], r['t_average'], r['duty'], r['dbi'])
+        assert status == 200
+        assert (response['compliant'], response['method']) == fcc.is_compliant(
+            antenna, r['ft'], r['mhz'], r['ground_reflections'], r['controlled'])
+    endpoint = metrics['endpoints']['/is_compliant']
+    assert endpoint['requests'] == 320
+    assert endpoint['mean_batch_size'] > 1  # concurrent requests were coalesced
+    assert endpoint['p50_ms'] <= endpoint['p99_ms']
+
+
+def test_report_and_exempt():
+    stations = fcc_bench.station_mix('vhf_uhf_handheld', 5)
+    requests = [('/report', dict(zip(fcc_service.REPORT_FIELDS, s))) for s in stations]
+    requests += [('/report', dict(zip(fcc_service.REPORT_FIELDS, stations[0][:5] + (200000,) + stations[0][6:])))]
+    requests += [('/exempt_watts_generic', {'meters': 0.16, 'mhz': 310}),
+                 ('/exempt_watts_generic', {'meters': 0.01, 'mhz': 144}),
+                 ('/exempt_watts_generic', {'meters': 'far', 'mhz': 144}),
+                 ('/report', {'watts': 5})]
+
+    async def check(service, port):
+        async def one(path, record):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            try:
+                return await fcc_service._post(reader, writer, path, record)
+            finally:
+                writer.close()
+        return await asyncio.gather(*[one(path, record) for path, record in requests])
+
+    responses = run_with_service(check)
+    for s, (status, response) in zip(stations, responses):
+        report = fcc.RFEvaluationReport(fcc.PoweredAntenna(*s[:4]), s[4], s[5], s[6])
+        assert status == 200
+        for name in ('power_density', 'ft_c', 'ft_u', 'compliant_u'):
+            assert response[name] == pytest.approx(getattr(report, name), rel=1e-12)
+    assert responses[5][0] == 400 and 'out of range' in responses[5][1]['error']
+    assert responses[6] == (200, {'watts': pytest.approx(fcc.exempt_watts_generic(0.16, 310)[0]), 'method': 'SAR wins'})
+    assert responses[7][0] == 400 and 'near field' in responses[7][1]['error']
+    assert responses[8][0] == 400 and responses[9][0] == 400
+
+
+def test_errors():
+    async def check(service, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        results = []
+        for path, body in (('/nothing', b'{}'), ('/is_compliant', b'{not json'), ('/is_compliant', b'[1, 2]')):
+            writer.write(b'POST %s HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s' % (path.encode(), len(body), body))
+            results.append(int((await reader.readuntil(b'\r\n\r\n')).split()[1]))
+            await reader.readuntil(b'}')
+        writer.write(b'GET /metrics HTTP/1.1\r\nConnection: close\r\n\r\n')
+        results.append(int((await reader.readline()).split()[1]))
+        writer.close()
+        return results
+
+    assert run_with_service(check) == [404, 400, 400, 200]
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+import fcc
+import fcc_site
+
+
+def random_site(n, seed=0, **kwargs):
+    rng = np.random.default_rng(seed)
+    emitters = []
+    for i in range(n):
+        antenna = fcc.PoweredAntenna(rng.uniform(1, 1500), 50, rng.choice([20, 40, 100]), rng.uniform(0, 10))
+        position = rng.uniform(0, 2000, 3) * [1, 1, 0.05]
+        emitters.append(fcc_site.Emitter(antenna, position, rng.choice([3.9, 14.2, 50.1, 146, 446, 2400]),
+                                         bool(rng.random() < 0.5)))
+    return fcc_site.Site(emitters, **kwargs)
+
+
+def brute_force(site, point, controlled):
+    total = 0
+    for e in site.emitters:
+        ft = float(np.linalg.norm(np.subtract(point, e.position)))
+        report = fcc.RFEvaluationReport(e.antenna, ft, e.mhz, e.ground_reflections)
+        total += 100 * report.power_density / (report.power_density_c if controlled else report.power_density_u)
+    return total
+
+
+def test_percent_mpe():
+    exact = random_site(60, epsilon=0)
+    indexed = random_site(60, epsilon=1e-4)
+    points = np.random.default_rng(1).uniform(0, 2000, (200, 3)) * [1, 1, 0.05]
+    for controlled in [True, False]:
+        expected = [brute_force(exact, p, controlled) for p in points]
+        assert exact.percent_mpe(points, controlled) == pytest.approx(expected, rel=1e-12)
+        assert indexed.percent_mpe(points, controlled) == pytest.approx(expected, abs=60 * 100 * 1e-4)
+    # the index only skips what the cutoff would skip anyway
+    for p in points[:20]:
+        near = np.linalg.norm(indexed._positions - p, axis=1) < indexed.cutoff_ft
+        assert set(np.flatnonzero(near)) <= set(indexed.candidates(p))
+
+
+def test_is_compliant():
+    antenna = fcc.PoweredAntenna(1500, 100, 100, 2.2)
+    site = fcc_site.Site([fcc_site.Emitter(antenna, (0, 0, 0), 14.2, True)])
+    report = fcc.RFEvaluationReport(antenna, 20.0, 14.2, True)
+    assert site.is_compliant([(20, 0, 0)], True)[0] == report.compliant_c
+    assert site.is_compliant([(0, 20, 0)], False)[0] == report.compliant_u
+    assert list(fcc_site.Site([]).percent_mpe([(0, 0, 0)], False)) == [0]
+
+
+def site_with_watts(site, watts):
+    return fcc_site.Site([fcc_site.Emitter(fcc.PoweredAntenna(w, e.antenna.t_average, e.antenna.duty, e.antenna.dbi),
+                                           e.position, e.mhz, e.ground_reflections)
+                          for e, w in zip(site.emitters, watts)], epsilon=0)
+
+
+def test_power_budget_fair():
+    site = random_site(12, epsilon=0)
+    points = np.random.default_rng(2).uniform(0, 2000, (3000, 3)) * [1, 1, 0.05]
+    budget = fcc_site.PowerBudget(site, points)
+    for controlled in [True, False]:
+        watts = budget.max_min_fair(controlled)
+        assert watts == pytest.approx(np.full(12, watts[0]))  # every emitter reaches every point
+        percent = site_with_watts(site, watts).percent_mpe(points, controlled)
+        assert percent.max() < 100 and percent.max() == pytest.approx(100)
+        capped = budget.max_min_fair(controlled, weights=np.arange(1, 13), max_watts=2 * watts[0])
+        assert (capped <= 2 * watts[0]).all()
+        assert site_with_watts(site, capped).percent_mpe(points, controlled).max() < 100
+        held = capped < 2 * watts[0] * (1 - 1e-6)
+        assert 0 < held.sum() < 12  # the heaviest reach the cap, the rest are held in proportion to their weights
+        assert capped[held] / np.arange(1, 13)[held] == pytest.approx(capped[held][0] / np.arange(1, 13)[held][0])
+    # an emitter at an accessible point gets nothing, one that reaches no point with weight gets its cap
+    budget = fcc_site.PowerBudget(site, np.vstack([points, site.emitters[0].position]))
+    assert budget.max_min_fair(False)[0] == 0
+    budget.density_per_watt[:, 1] = 0
+    budget._matrices.clear()
+    assert budget.max_min_fair(False, max_watts=1500)[1] == pytest.approx(1500)
+    with pytest.raises(ValueError):
+        budget.max_min_fair(False, weights=-1)
+
+
+def test_power_budget_weighted():
+    rng = np.random.default_rng(3)
+    site = random_site(3, seed=4, epsilon=0)
+    points = rng.uniform(0, 2000, (500, 3)) * [1, 1, 0.05]
+    budget = fcc_site.PowerBudget(site, points)
+    a = budget.matrix(False)
+    weights = np.array([1, 2, 0.5])
+    watts = budget.max_weighted(False, weights, max_watts=[1500, 1000, 2000])
+    assert (a @ watts).max() < 100 and (watts <= [1500, 1000, 2000]).all()
+    # brute force: the optimum is at a vertex, where three of the constraints are tight
+    g = np.vstack([a / 100, np.eye(3), -np.eye(3)])
+    h = np.concatenate([np.ones(len(a)), [1500, 1000, 2000], np.zeros(3)])
+    near = np.argsort(-a.max(axis=1) / a.max())[:25]  # rows that can be tight
+    candidates = list(near) + list(range(len(a), len(g)))
+    best = 0
+    for i in range(len(candidates)):
+        for j in range(i + 1, len(candidates)):
+            for k in range(j + 1, len(candidates)):
+                rows = [candidates[i], candidates[j], candidates[k]]
+                try:
+                    x = np.linalg.solve(g[rows], h[rows])
+                except np.linalg.LinAlgError:
+                    continue
+                if (g @ x <= h + 1e-9).all():
+                    best = max(best, weights @ x)
+    assert weights @ watts == pytest.approx(best, rel=1e-8)
+    assert weights @ watts >= weights @ budget.max_min_fair(False, weights, max_watts=[1500, 1000, 2000])
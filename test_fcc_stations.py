@@ -0,0 +1,51 @@
+import csv
+import numpy as np
+import pytest
+import fcc_cli
+import fcc_numpy
+import fcc_stations
+from test_fcc_cli import inventory, expected
+
+
+def write_csv(path, records):
+    with open(str(path), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fcc_cli.FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def test_round_trip(tmp_path):
+    records = [dict(r, dbi=r['dbi'] + i / 7) for i, r in enumerate(inventory(45))]
+    write_csv(tmp_path / 'a.csv', records)
+    assert fcc_stations.from_csv(str(tmp_path / 'a.csv'), str(tmp_path / 's.npy'), chunk_size=10) == 45
+    stations = fcc_stations.load(str(tmp_path / 's.npy'))
+    assert isinstance(stations, np.memmap) and stations.dtype.itemsize == 58
+    assert stations['dbi'].tolist() == [r['dbi'] for r in records]
+    assert stations['effective_isotropic_radiated_power'].tolist() == pytest.approx(
+        fcc_numpy.effective_isotropic_radiated_power(stations['watts'], stations['t_average'], stations['duty'],
+                                                     stations['dbi']).tolist(), rel=0)
+    fcc_stations.to_csv(str(tmp_path / 's.npy'), str(tmp_path / 'b.csv'))
+    fcc_stations.from_csv(str(tmp_path / 'b.csv'), str(tmp_path / 't.npy'))
+    assert (np.load(str(tmp_path / 't.npy')) == np.load(str(tmp_path / 's.npy'))).all()  # exact
+
+
+def test_evaluate(tmp_path):
+    records = list(inventory(300))
+    np.save(str(tmp_path / 's.npy'), fcc_stations.from_records(records))
+    assert fcc_stations.main(['evaluate', str(tmp_path / 's.npy'), '-o', str(tmp_path / 'r.npy')]) == 0
+    results = np.load(str(tmp_path / 'r.npy'))
+    assert [(c, fcc_numpy.METHODS[m]) for c, m in results.tolist()] == [expected(r) for r in records]
+    stations = fcc_stations.load(str(tmp_path / 's.npy'))
+    starts = [start for start, _, _ in fcc_stations.evaluate(stations, chunk_size=128)]
+    assert starts == [0, 128, 256]
+
+
+def test_errors(tmp_path):
+    records = list(inventory(3))
+    records[2]['duty'] = 120
+    write_csv(tmp_path / 'a.csv', records)
+    with pytest.raises(ValueError, match='rows 1-3'):
+        fcc_stations.from_csv(str(tmp_path / 'a.csv'), str(tmp_path / 's.npy'))
+    np.save(str(tmp_path / 'x.npy'), np.zeros(3))
+    with pytest.raises(ValueError):
+        fcc_stations.load(str(tmp_path / 'x.npy'))
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+import fcc
+import fcc_sweep
+
+
+def test_sweep_exempt_watts():
+    axes = {'mhz': np.linspace(300, 6000, 58), 'meters': np.linspace(0.01, 0.4, 40)}
+    result, stats = fcc_sweep.sweep('exempt_watts', axes, tile_size=100)
+    assert result.shape == (58, 40)
+    assert stats.done == stats.total == 58 * 40
+    for i, mhz in enumerate(axes['mhz']):
+        for j, meters in enumerate(axes['meters']):
+            threshold, method = fcc.exempt_threshold(meters, mhz)
+            assert result[i, j] == pytest.approx(threshold, rel=1e-12, nan_ok=True)
+
+
+def test_sweep_workers(tmp_path):
+    axes = {'mhz': [3.9, 14.2, 146, 450], 'ft': np.linspace(1, 50, 50), 'watts': [5, 100, 1500], 'dbi': [0, 2.2]}
+    fixed = {'ground_reflections': True, 'duty': 40}
+    serial, _ = fcc_sweep.sweep('compliant', axes, fixed)
+    seen = []
+    parallel, stats = fcc_sweep.sweep('compliant', axes, fixed, workers=2, tile_size=97, progress=seen.append)
+    assert parallel.dtype == bool and (parallel == serial).all()
+    assert seen and stats.done == serial.size and stats.points_per_second > 0
+    path = str(tmp_path / 'sweep.npy')
+    mapped, _ = fcc_sweep.sweep('percent_mpe', axes, fixed, workers=2, tile_size=97, out=path)
+    expected, _ = fcc_sweep.sweep('percent_mpe', axes, fixed)
+    assert np.load(path) == pytest.approx(expected)
+    assert np.asarray(mapped) == pytest.approx(expected)
+    antenna = fcc.PoweredAntenna(1500, 100, 40, 2.2)
+    report = fcc.RFEvaluationReport(antenna, 50.0, 146, True)
+    assert expected[2, -1, 2, 1] == pytest.approx(100 * report.power_density / report.power_density_u)
+
+
+def test_sweep_unknown_quantity():
+    with pytest.raises(ValueError):
+        fcc_sweep.sweep('vibes', {'mhz': [1]})
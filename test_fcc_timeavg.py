@@ -0,0 +1,75 @@
+import io
+import random
+import pytest
+import fcc_timeavg
+from fcc_timeavg import TxEvent
+
+
+def random_log(n, seed=0):
+    rng = random.Random(seed)
+    t = 0.0
+    events = []
+    for _ in range(n):
+        t += rng.choice([0, rng.uniform(0, 30), rng.uniform(0, 3000)])
+        length = rng.choice([rng.uniform(0, 120), rng.uniform(0, 120), rng.uniform(300, 2000)])
+        events.append(TxEvent(t, t + length, rng.uniform(5, 1500), rng.choice([20, 40, 100])))
+        t += length
+    return events
+
+
+def brute_force_average(events, t, seconds):
+    joules = sum(e.watts * e.duty / 100 * max(0, min(e.end, t) - max(e.start, t - seconds)) for e in events)
+    return joules / seconds
+
+
+def test_rolling():
+    events = random_log(300)
+    samples = list(fcc_timeavg.rolling(iter(events), 360))
+    times = [t for t, _ in samples]
+    assert times == sorted(times) and len(samples) == 4 * len(events)
+    for t, watts in samples:
+        assert watts == pytest.approx(brute_force_average(events, t, 360), rel=1e-9, abs=1e-9)
+    # linear between samples
+    (t0, w0), (t1, w1) = samples[100], samples[101]
+    if t1 > t0:
+        middle = (t0 + t1) / 2
+        assert (w0 + w1) / 2 == pytest.approx(brute_force_average(events, middle, 360), rel=1e-9, abs=1e-9)
+
+
+def test_exceedances():
+    tracker = fcc_timeavg.ExceedanceTracker(2.2, 3, 14.2, True, True)
+    watts = 200 / tracker.percent_per_watt  # twice the controlled limit while keyed
+    carrier = [TxEvent(1000, 1600, watts, 100)]
+    found = list(fcc_timeavg.exceedances(carrier, 2.2, 3, 14.2, True, controlled=True))
+    assert len(found) == 1
+    e = found[0]
+    assert e.controlled and e.start == pytest.approx(1180) and e.end == pytest.approx(1780)
+    assert e.peak_percent_mpe == pytest.approx(200)
+    both = list(fcc_timeavg.exceedances(iter(carrier), 2.2, 3, 14.2, True))
+    assert both[0] == e
+    assert [x.controlled for x in both] == [True, False]  # uncontrolled limit is 5x lower, over a 30 min window
+    assert list(fcc_timeavg.exceedances(carrier, 2.2, 300, 14.2, True)) == []  # far away
+
+
+def test_read_log():
+    log = io.StringIO("start,seconds,end,watts,mode,duty\n"
+                      "2021-05-03T12:00:00,60,,100,CW,\n"
+                      "2021-05-03T12:05:00Z,,2021-05-03T12:06:00,50,,100\n"
+                      "1620043600,10,,5,FT8,\n")
+    events = list(fcc_timeavg.read_log(log))
+    assert events[0] == TxEvent(1620043200.0, 1620043260.0, 100.0, 40)
+    assert events[1] == TxEvent(1620043500.0, 1620043560.0, 50.0, 100.0)
+    assert events[2].duty == 50
+    with pytest.raises(ValueError):
+        list(fcc_timeavg.read_log(io.StringIO("start,seconds,watts,mode\n0,1,5,smoke signals\n")))
+    with pytest.raises(ValueError):
+        list(fcc_timeavg.rolling([TxEvent(0, 10, 5, 100), TxEvent(5, 6, 5, 100)], 360))
+
+
+def test_main(tmp_path, capsys):
+    path = tmp_path / 'log.csv'
+    path.write_text("start,seconds,watts,mode\n0,600,1500,carrier\n")
+    assert fcc_timeavg.main([str(path), '--dbi', '2.2', '--ft', '3', '--mhz', '14.2', '--ground-reflections']) == 1
+    assert 'controlled: 1970-01-01' in capsys.readouterr().out
+    path.write_text("start,seconds,watts,mode\n0,6,5,SSB\n")
+    assert fcc_timeavg.main([str(path), '--dbi', '2.2', '--ft', '3', '--mhz', '14.2']) == 0